@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+from .models import ArchivedLesson, ArchivedAssessment, ArchivedHomework
+
+admin.site.register(ArchivedLesson)
+admin.site.register(ArchivedAssessment)
+admin.site.register(ArchivedHomework)
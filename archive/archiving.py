@@ -0,0 +1,149 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, F, OuterRef, Q, Value
+from django.utils.timezone import now
+
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+from dashboard.models import StudyBlock
+from dashboard.timeline import sync_timeline
+
+from utils.bulk_copy import insert_from_select
+from utils.bulk_delete import raw_delete
+from utils.constants import ARCHIVE_BATCH_SIZE, ARCHIVE_HORIZON, RECENT_PAST_TIMEFRAME
+from utils.counters import COUNTER_FIELDS, update_counters
+from utils.data_version import bump_data_version
+from utils.query_filters import field_q
+
+from .models import ArchivedLesson, ArchivedAssessment, ArchivedHomework
+from .partitions import create_partitions
+
+COPIED_FIELDS = ['created_at', 'last_modified']
+
+# In archiving order: lessons are archived after events linked
+# to them, as deleting them would delete those events too.
+MODEL_CONFIGS = [
+    {
+        'model': Homework,
+        'archived_model': ArchivedHomework,
+        'queryset': lambda: Homework.objects.with_derived_fields(),
+        'archivable': lambda cutoff: [field_q(Homework, 'derived_due_at', lt=cutoff)],
+        'user_field': 'derived_user_id',
+        'time_field': 'derived_due_at',
+        'counted': ExpressionWrapper(Q(completion_percent__lt=100), output_field=BooleanField()),
+        'values': {
+            'subject': F('derived_subject_id'),
+            'lesson_given_id': F('lesson_given'),
+            'lesson_due_id': F('lesson_due'),
+            'start_time': F('derived_start_time'),
+            'due_at': F('derived_due_at'),
+            **{field: F(field) for field in ['task', 'completion_percent', 'effort', 'has_subtasks']},
+        },
+    },
+    {
+        'model': Assessment,
+        'archived_model': ArchivedAssessment,
+        'queryset': lambda: Assessment.objects.with_derived_fields(),
+        'archivable': lambda cutoff: [field_q(Assessment, 'derived_start_time', lt=cutoff)],
+        'user_field': 'derived_user_id',
+        'time_field': 'derived_start_time',
+        'counted': Value(True),
+        'values': {
+            'subject': F('derived_subject_id'),
+            'lesson_id': F('lesson'),
+            'start_time': F('derived_start_time'),
+            'duration': F('derived_duration'),
+            **{field: F(field) for field in ['type', 'description']},
+        },
+    },
+    {
+        'model': Lesson,
+        'archived_model': ArchivedLesson,
+        'queryset': lambda: Lesson.objects.all(),
+        'archivable': lambda cutoff: [
+            # Materialised occurrences are kept, as their series would expand them again.
+            Q(start_time__lt=cutoff, series__isnull=True),
+            # Homework given at a past lesson may still be due in the future.
+            ~Exists(Homework.objects.filter(Q(lesson_given=OuterRef('pk')) | Q(lesson_due=OuterRef('pk')))),
+            ~Exists(Assessment.objects.filter(lesson=OuterRef('pk'))),
+        ],
+        'user_field': 'subject__user',
+        'time_field': 'start_time',
+        'counted': Value(True),
+        'values': {field: F(field) for field in ['subject', 'type', 'start_time', 'duration']},
+    },
+]
+
+
+def archive_batch(config, cutoff, batch_size):
+    '''
+    Moves up to batch_size archivable events of one model (see
+    MODEL_CONFIGS) to their archive table in one transaction, with
+    one INSERT ... SELECT and one DELETE, creating partitions of the
+    archive table for them first. Returns the number of them.
+    '''
+    model = config['model']
+    archived_at = now()
+
+    with transaction.atomic():
+        rows = list(
+            config['queryset']()
+            .filter(*config['archivable'](cutoff))
+            .select_for_update(of=('self',))
+            .order_by('pk')
+            .values_list('pk', config['user_field'], config['counted'], config['time_field'])[:batch_size]
+        )
+
+        if not rows:
+            return 0
+
+        pks = [pk for pk, _, _, _ in rows]
+        create_partitions(config['archived_model'], [time for _, _, _, time in rows])
+
+        if model is Homework:
+            # Past study blocks of the homework, deleted with it by Django otherwise.
+            raw_delete(StudyBlock.objects.filter(homework__in=pks))
+
+        insert_from_select(config['archived_model'], config['queryset']().filter(pk__in=pks), {
+            'id': F('pk'),
+            **config['values'],
+            **{field: F(field) for field in COPIED_FIELDS},
+            'archived_at': Value(archived_at),
+        })
+        raw_delete(model.objects.filter(pk__in=pks))
+        sync_timeline(model.__name__.lower(), pks)
+
+        # Counters count events in live tables.
+        for user_id, count in Counter(user_id for _, user_id, counted, _ in rows if counted).items():
+            update_counters(user_id, **{COUNTER_FIELDS[model]: -count})
+
+        user_ids = {user_id for _, user_id, _, _ in rows}
+        transaction.on_commit(lambda: bump_data_version(*user_ids))
+
+    return len(rows)
+
+
+def archive_events(horizon=ARCHIVE_HORIZON, batch_size=ARCHIVE_BATCH_SIZE):
+    '''
+    Moves lessons, assessments and homework that took place (or were due)
+    more than horizon ago from their tables to archive tables, in batches
+    of batch_size rows, each in its own transaction, so that live tables
+    only grow with recent and upcoming events and locks are held briefly.
+    Returns {model_label: number of archived events}.
+
+    Horizon can't be shorter than RECENT_PAST_TIMEFRAME, as events
+    in it are still shown and edited.
+    '''
+    if horizon < RECENT_PAST_TIMEFRAME:
+        raise ValueError(f'Archive horizon must be at least {RECENT_PAST_TIMEFRAME.days} days.')
+
+    cutoff = now() - horizon
+    archived = Counter()
+
+    for config in MODEL_CONFIGS:
+        while count := archive_batch(config, cutoff, batch_size):
+            archived[config['model']._meta.label] += count
+
+    return dict(archived)
@@ -0,0 +1,67 @@
+from django.utils.timezone import now
+
+from lesson.series import get_occurrences, get_user_series
+from dashboard.month_calendar import EVENT_TIME_FIELDS, EVENT_TYPES, describe_event, get_user_events
+
+from utils.constants import RECENT_PAST_TIMEFRAME
+from utils.query_filters import filter_by_field
+
+from .models import ArchivedLesson, ArchivedAssessment, ArchivedHomework
+
+
+def get_archived_events(user, start, end):
+    '''
+    Returns a dict mapping event types to querysets of archived events
+    of the user between aware datetimes start (inclusive) and end (exclusive).
+    '''
+    return {
+        event_type: model.objects.filter(
+            subject__user=user, **{f'{time_field}__gte': start, f'{time_field}__lt': end}
+        ).select_related('subject')
+        for event_type, model, time_field in [
+            ('lesson', ArchivedLesson, 'start_time'),
+            ('assessment', ArchivedAssessment, 'start_time'),
+            ('homework', ArchivedHomework, 'due_at'),
+        ]
+    }
+
+
+def describe_archived_event(event_type, event):
+    '''
+    Returns (type, pk, description, time) of an archived event,
+    described like by describe_event().
+    '''
+    if event_type == 'homework':
+        return event_type, event.id, f'{event.subject} Homework', event.due_at
+    return event_type, event.id, f'{event.subject} {event.get_type_display()}', event.start_time
+
+
+def get_history(user, start, end):
+    '''
+    Returns events of the user between aware datetimes start (inclusive)
+    and end (exclusive), from live and archive tables, as
+    (type, pk, description, time, archived) tuples in chronological order.
+
+    Archive tables are only queried if the range starts before
+    RECENT_PAST_TIMEFRAME, which is never archived, so that
+    ranges of recent and upcoming events cost no more queries
+    than reading live tables.
+    '''
+    events = [
+        (*describe_event(event_type, event), False)
+        for event_type, queryset in get_user_events(user).items()
+        for event in filter_by_field(queryset, EVENT_TIME_FIELDS[event_type], gte=start, lt=end)
+    ]
+    events.extend(
+        (*describe_event('lesson', occurrence), False)
+        for occurrence in get_occurrences(get_user_series(user), start, end)
+    )
+
+    if start < now() - RECENT_PAST_TIMEFRAME:
+        events.extend(
+            (*describe_archived_event(event_type, event), True)
+            for event_type, queryset in get_archived_events(user, start, end).items()
+            for event in queryset
+        )
+
+    return sorted(events, key=lambda event: (event[3], EVENT_TYPES.index(event[0])))
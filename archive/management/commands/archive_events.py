@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from archive.archiving import archive_events
+from utils.constants import ARCHIVE_BATCH_SIZE, ARCHIVE_HORIZON
+
+
+class Command(BaseCommand):
+    help = 'Moves past lessons, assessments and homework older than the horizon to archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_HORIZON.days, help='Archive events older than this many days')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Number of events moved per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Batch size must be positive.')
+
+        try:
+            archived = archive_events(timedelta(days=options['days']), options['batch_size'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        for label, count in archived.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Archived {sum(archived.values())} events.'))
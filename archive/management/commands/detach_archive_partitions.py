@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from archive.partitions import detach_partitions, uses_partitions
+
+
+class Command(BaseCommand):
+    help = 'Detaches monthly partitions of archive tables before a month, leaving them as separate tables (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('before', help='First month to keep, as YYYY-MM')
+
+    def handle(self, *args, **options):
+        if not uses_partitions():
+            raise CommandError('Archive tables are only partitioned on PostgreSQL.')
+
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError('Provide the month in YYYY-MM format.')
+
+        for name in detach_partitions(before):
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS('Detached partitions can now be dumped and dropped.'))
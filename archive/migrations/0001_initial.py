@@ -0,0 +1,74 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAssessment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('last_modified', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('lesson_id', models.BigIntegerField(blank=True, null=True)),
+                ('type', models.CharField(choices=[('T', 'Test'), ('Q', 'Quiz'), ('E', 'Exam'), ('M', 'Midterm'), ('O', 'Oral Exam'), ('L', 'Lab Work'), ('S', 'Essay'), ('P', 'Project')], max_length=1)),
+                ('start_time', models.DateTimeField()),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('description', models.CharField(blank=True, max_length=500, null=True)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='subject.subject')),
+            ],
+            options={
+                'db_table': 'archived_assessment',
+                'indexes': [models.Index(fields=['subject', 'start_time'], name='archived_assess_subject_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedHomework',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('last_modified', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('lesson_given_id', models.BigIntegerField(blank=True, null=True)),
+                ('lesson_due_id', models.BigIntegerField(blank=True, null=True)),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('due_at', models.DateTimeField()),
+                ('task', models.CharField(max_length=1000)),
+                ('completion_percent', models.IntegerField()),
+                ('effort', models.DurationField(blank=True, null=True)),
+                ('has_subtasks', models.BooleanField()),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='subject.subject')),
+            ],
+            options={
+                'db_table': 'archived_homework',
+                'indexes': [models.Index(fields=['subject', 'due_at'], name='archived_homework_subject_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLesson',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('last_modified', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('type', models.CharField(choices=[('L', 'Lecture'), ('P', 'Practice'), ('S', 'Seminar'), ('Y', 'Self-Study')], max_length=1)),
+                ('start_time', models.DateTimeField()),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='subject.subject')),
+            ],
+            options={
+                'db_table': 'archived_lesson',
+                'indexes': [models.Index(fields=['subject', 'start_time'], name='archived_lesson_subject_idx')],
+            },
+        ),
+    ]
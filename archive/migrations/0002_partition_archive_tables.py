@@ -0,0 +1,59 @@
+from datetime import datetime, time, timedelta
+
+from django.db import migrations
+from django.utils.timezone import localtime, make_aware
+
+# Table, partition column and index of the table (see models).
+PARTITIONED_TABLES = [
+    ('archived_lesson', 'start_time', 'archived_lesson_subject_idx'),
+    ('archived_assessment', 'start_time', 'archived_assess_subject_idx'),
+    ('archived_homework', 'due_at', 'archived_homework_subject_idx'),
+]
+
+
+def partition_tables(apps, schema_editor):
+    '''
+    Recreates archive tables as tables partitioned by month of their
+    time on PostgreSQL, moving rows archived so far. The primary key
+    of a partitioned table must include its partition column.
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table, column, index in PARTITIONED_TABLES:
+        schema_editor.execute(f'ALTER TABLE {table} RENAME TO {table}_unpartitioned')
+        schema_editor.execute(
+            f'CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE ({column})'
+        )
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT {column} FROM {table}_unpartitioned')
+            months = {localtime(archived_time).date().replace(day=1) for archived_time, in cursor.fetchall()}
+
+        for month in sorted(months):
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            schema_editor.execute(
+                f'CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                [make_aware(datetime.combine(month, time())), make_aware(datetime.combine(next_month, time()))]
+            )
+
+        schema_editor.execute(f'INSERT INTO {table} SELECT * FROM {table}_unpartitioned')
+        schema_editor.execute(f'DROP TABLE {table}_unpartitioned')
+
+        schema_editor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {column})')
+        schema_editor.execute(f'CREATE INDEX {index} ON {table} (subject_id, {column})')
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {table}_subject_id_fk FOREIGN KEY (subject_id) '
+            'REFERENCES subject (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archive', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
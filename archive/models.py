@@ -0,0 +1,80 @@
+from django.db import models
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+
+from utils.constants import MAX_TASK_LENGTH
+
+
+class ArchivedEvent(models.Model):
+    '''
+    Event moved out of its live table by archiving (see archiving).
+    Keeps the id it had there, and has its derived fields (like
+    subject of an assessment linked to a lesson) stored, so that
+    archived rows are read without joins to other events.
+    '''
+
+    class Meta:
+        abstract = True
+
+    id = models.BigIntegerField(primary_key=True)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, db_index=False) # covered by indexes starting with subject
+    created_at = models.DateTimeField()
+    last_modified = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+
+class ArchivedLesson(ArchivedEvent):
+
+    class Meta:
+        db_table = 'archived_lesson'
+        indexes = [
+            models.Index(fields=['subject', 'start_time'], name='archived_lesson_subject_idx'),
+        ]
+
+    type = models.CharField(max_length=1, choices=Lesson.Type)
+    start_time = models.DateTimeField()
+    duration = models.DurationField(blank=True, null=True)
+
+    def __str__(self):
+        return f'Archived {self.get_type_display()} of {self.subject_id} at {self.start_time}'
+
+
+class ArchivedAssessment(ArchivedEvent):
+
+    class Meta:
+        db_table = 'archived_assessment'
+        indexes = [
+            models.Index(fields=['subject', 'start_time'], name='archived_assess_subject_idx'),
+        ]
+
+    lesson_id = models.BigIntegerField(blank=True, null=True) # lesson it was linked to, which may be archived too
+    type = models.CharField(max_length=1, choices=Assessment.Type)
+    start_time = models.DateTimeField()
+    duration = models.DurationField(blank=True, null=True)
+    description = models.CharField(max_length=500, blank=True, null=True)
+
+    def __str__(self):
+        return f'Archived {self.get_type_display()} of {self.subject_id} at {self.start_time}'
+
+
+class ArchivedHomework(ArchivedEvent):
+
+    class Meta:
+        db_table = 'archived_homework'
+        indexes = [
+            models.Index(fields=['subject', 'due_at'], name='archived_homework_subject_idx'),
+        ]
+
+    lesson_given_id = models.BigIntegerField(blank=True, null=True)
+    lesson_due_id = models.BigIntegerField(blank=True, null=True)
+    start_time = models.DateTimeField(blank=True, null=True)
+    due_at = models.DateTimeField()
+    task = models.CharField(max_length=MAX_TASK_LENGTH)
+    completion_percent = models.IntegerField()
+    effort = models.DurationField(blank=True, null=True)
+    has_subtasks = models.BooleanField()
+
+    def __str__(self):
+        return f'Archived homework of {self.subject_id} due at {self.due_at}'
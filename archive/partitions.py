@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.utils.timezone import localtime
+
+from utils.query_filters import get_local_midnight
+
+from .models import ArchivedLesson, ArchivedAssessment, ArchivedHomework
+
+PARTITION_NAME_FORMAT = '{table}_%Y_%m'
+
+# On PostgreSQL, archive tables are partitioned by local month
+# of these fields (see migrations), created as rows are archived.
+PARTITION_FIELDS = {
+    ArchivedLesson: 'start_time',
+    ArchivedAssessment: 'start_time',
+    ArchivedHomework: 'due_at',
+}
+
+
+def uses_partitions():
+    return connection.vendor == 'postgresql'
+
+
+def get_month(time):
+    '''Returns the first day of the local month of an aware datetime.'''
+    return localtime(time).date().replace(day=1)
+
+
+def get_next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def get_partitions(model):
+    '''
+    Returns {month: partition name} of partitions of the model's table,
+    months being their first days.
+    '''
+    table = model._meta.db_table
+    name_format = PARTITION_NAME_FORMAT.format(table=table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass',
+            [table]
+        )
+        return {datetime.strptime(name, name_format).date(): name for name, in cursor.fetchall()}
+
+
+def create_partitions(model, times):
+    '''
+    Creates partitions of the model's table for local months of
+    the aware datetimes that it has none for, before rows at those
+    times are inserted. Does nothing on other databases.
+    Returns names of created partitions.
+    '''
+    if not uses_partitions():
+        return []
+
+    table = model._meta.db_table
+    quote_name = connection.ops.quote_name
+    created = []
+
+    with connection.cursor() as cursor:
+        for month in sorted({get_month(time) for time in times} - get_partitions(model).keys()):
+            name = month.strftime(PARTITION_NAME_FORMAT.format(table=table))
+            cursor.execute(
+                f'CREATE TABLE {quote_name(name)} PARTITION OF {quote_name(table)} FOR VALUES FROM (%s) TO (%s)',
+                [get_local_midnight(month), get_local_midnight(get_next_month(month))]
+            )
+            created.append(name)
+
+    return created
+
+
+def detach_partitions(before):
+    '''
+    Detaches partitions of archive tables for months before the
+    given date from them, which doesn't move any rows. Detached
+    partitions remain as separate tables, to be dumped and dropped,
+    and their events are no longer read with archived ones.
+    Returns names of detached partitions.
+    '''
+    if not uses_partitions():
+        return []
+
+    quote_name = connection.ops.quote_name
+    detached = []
+
+    with connection.cursor() as cursor:
+        for model in PARTITION_FIELDS:
+            for month, name in sorted(get_partitions(model).items()):
+                if get_next_month(month) <= before:
+                    cursor.execute(f'ALTER TABLE {quote_name(model._meta.db_table)} DETACH PARTITION {quote_name(name)}')
+                    detached.append(name)
+
+    return detached
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localtime, now
+from django.contrib.auth.models import User
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+from userprofile.models import UserProfile
+from dashboard.models import StudyBlock
+from utils.bulk_delete import delete_subjects
+from utils.constants import ARCHIVE_HORIZON, RECENT_PAST_TIMEFRAME
+from utils.counters import refresh_counters
+from utils.query_filters import get_local_midnight
+from utils.query_plan import get_query_plan
+
+from .archiving import archive_events
+from .history import get_archived_events
+from .models import ArchivedLesson, ArchivedAssessment, ArchivedHomework
+from .partitions import detach_partitions, get_month, get_next_month, get_partitions
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        '''
+        Create a logged in test user with profile and subject, a lesson before the archive
+        horizon with an assessment and homework linked to it, another one with homework
+        given at it that is due in the future, and a recent lesson.
+        '''
+        self.user = User.objects.create_user(username='testuser')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Databases')
+        self.old_time = now() - ARCHIVE_HORIZON - timedelta(days=10)
+
+        self.old_lesson, self.kept_lesson, self.recent_lesson = Lesson.objects.all().bulk_create([
+            Lesson(subject=self.subject, start_time=self.old_time, duration=timedelta(minutes=90)),
+            Lesson(subject=self.subject, start_time=self.old_time + timedelta(days=1), duration=timedelta(minutes=90)),
+            Lesson(subject=self.subject, start_time=now() - timedelta(days=1), duration=timedelta(minutes=90)),
+        ])
+        Assessment.objects.all().bulk_create([Assessment(lesson=self.old_lesson, type=Assessment.Type.QUIZ)])
+        self.old_homework, _ = Homework.objects.all().bulk_create([
+            Homework(lesson_due=self.old_lesson, task='Normalize the schema', completion_percent=50),
+            Homework(lesson_given=self.kept_lesson, task='Write a thesis', due_at=now() + timedelta(days=30)),
+        ])
+        StudyBlock.objects.create(
+            user=self.user, homework=self.old_homework,
+            start_time=self.old_time - timedelta(hours=2), end_time=self.old_time - timedelta(hours=1),
+        )
+        refresh_counters(UserProfile.objects.filter(pk=self.profile.pk))
+
+
+    def test_archive_moves_old_events_keeping_linked_ones(self):
+        '''Test archiving moves old events with their derived fields, but keeps lessons homework still depends on.'''
+        with self.assertRaises(ValueError):
+            archive_events(RECENT_PAST_TIMEFRAME - timedelta(days=1))
+
+        archived = archive_events(batch_size=1)
+
+        self.assertEqual(archived, {'homework.Homework': 1, 'assessment.Assessment': 1, 'lesson.Lesson': 1})
+        self.assertQuerySetEqual(Lesson.objects.order_by('start_time'), [self.kept_lesson, self.recent_lesson])
+        self.assertFalse(StudyBlock.objects.exists())
+
+        assessment = ArchivedAssessment.objects.get()
+        homework = ArchivedHomework.objects.get()
+        self.assertEqual((assessment.subject, assessment.start_time, assessment.lesson_id), (self.subject, self.old_time, self.old_lesson.pk))
+        self.assertEqual((homework.subject, homework.due_at, homework.completion_percent), (self.subject, self.old_time, 50))
+        self.assertEqual(ArchivedLesson.objects.get().pk, self.old_lesson.pk)
+
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.lesson_count, self.profile.assessment_count, self.profile.open_homework_count), (2, 0, 1))
+
+
+    def test_history_combines_live_and_archived_events(self):
+        '''Test history view returns archived events together with live ones in chronological order.'''
+        archive_events()
+
+        response = self.client.get(reverse('archive_history'), {
+            'start': localtime(self.old_time).date().isoformat(),
+            'end': localtime(self.kept_lesson.start_time).date().isoformat(),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(event['type'], event['id'], event['archived']) for event in response.json()['events']],
+            [
+                ('lesson', self.old_lesson.pk, True),
+                ('assessment', ArchivedAssessment.objects.get().pk, True),
+                ('homework', self.old_homework.pk, True),
+                ('lesson', self.kept_lesson.pk, False),
+            ]
+        )
+
+
+    def test_history_rejects_invalid_range(self):
+        '''Test history view rejects missing, reversed and out of range ranges.'''
+        for params in [
+            {'start': '2024-01-01'},
+            {'start': '2024-01-05', 'end': '2024-01-01'},
+            {'start': '9999-12-31', 'end': '9999-12-31'},
+        ]:
+            response = self.client.get(reverse('archive_history'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+    def test_deleting_subject_deletes_archived_events(self):
+        '''Test deleting a subject also deletes its archived events.'''
+        archive_events()
+
+        delete_subjects(Subject.objects.filter(pk=self.subject.pk))
+
+        self.assertFalse(ArchivedLesson.objects.exists())
+        self.assertFalse(ArchivedAssessment.objects.exists())
+        self.assertFalse(ArchivedHomework.objects.exists())
+
+
+    @skipUnless(connection.vendor == 'postgresql', 'Archive tables are only partitioned on PostgreSQL.')
+    def test_archiving_creates_monthly_partitions(self):
+        '''Test archiving creates partitions for months of archived lessons, reads of a month scan one of them, and old ones can be detached.'''
+        Lesson.objects.all().bulk_create([
+            Lesson(subject=self.subject, start_time=self.old_time - timedelta(days=62), duration=timedelta(minutes=90))
+        ])
+        month = get_month(self.old_time)
+        earlier_month = get_month(self.old_time - timedelta(days=62))
+
+        archive_events()
+
+        partitions = get_partitions(ArchivedLesson)
+        self.assertEqual(sorted(partitions), [earlier_month, month])
+
+        queryset = get_archived_events(self.user, get_local_midnight(month), get_local_midnight(get_next_month(month)))['lesson']
+        plan = get_query_plan(queryset)
+        self.assertIn(partitions[month], plan)
+        self.assertNotIn(partitions[earlier_month], plan)
+
+        self.assertEqual(detach_partitions(month), [partitions[earlier_month]])
+        self.assertEqual(list(ArchivedLesson.objects.values_list('pk', flat=True)), [self.old_lesson.pk])
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import HistoryView
+
+urlpatterns = [
+    path(route='history/', view=HistoryView.as_view(), name='archive_history'),
+]
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.views import View
+
+from dashboard.views import DATE_PARAM_FORMAT
+
+from utils.constants import MAX_HISTORY_RANGE
+from utils.query_filters import get_local_midnight
+
+from .history import get_history
+
+
+class HistoryView(LoginRequiredMixin, View):
+    '''
+    Returns user's events between "start" and "end" GET params
+    (inclusive, "YYYY-MM-DD") in chronological order as JSON,
+    including archived ones, which have no detail pages:
+    {"events": [{"type", "id", "title", "time", "archived"}, ...]}.
+    '''
+
+    def get(self, request):
+        try:
+            start = datetime.strptime(request.GET['start'], DATE_PARAM_FORMAT).date()
+            end = datetime.strptime(request.GET['end'], DATE_PARAM_FORMAT).date()
+            max_end = start + MAX_HISTORY_RANGE
+            end_time = get_local_midnight(end + timedelta(days=1))
+        except (KeyError, ValueError, OverflowError):
+            return JsonResponse({'error': 'Provide "start" and "end" dates in YYYY-MM-DD format.'}, status=400)
+
+        if not start <= end < max_end:
+            return JsonResponse(
+                {'error': f'"end" must be after "start" by less than {MAX_HISTORY_RANGE.days} days.'},
+                status=400
+            )
+
+        events = get_history(self.request.user, get_local_midnight(start), end_time)
+
+        return JsonResponse({
+            'events': [
+                {'type': event_type, 'id': pk, 'title': description, 'time': time.isoformat(), 'archived': archived}
+                for event_type, pk, description, time, archived in events
+            ],
+        })
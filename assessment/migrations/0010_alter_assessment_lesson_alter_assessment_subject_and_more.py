@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0009_assessment_assessment_start_time_idx'),
+        ('lesson', '0008_lesson_lesson_start_time_idx'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assessment',
+            name='lesson',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='lesson.lesson'),
+        ),
+        migrations.AlterField(
+            model_name='assessment',
+            name='subject',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='subject.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['subject', 'start_time'], name='assessment_subject_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['subject', 'type'], name='assessment_subject_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['subject', 'created_at'], name='assessment_subject_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['lesson', 'type'], name='assessment_lesson_type_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+CREATE_TIME_RANGE_INDEX = '''
+    CREATE INDEX assessment_subject_time_range_idx ON assessment
+    USING gist ({columns}event_time_range(start_time, duration))
+    WHERE start_time IS NOT NULL
+'''
+
+
+def create_time_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    # Installed by lesson migration, if available.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'btree_gist'")
+        has_btree_gist = cursor.fetchone() is not None
+
+    schema_editor.execute(CREATE_TIME_RANGE_INDEX.format(columns='subject_id, ' if has_btree_gist else ''))
+
+
+def drop_time_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX assessment_subject_time_range_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0010_alter_assessment_lesson_alter_assessment_subject_and_more'),
+        ('lesson', '0010_lesson_time_range_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_time_range_index, drop_time_range_index),
+    ]
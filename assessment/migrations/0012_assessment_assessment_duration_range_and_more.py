@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:24
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0011_assessment_time_range_idx'),
+        ('lesson', '0011_lesson_series'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='assessment',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('duration__gte', datetime.timedelta(seconds=300)), ('duration__lte', datetime.timedelta(days=7))), ('duration__isnull', True), _connector='OR'), name='assessment_duration_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='assessment',
+            constraint=models.CheckConstraint(condition=models.Q(('subject__isnull', False), ('lesson__isnull', False), _connector='OR'), name='assessment_has_subject_or_lesson'),
+        ),
+        migrations.AddConstraint(
+            model_name='assessment',
+            constraint=models.CheckConstraint(condition=models.Q(('start_time__isnull', False), ('lesson__isnull', False), _connector='OR'), name='assessment_has_start_time_or_lesson'),
+        ),
+    ]
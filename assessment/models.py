@@ -7,11 +7,15 @@ from subject.models import Subject
 from lesson.models import Lesson
 
 from utils.accessors import get_subject, get_userprofile, get_time_display_format
-from utils.constants import MIN_ASSESSMENT_DURATION as MIN_DURATION, MAX_ASSESSMENT_DURATION as MAX_DURATION
+from utils.check_constraints import CleanMirroredConstraintsMixin, any_not_null_constraint, range_constraint
+from utils.constants import (
+    MIN_ASSESSMENT_DURATION as MIN_DURATION, MAX_ASSESSMENT_DURATION as MAX_DURATION,
+    UNKNOWN_ASSESSMENT_DURATION as UNKNOWN_DURATION
+)
 from utils.reminder_time import should_schedule_reminder, calculate_scheduled_reminder_time
 from utils.time_format import format_time
 
-REMINDER_TRIGGER_FIELD = 'derived_start_time_prop'
+REMINDER_TRIGGER_FIELD = 'reminder_trigger'
 
 class AssessmentManager(models.Manager):
     
@@ -21,23 +25,40 @@ class AssessmentManager(models.Manager):
         return obj
 
     def bulk_create(self, objs, **kwargs):
-        for obj in objs:
-            obj.full_clean()
-        return super().bulk_create(objs, **kwargs)
+        # Imported here, as it depends on event models.
+        from utils.batch_validation import validated_bulk_create
+        return validated_bulk_create(super().bulk_create, objs, **kwargs)
+    
+    DERIVED_FIELDS = {
+        'derived_user_id': ('subject__user', 'lesson__subject__user'),
+        'derived_subject_id': ('subject', 'lesson__subject'),
+        'derived_start_time': ('start_time', 'lesson__start_time'),
+        'derived_duration': ('duration', 'lesson__duration'),
+    }
     
     def with_derived_fields(self):
-        return self.annotate(
-            derived_user_id=Coalesce('subject__user', 'lesson__subject__user'),
-            derived_subject_id=Coalesce('subject', 'lesson__subject'),
-            derived_start_time=Coalesce('start_time', 'lesson__start_time'),
-            derived_duration=Coalesce('duration', 'lesson__duration')
-        )
+        return self.annotate(**{
+            field_name: Coalesce(*sources)
+            for field_name, sources in self.DERIVED_FIELDS.items()
+        })
 
 
-class Assessment(models.Model):
+class Assessment(CleanMirroredConstraintsMixin, models.Model):
 
     class Meta:
         db_table = 'assessment'
+        indexes = [
+            models.Index(fields=['start_time'], name='assessment_start_time_idx'),
+            models.Index(fields=['subject', 'start_time'], name='assessment_subject_start_idx'),
+            models.Index(fields=['subject', 'type'], name='assessment_subject_type_idx'),
+            models.Index(fields=['subject', 'created_at'], name='assessment_subject_created_idx'),
+            models.Index(fields=['lesson', 'type'], name='assessment_lesson_type_idx'),
+        ]
+        constraints = [
+            range_constraint('assessment_duration_range', 'duration', MIN_DURATION, MAX_DURATION),
+            any_not_null_constraint('assessment_has_subject_or_lesson', 'subject', 'lesson'),
+            any_not_null_constraint('assessment_has_start_time_or_lesson', 'start_time', 'lesson'),
+        ]
 
     class Type(models.TextChoices):
         TEST = 'T', 'Test'
@@ -50,8 +71,8 @@ class Assessment(models.Model):
         PROJECT = 'P', 'Project'
         
         
-    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True)
-    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, blank=True, null=True)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True, db_index=False) # covered by indexes starting with subject
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, blank=True, null=True, db_index=False) # covered by indexes starting with lesson
     type = models.CharField(max_length=1, choices=Type, default=Type.TEST)
     start_time = models.DateTimeField(blank=True, null=True)
     duration = models.DurationField(blank=True, null=True)
@@ -74,6 +95,16 @@ class Assessment(models.Model):
         return self.start_time or (self.lesson.start_time if self.lesson else None)
     
 
+    @property
+    def reminder_trigger(self):
+        '''
+        Fields the reminder time is calculated from. Compared instead of
+        the derived time itself, so that loading an instance doesn't
+        fetch its lesson.
+        '''
+        return self.start_time, self.lesson_id
+
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
@@ -82,6 +113,29 @@ class Assessment(models.Model):
     def clean(self):
         super().clean()
 
+        errors = self.get_rule_errors()
+
+        if not errors and not self.lesson_id and self.subject_id and self.start_time:
+            # Imported here, as it depends on event models.
+            from utils.time_conflicts import find_conflicts
+
+            end_time = self.start_time + (self.duration or UNKNOWN_DURATION)
+            if find_conflicts(self.subject.user, self.start_time, end_time, ('assessment', self.pk)):
+                errors['start_time'] = ValidationError(
+                    message='Assessment overlaps with another of your lessons or assessments.',
+                    code='time_conflict'
+                )
+        
+        if errors:
+            raise ValidationError(errors)
+
+
+    def get_rule_errors(self):
+        '''
+        Returns {field: error} of broken rules, which are checked
+        without queries once the lesson and subject are loaded
+        (all but overlapping with other events).
+        '''
         errors = {}
 
         if self.lesson and self.subject and self.subject != self.lesson.subject:
@@ -145,29 +199,40 @@ class Assessment(models.Model):
                 message='Assessment can\'t be attached to lesson starting in the past.',
                 code='assessment_starts_in_past'
             )
-        
-        if errors:
-            raise ValidationError(errors)
+
+        return errors
             
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        if self.lesson:
+    def save(self, *args, trusted=False, **kwargs):
+        '''
+        Saves assessment validated with full_clean(). Trusted saves of internal
+        updates (like marking reminders as sent) skip the validation,
+        relying on check constraints of the database instead.
+        '''
+        if not trusted:
+            self.full_clean()
+        self.prepare_for_save()
+        super().save(*args, **kwargs)
+        self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
+
+
+    def prepare_for_save(self):
+        '''
+        Sets fields derived on save: clears own subject and time of
+        assessment linked to a lesson, and sets reminder time.
+        Also used for validated objects of bulk_create().
+        '''
+        if self.lesson_id:
             self.subject = None
             self.start_time = None
 
-        userprofile = get_userprofile(self)
-
-        if should_schedule_reminder(self, userprofile, 'assessment', REMINDER_TRIGGER_FIELD):
+        if should_schedule_reminder(self, 'assessment', REMINDER_TRIGGER_FIELD):
             self.scheduled_reminder_time = calculate_scheduled_reminder_time(
                 instance=self,
-                userprofile=userprofile,
+                userprofile=get_userprofile(self),
                 event_type='assessment'
             )
 
-        super().save(*args, **kwargs)
-        self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
-
 
     def __str__(self):
         subject = get_subject(self)
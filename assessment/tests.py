@@ -1,12 +1,15 @@
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 from django.test import TestCase
-from django.utils.timezone import now
+from django.utils.timezone import now, localtime, make_aware
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 
 from subject.models import Subject
 from lesson.models import Lesson
+from userprofile.models import UserProfile
+from utils.query_filters import filter_by_date_range
+from utils.query_plan import analyze, uses_index
 
 from .models import Assessment
 
@@ -216,4 +219,133 @@ class AssessmentModelTests(TestCase):
             start_time=self.START_TIME
         )
         self.assertIn(self.subject.name, str(assessment))
-        self.assertIn('test', str(assessment).lower())
\ No newline at end of file
+        self.assertIn('test', str(assessment).lower())
+
+
+class AssessmentDateRangeFilterTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile, subject and lesson for derived start time filtering.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Operating Systems')
+        self.date = localtime(now()).date() + timedelta(days=10)
+        self.lesson = Lesson.objects.create(
+            subject=self.subject,
+            start_time=make_aware(datetime.combine(self.date, time(10))),
+            duration=timedelta(minutes=90),
+        )
+
+
+    def test_filter_by_derived_start_time(self):
+        '''Test filtering by derived start time matches both own and lesson start time.'''
+        lesson_assessment = Assessment.objects.create(lesson=self.lesson, type=Assessment.Type.QUIZ)
+        own_assessment = Assessment.objects.create(
+            subject=self.subject,
+            start_time=make_aware(datetime.combine(self.date, time(15))),
+            duration=timedelta(minutes=60),
+        )
+        Assessment.objects.create(
+            subject=self.subject,
+            start_time=make_aware(datetime.combine(self.date + timedelta(days=1), time(9))),
+            duration=timedelta(minutes=60),
+        )
+
+        assessments = filter_by_date_range(
+            Assessment.objects.with_derived_fields().order_by('derived_start_time'),
+            'day',
+            date=self.date,
+            date_field='derived_start_time',
+        )
+        self.assertQuerySetEqual(assessments, [lesson_assessment, own_assessment])
+
+
+    def test_filter_by_derived_start_time_uses_index(self):
+        '''Test filtering by derived start time can use the start_time index.'''
+        queryset = filter_by_date_range(
+            Assessment.objects.with_derived_fields(),
+            'month',
+            date=self.date,
+            date_field='derived_start_time',
+        )
+        self.assertTrue(uses_index(queryset, 'assessment_start_time_idx'))
+
+
+class AssessmentTimeConflictTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile, subject and a lesson in the future.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Computer Networks')
+        self.start = make_aware(datetime.combine(localtime(now()).date() + timedelta(days=5), time(10)))
+        self.lesson = Lesson.objects.create(subject=self.subject, start_time=self.start, duration=timedelta(minutes=90))
+
+
+    def test_own_time_assessment_overlapping_lesson_is_rejected(self):
+        '''Test assessment with its own time overlapping a lesson fails, counting unknown duration as an hour.'''
+        with self.assertRaises(ValidationError) as context:
+            Assessment.objects.create(subject=self.subject, start_time=self.start - timedelta(minutes=30))
+        self.assertEqual(context.exception.error_dict['start_time'][0].code, 'time_conflict')
+
+
+    def test_assessment_linked_to_lesson_doesnt_conflict(self):
+        '''Test assessment taking place during its lesson, and one right after it, are valid.'''
+        Assessment.objects.create(lesson=self.lesson)
+        Assessment.objects.create(subject=self.subject, start_time=self.start + timedelta(minutes=90))
+
+
+class AssessmentListQueryPlanTests(TestCase):
+
+    SUBJECTS = 20
+    ASSESSMENTS_PER_SUBJECT = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        '''Create a test user with enough assessments for the planner to pick indexes by selectivity.'''
+        cls.user = User.objects.create_user(username='testuser')
+        subjects = Subject.objects.all().bulk_create(
+            Subject(user=cls.user, name=f'Subject {i}') for i in range(cls.SUBJECTS)
+        )
+        lessons = Lesson.objects.all().bulk_create(
+            Lesson(subject=subject, start_time=now() + timedelta(days=1), duration=timedelta(minutes=90))
+            for subject in subjects
+        )
+        types = Assessment.Type.values
+        Assessment.objects.all().bulk_create(
+            Assessment(
+                subject=subject,
+                type=types[i % len(types)],
+                start_time=now() + timedelta(days=i),
+                duration=timedelta(minutes=60),
+            )
+            for subject in subjects
+            for i in range(cls.ASSESSMENTS_PER_SUBJECT)
+        )
+        Assessment.objects.all().bulk_create(
+            Assessment(lesson=lesson, type=types[i % len(types)])
+            for lesson in lessons
+            for i in range(2)
+        )
+        analyze(Subject, Lesson, Assessment)
+        cls.subject = subjects[0]
+        cls.lesson = lessons[0]
+
+
+    def test_subject_filter_sorted_by_start_time_uses_index(self):
+        '''Test filtering assessments by subject and sorting by start time uses (subject, start_time) index.'''
+        queryset = Assessment.objects.filter(subject=self.subject).order_by('start_time')
+        self.assertTrue(uses_index(queryset, 'assessment_subject_start_idx'))
+
+
+    def test_subject_and_type_filter_uses_index(self):
+        '''Test filtering assessments by subject and exact type uses (subject, type) index.'''
+        queryset = Assessment.objects.filter(subject=self.subject, type=Assessment.Type.EXAM)
+        self.assertTrue(uses_index(queryset, 'assessment_subject_type_idx'))
+
+
+    def test_lesson_filter_uses_index(self):
+        '''Test filtering assessments by lesson uses (lesson, type) index.'''
+        queryset = Assessment.objects.filter(lesson=self.lesson)
+        self.assertTrue(uses_index(queryset, 'assessment_lesson_type_idx'))
+
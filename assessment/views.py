@@ -10,7 +10,7 @@ from utils.mixins import (
     CancelLinkMixin, ModelNameMixin,
     OwnershipRequiredMixin, DerivedFieldsMixin
 )
-from utils.query_filters import apply_sorting, apply_date_range_filter_if_valid
+from utils.query_filters import apply_sorting, apply_date_range_filter_if_valid, filter_by_field
 from utils.sidebar_context import (
     SidebarSectionsMixin, SidebarStateMixin,
     section
@@ -44,19 +44,19 @@ class AssessmentListView(LoginRequiredMixin, SidebarStateMixin,
         '''
         Return assessments of the user sending requests
         '''
-        queryset = super().get_queryset().filter(derived_user_id=self.request.user.id)
+        queryset = filter_by_field(super().get_queryset(), 'derived_user_id', exact=self.request.user.id)
         GET = self.request.GET
         filter_config = build_assessment_filters(user=self.request.user)
         sort_config = build_assessment_sorting()
 
         if subject_filter := GET.get('subject'):
-            queryset = queryset.filter(derived_subject_id=subject_filter)
+            queryset = filter_by_field(queryset, 'derived_subject_id', exact=subject_filter)
         
         if lesson_filter := GET.get('lesson'):
             queryset = queryset.filter(lesson=lesson_filter)
 
         if type_filter := GET.get('type'):
-            queryset = queryset.filter(type__iexact=type_filter)
+            queryset = queryset.filter(type=type_filter.upper())
 
         
         if duration_filter := GET.get('duration'):
@@ -0,0 +1,108 @@
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+
+from lesson.series import get_user_series, iter_occurrences, parse_occurrence_key
+from utils.query_filters import field_q
+
+from .month_calendar import EVENT_TIME_FIELDS, EVENT_TYPES, describe_event, get_user_events
+
+CURSOR_SEPARATOR = '_'
+
+
+def encode_cursor(event):
+    '''
+    Returns cursor pointing right after the (type, pk, description, time) event.
+    '''
+    event_type, pk, _, time = event
+    return CURSOR_SEPARATOR.join([time.isoformat(), event_type, str(pk)])
+
+
+def decode_cursor(cursor):
+    '''
+    Returns (time, type, pk) from a cursor, or raises ValueError.
+    Pk of an expanded lesson occurrence is its key.
+    '''
+    time, event_type, pk = cursor.rsplit(CURSOR_SEPARATOR, 2)
+    time = datetime.fromisoformat(time)
+
+    if event_type not in EVENT_TYPES or time.tzinfo is None:
+        raise ValueError(f'Invalid cursor: "{cursor}"')
+
+    if event_type == 'lesson' and not pk.isdigit():
+        parse_occurrence_key(pk)
+        return time, event_type, pk
+
+    return time, event_type, int(pk)
+
+
+def get_order(event):
+    '''
+    Returns key ordering (type, pk, description, time) events by
+    (time, type, pk). Expanded occurrences, which have keys instead
+    of pks, come after lessons at the same time.
+    '''
+    event_type, pk, _, time = event
+    return time, EVENT_TYPES.index(event_type), isinstance(pk, str), pk
+
+
+def after_cursor_q(model, event_type, time_field, cursor):
+    '''
+    Returns Q object matching events of the given type that come
+    after the cursor in (time, type, pk) order.
+    '''
+    cursor_time, cursor_type, cursor_pk = cursor
+    type_order = EVENT_TYPES.index(event_type) - EVENT_TYPES.index(cursor_type)
+
+    if type_order < 0 or (type_order == 0 and isinstance(cursor_pk, str)):
+        return field_q(model, time_field, gt=cursor_time)
+    if type_order > 0:
+        return field_q(model, time_field, gte=cursor_time)
+    return (
+        field_q(model, time_field, gt=cursor_time) |
+        (field_q(model, time_field, exact=cursor_time) & Q(pk__gt=cursor_pk))
+    )
+
+
+def describe_events(event_type, queryset):
+    for event in queryset:
+        yield describe_event(event_type, event)
+
+
+def get_agenda(user, cursor, limit):
+    '''
+    Returns up to limit events of the user coming after the cursor
+    (time, type, pk), as (type, pk, description, time) tuples in
+    chronological order, and whether there are more of them.
+
+    Each model is queried once, ordered and limited to limit + 1 rows,
+    and the results are merged lazily with a k-way merge, so the cost
+    depends on the page size, not on the number of user's events.
+    Expanded occurrences of lesson series are merged as another
+    stream of lessons, which expands the series lazily too
+    (see iter_occurrences()).
+    '''
+    cursor_time, cursor_type, cursor_pk = cursor
+    cursor_order = get_order((cursor_type, cursor_pk, None, cursor_time))
+    streams = [(
+        event for event in describe_events('lesson', iter_occurrences(get_user_series(user), cursor_time))
+        if get_order(event) > cursor_order
+    )]
+
+    for event_type, queryset in get_user_events(user).items():
+        time_field = EVENT_TIME_FIELDS[event_type]
+        queryset = (
+            queryset
+            .filter(after_cursor_q(queryset.model, event_type, time_field, cursor))
+            .order_by(time_field, 'pk')
+        )
+        streams.append(describe_events(event_type, queryset[:limit + 1]))
+
+    events = list(islice(
+        heapq.merge(*streams, key=get_order),
+        limit + 1
+    ))
+
+    return events[:limit], len(events) > limit
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils.timezone import make_aware, get_current_timezone
+
+from lesson.models import Lesson
+from lesson.series import get_occurrences, get_user_series
+from assessment.models import Assessment
+
+from utils.constants import MAX_LESSON_DURATION, MAX_ASSESSMENT_DURATION, UNKNOWN_ASSESSMENT_DURATION
+from utils.query_filters import filter_by_field
+
+DAY = timedelta(days=1)
+
+
+def get_busy_intervals(user, start, end):
+    '''
+    Returns unsorted (start, end) intervals of user's lessons (including
+    expanded occurrences of lesson series) and assessments overlapping
+    the range between aware datetimes start and end, loading only their
+    times with one query per model.
+    Events started before the range are found by widening the start
+    time filter by the model's maximum duration, which keeps it indexed.
+    '''
+    lessons = (
+        Lesson.objects
+        .filter(subject__user=user, start_time__gte=start - MAX_LESSON_DURATION, start_time__lt=end)
+        .values_list('start_time', 'duration')
+    )
+
+    assessments = filter_by_field(Assessment.objects.with_derived_fields(), 'derived_user_id', exact=user.id)
+    assessments = filter_by_field(
+        assessments, 'derived_start_time', gte=start - MAX_ASSESSMENT_DURATION, lt=end
+    ).values_list('derived_start_time', Coalesce(F('derived_duration'), UNKNOWN_ASSESSMENT_DURATION))
+
+    occurrences = [
+        (occurrence.start_time, occurrence.duration)
+        for occurrence in get_occurrences(get_user_series(user), start - MAX_LESSON_DURATION, end)
+    ]
+
+    return [
+        (event_start, event_start + duration)
+        for queryset in [lessons, assessments, occurrences]
+        for event_start, duration in queryset
+        if event_start + duration > start
+    ]
+
+
+def merge_intervals(intervals):
+    '''
+    Returns union of (start, end) intervals as a sorted list
+    of disjoint intervals, in O(n log n).
+    '''
+    merged = []
+
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def find_free_slots(busy, start, end, min_length, day_start, day_end):
+    '''
+    Returns sorted (start, end) windows of at least min_length between
+    aware datetimes start and end, limited to local day_start..day_end
+    times of each day, that don't overlap merged busy intervals.
+    Walks days and busy intervals once, in O(n + days).
+    '''
+    timezone = get_current_timezone()
+    free_slots = []
+    busy_index = 0
+    date = start.astimezone(timezone).date()
+
+    while (day_window_start := make_aware(datetime.combine(date, day_start), timezone)) < end:
+        window_start = max(day_window_start, start)
+        window_end = min(make_aware(datetime.combine(date, day_end), timezone), end)
+        date += DAY
+
+        # Busy intervals ended before the window can't affect later ones either.
+        while busy_index < len(busy) and busy[busy_index][1] <= window_start:
+            busy_index += 1
+
+        index = busy_index
+        while window_start < window_end:
+            if index < len(busy) and busy[index][0] < window_end:
+                slot_end = busy[index][0]
+                next_start = busy[index][1]
+                index += 1
+            else:
+                slot_end = next_start = window_end
+
+            if slot_end - window_start >= min_length:
+                free_slots.append((window_start, slot_end))
+            window_start = max(window_start, next_start)
+
+    return free_slots
+
+
+def get_free_slots(user, start, end, min_length, day_start, day_end):
+    '''
+    Returns user's free windows of at least min_length between aware
+    datetimes start and end within local day bounds, see find_free_slots().
+    '''
+    busy = merge_intervals(get_busy_intervals(user, start, end))
+    return find_free_slots(busy, start, end, min_length, day_start, day_end)
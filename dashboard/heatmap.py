@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localtime
+
+from lesson.series import get_occurrences, get_user_series
+
+from .models import EventTimeline
+from .month_calendar import EVENT_TYPES
+
+
+def get_daily_event_counts(user, start, end):
+    '''
+    Returns a dict mapping local dates to numbers of lessons,
+    assessments and homework due on that date (in EVENT_TYPES order),
+    for events between aware datetimes start (inclusive) and end (exclusive).
+    Uses one GROUP BY query of the user's range of the event timeline.
+    Expanded occurrences of user's lesson series are counted as lessons.
+    Days without events are omitted.
+    '''
+    counts = (
+        EventTimeline.objects
+        .filter(user=user, starts_at__gte=start, starts_at__lt=end)
+        .annotate(day=TruncDate('starts_at'))
+        .values('day', 'event_type')
+        .annotate(count=Count('pk'))
+        .order_by()
+        .values_list('day', 'event_type', 'count')
+    )
+
+    days = defaultdict(lambda: [0] * len(EVENT_TYPES))
+
+    for day, event_type, count in counts:
+        days[day][EVENT_TYPES.index(event_type)] = count
+
+    for occurrence in get_occurrences(get_user_series(user), start, end):
+        days[localtime(occurrence.start_time).date()][0] += 1
+
+    return dict(sorted(days.items()))
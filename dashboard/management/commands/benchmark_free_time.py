@@ -0,0 +1,84 @@
+import time
+from datetime import datetime, timedelta, time as datetime_time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import localtime, make_aware, now
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+from userprofile.models import UserProfile
+
+from utils.constants import FREE_TIME_DAY_START, FREE_TIME_DAY_END
+
+from dashboard.free_time import get_free_slots
+
+SUBJECTS = 15
+SEMESTER = timedelta(weeks=26)
+LESSON_SLOTS = [datetime_time(hour) for hour in range(8, 20, 2)]
+
+
+class Command(BaseCommand):
+    help = 'Measures finding free time of a student over a semester'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lessons-per-week', type=int, default=30, help='Number of lessons a week')
+        parser.add_argument('--min-length', type=int, default=120, help='Minimal free window length in minutes')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, start = create_semester(options['lessons_per_week'])
+
+            started = time.perf_counter()
+            slots = get_free_slots(
+                user,
+                start,
+                start + SEMESTER,
+                timedelta(minutes=options['min_length']),
+                FREE_TIME_DAY_START,
+                FREE_TIME_DAY_END,
+            )
+            elapsed = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Found {len(slots)} free windows over a semester in {elapsed * 1000:.1f}ms')
+
+
+def create_semester(lessons_per_week):
+    '''
+    Creates user with a weekly timetable repeated for a semester starting
+    next Monday, and an assessment for every tenth lesson.
+    Returns the user and start of the semester.
+    '''
+    user = User.objects.create_user(username=f'benchmark_{time.time_ns()}')
+    UserProfile.objects.create(user=user)
+
+    subjects = Subject.objects.all().bulk_create(
+        Subject(user=user, name=f'Subject {i}') for i in range(SUBJECTS)
+    )
+
+    today = localtime(now()).date()
+    monday = today + timedelta(days=7 - today.weekday())
+    start = make_aware(datetime.combine(monday, datetime_time.min))
+
+    lessons = Lesson.objects.all().bulk_create(
+        Lesson(
+            subject=subjects[i % SUBJECTS],
+            start_time=make_aware(datetime.combine(
+                monday + timedelta(weeks=week, days=i % 5),
+                LESSON_SLOTS[i // 5 % len(LESSON_SLOTS)],
+            )),
+            duration=timedelta(minutes=90),
+        )
+        for week in range(SEMESTER.days // 7)
+        for i in range(lessons_per_week)
+    )
+
+    Assessment.objects.all().bulk_create(
+        Assessment(lesson=lesson) for lesson in lessons[::10]
+    )
+
+    return user, start
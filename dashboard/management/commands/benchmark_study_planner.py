@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from subject.models import Subject
+from homework.models import Homework
+
+from dashboard.models import StudyBlock
+from dashboard.study_planner import replan_study_blocks
+
+from .benchmark_free_time import SEMESTER, create_semester
+
+
+class Command(BaseCommand):
+    help = 'Measures planning study blocks for homework of a student over a semester'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--homework', type=int, default=300, help='Number of homework items')
+        parser.add_argument('--lessons-per-week', type=int, default=30, help='Number of lessons a week')
+
+    def handle(self, *args, **options):
+        homework_count = options['homework']
+
+        with transaction.atomic():
+            user, start = create_semester(options['lessons_per_week'])
+            subjects = list(Subject.objects.filter(user=user))
+            step = SEMESTER / homework_count
+
+            Homework.objects.all().bulk_create(
+                Homework(
+                    subject=subjects[i % len(subjects)],
+                    task='Task',
+                    start_time=start + i * step,
+                    due_at=start + i * step + timedelta(days=7),
+                    effort=timedelta(minutes=30 + i % 8 * 30),
+                    completion_percent=i % 4 * 25,
+                )
+                for i in range(homework_count)
+            )
+
+            started = time.perf_counter()
+            unfit = replan_study_blocks(user)
+            elapsed = time.perf_counter() - started
+            blocks = StudyBlock.objects.filter(user=user).count()
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'Planned {homework_count} homework items into {blocks} study blocks '
+            f'({len(unfit)} not fitting) in {elapsed * 1000:.1f}ms'
+        )
@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dashboard.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Recreates event timeline rows of lessons, assessments and homework'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='Id of user to rebuild (all users by default)')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+
+        if options['user']:
+            users = users.filter(pk__in=options['user'])
+
+        with transaction.atomic():
+            rows = rebuild_timeline(users)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} timeline rows.'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('homework', '0009_homework_effort'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudyBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('homework', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='study_blocks', to='homework.homework')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'study_block',
+                'ordering': ['start_time'],
+                'indexes': [models.Index(fields=['user', 'start_time'], name='study_block_user_start_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+UNKNOWN_ASSESSMENT_DURATION = timedelta(hours=1)
+
+
+def fill_timeline(apps, schema_editor):
+    '''
+    Adds timeline rows of existing events, see dashboard.timeline.
+    '''
+    EventTimeline = apps.get_model('dashboard', 'EventTimeline')
+    Lesson = apps.get_model('lesson', 'Lesson')
+    Assessment = apps.get_model('assessment', 'Assessment')
+    Homework = apps.get_model('homework', 'Homework')
+
+    sources = [
+        ('lesson', Lesson.objects.annotate(
+            user_id=models.F('subject__user'), starts_at=models.F('start_time'),
+        ).values_list('pk', 'user_id', 'subject_id', 'starts_at', 'duration', 'scheduled_reminder_time', 'reminder_sent')),
+        ('assessment', Assessment.objects.annotate(
+            user_id=Coalesce('subject__user', 'lesson__subject__user'),
+            derived_subject_id=Coalesce('subject', 'lesson__subject'),
+            starts_at=Coalesce('start_time', 'lesson__start_time'),
+            derived_duration=Coalesce('duration', 'lesson__duration'),
+        ).values_list('pk', 'user_id', 'derived_subject_id', 'starts_at', 'derived_duration', 'scheduled_reminder_time', 'reminder_sent')),
+        ('homework', Homework.objects.annotate(
+            user_id=Coalesce('subject__user', 'lesson_given__subject__user', 'lesson_due__subject__user'),
+            derived_subject_id=Coalesce('subject', 'lesson_given__subject', 'lesson_due__subject'),
+            starts_at=Coalesce('due_at', 'lesson_due__start_time'),
+        ).values_list('pk', 'user_id', 'derived_subject_id', 'starts_at', 'starts_at', 'scheduled_reminder_time', 'reminder_sent')),
+    ]
+
+    for event_type, rows in sources:
+        EventTimeline.objects.bulk_create(
+            (
+                EventTimeline(
+                    event_type=event_type, event_id=pk, user_id=user_id, subject_id=subject_id, starts_at=starts_at,
+                    ends_at=end if event_type == 'homework' else starts_at + (end or UNKNOWN_ASSESSMENT_DURATION),
+                    reminder_at=reminder_at, reminder_sent=reminder_sent,
+                )
+                for pk, user_id, subject_id, starts_at, end, reminder_at, reminder_sent in rows.iterator(chunk_size=BATCH_SIZE)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('subject', '0004_alter_subject_user'),
+        ('lesson', '0012_lesson_lesson_duration_range_and_more'),
+        ('assessment', '0012_assessment_assessment_duration_range_and_more'),
+        ('homework', '0011_homework_cascade_with_lessons'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTimeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('lesson', 'Lesson'), ('assessment', 'Assessment'), ('homework', 'Homework')], max_length=10)),
+                ('event_id', models.BigIntegerField()),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('reminder_at', models.DateTimeField(blank=True, null=True)),
+                ('reminder_sent', models.BooleanField(default=False)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='subject.subject')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'event_timeline',
+                'indexes': [models.Index(fields=['user', 'starts_at'], name='event_timeline_user_start_idx'), models.Index(condition=models.Q(('reminder_sent', False)), fields=['reminder_at'], name='event_timeline_reminder_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event_type', 'event_id'), name='event_timeline_event_unique')],
+            },
+        ),
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
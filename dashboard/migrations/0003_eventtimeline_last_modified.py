@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_last_modified(apps, schema_editor):
+    '''
+    Copies last modified time of events to their timeline rows.
+    '''
+    EventTimeline = apps.get_model('dashboard', 'EventTimeline')
+
+    for event_type, model_name in [('lesson', 'lesson.Lesson'), ('assessment', 'assessment.Assessment'), ('homework', 'homework.Homework')]:
+        model = apps.get_model(model_name)
+        EventTimeline.objects.filter(event_type=event_type).update(
+            last_modified=models.Subquery(model.objects.filter(pk=models.OuterRef('event_id')).values('last_modified')[:1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_event_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventtimeline',
+            name='last_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_last_modified, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='eventtimeline',
+            index=models.Index(fields=['user', 'last_modified'], name='event_timeline_user_mod_idx'),
+        ),
+    ]
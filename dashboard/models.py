@@ -1,3 +1,66 @@
+from django.contrib.auth.models import User
 from django.db import models
 
-# Create your models here.
+from subject.models import Subject
+from homework.models import Homework
+
+
+class StudyBlock(models.Model):
+    '''
+    Time planned for working on homework, see study_planner.
+    '''
+
+    class Meta:
+        db_table = 'study_block'
+        ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['user', 'start_time'], name='study_block_user_start_idx'),
+        ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False) # covered by study_block_user_start_idx
+    homework = models.ForeignKey(Homework, on_delete=models.CASCADE, related_name='study_blocks')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+
+    def __str__(self):
+        return f'Study block for {self.homework_id} from {self.start_time} to {self.end_time}'
+
+
+class EventTimeline(models.Model):
+    '''
+    Row of a lesson, assessment or homework with its derived time, owner
+    and reminder, so that features reading events of all models (like
+    the heatmap and the scheduler) use one index. Kept in sync with
+    the events by signals and bulk operations, see timeline.
+    Homework takes place at its due. Last modified time of events
+    is copied too, for finding changes of a user (see sync.changes).
+    '''
+
+    class Meta:
+        db_table = 'event_timeline'
+        indexes = [
+            models.Index(fields=['user', 'starts_at'], name='event_timeline_user_start_idx'),
+            models.Index(fields=['reminder_at'], condition=models.Q(reminder_sent=False), name='event_timeline_reminder_idx'),
+            models.Index(fields=['user', 'last_modified'], name='event_timeline_user_mod_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['event_type', 'event_id'], name='event_timeline_event_unique'),
+        ]
+
+    class EventType(models.TextChoices):
+        LESSON = 'lesson', 'Lesson'
+        ASSESSMENT = 'assessment', 'Assessment'
+        HOMEWORK = 'homework', 'Homework'
+
+    event_type = models.CharField(max_length=10, choices=EventType)
+    event_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False) # covered by event_timeline_user_start_idx
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, db_index=False) # rows are deleted with subjects by user too
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    reminder_at = models.DateTimeField(blank=True, null=True)
+    reminder_sent = models.BooleanField(default=False)
+    last_modified = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.event_type} {self.event_id} at {self.starts_at}'
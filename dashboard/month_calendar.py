@@ -0,0 +1,179 @@
+import calendar
+from collections import defaultdict
+from datetime import date as datetime_date, timedelta
+
+from django.core.cache import cache
+from django.db.models.functions import Coalesce
+from django.utils.timezone import localtime
+
+from lesson.models import Lesson
+from lesson.series import get_occurrence_key, get_occurrences, get_user_series
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.constants import CALENDAR_CACHE_TIMEOUT
+from utils.data_version import get_data_version
+from utils.query_filters import filter_by_field, get_timeframe_bounds
+
+CALENDAR_CACHE_KEY = 'calendar_events:{user_id}:{year}:{month}:{version}'
+
+EVENT_TIME_FIELDS = {
+    'lesson': 'start_time',
+    'assessment': 'derived_start_time',
+    'homework': 'derived_due_at',
+}
+EVENT_TYPES = list(EVENT_TIME_FIELDS)
+
+
+def get_month_days(year, month):
+    '''
+    Returns a list of all days in the specified month as date objects.
+    '''
+    start_of_month = datetime_date(year, month, 1)
+    num_days = calendar.monthrange(year, month)[-1]
+    return [start_of_month + timedelta(days=n) for n in range(num_days)]
+
+
+def get_user_events(user):
+    '''
+    Returns a dict mapping event types to querysets of all lessons,
+    assessments and homework of the user, with everything
+    describe_event() needs selected or annotated.
+    '''
+    assessments = filter_by_field(
+        Assessment.objects.with_derived_fields().annotate(
+            derived_subject_name=Coalesce('subject__name', 'lesson__subject__name')
+        ),
+        'derived_user_id',
+        exact=user.id
+    )
+
+    homeworks = filter_by_field(
+        Homework.objects.with_derived_fields().annotate(
+            derived_subject_name=Coalesce(
+                'subject__name', 'lesson_given__subject__name', 'lesson_due__subject__name'
+            )
+        ),
+        'derived_user_id',
+        exact=user.id
+    )
+
+    return {
+        'lesson': Lesson.objects.filter(subject__user=user).select_related('subject'),
+        'assessment': assessments,
+        'homework': homeworks,
+    }
+
+
+def describe_event(event_type, event):
+    '''
+    Returns (type, pk, description, time) of an event
+    from get_user_events() querysets, or an expanded lesson
+    occurrence, which has its key instead of pk.
+    '''
+    pk = event.id
+    if event_type == 'lesson':
+        description = f'{event.subject} {event.get_type_display()}'
+        if event.is_occurrence:
+            pk = get_occurrence_key(event)
+    elif event_type == 'assessment':
+        description = f'{event.derived_subject_name} {event.get_type_display()}'
+    else:
+        description = f'{event.derived_subject_name} Homework'
+
+    return event_type, pk, description, getattr(event, EVENT_TIME_FIELDS[event_type])
+
+
+def get_month_events(user, year, month):
+    '''
+    Returns lessons, assessments and homework of the user
+    taking place in the specified month (in local time),
+    fetched with one query per model. Lessons include expanded
+    occurrences of user's lesson series (see get_occurrences()).
+    '''
+    start, end = get_timeframe_bounds('month', datetime_date(year, month, 1))
+
+    lessons, assessments, homeworks = [
+        filter_by_field(queryset, EVENT_TIME_FIELDS[event_type], gte=start, lt=end)
+        for event_type, queryset in get_user_events(user).items()
+    ]
+
+    return [*lessons, *get_occurrences(get_user_series(user), start, end)], assessments, homeworks
+
+
+def get_calendar_events(user, year, month):
+    '''
+    Returns a dict mapping days of the month to a list of
+    all lessons, assessments and homeworks user has on that day,
+    sorted by time. Days without events are omitted.
+    '''
+    lessons, assessments, homeworks = get_month_events(user, year, month)
+
+    days = defaultdict(lambda: ([], [], []))
+
+    for index, (events, time_field) in enumerate(zip(
+        [lessons, assessments, homeworks], EVENT_TIME_FIELDS.values()
+    )):
+        for event in events:
+            day = localtime(getattr(event, time_field)).day
+            days[day][index].append(event)
+
+    return {
+        day: combine_and_sort_by_time(*day_events)
+        for day, day_events in sorted(days.items())
+    }
+
+
+def get_calendar_cache_key(user, year, month):
+    return CALENDAR_CACHE_KEY.format(
+        user_id=user.id, year=year, month=month, version=get_data_version(user.id)
+    )
+
+
+def get_cached_calendar_events(user, year, month):
+    '''
+    Returns get_calendar_events() result from cache,
+    computing and caching it on a miss. Cache keys include
+    user's data version, so any change of their events
+    makes the cached calendars stale.
+    '''
+    key = get_calendar_cache_key(user, year, month)
+    calendar_events = cache.get(key)
+
+    if calendar_events is None:
+        calendar_events = get_calendar_events(user, year, month)
+        cache.set(key, calendar_events, CALENDAR_CACHE_TIMEOUT.total_seconds())
+
+    return calendar_events
+
+
+def prefetch_calendar_events(user, months):
+    '''
+    Computes and caches calendar events of the given (year, month)
+    pairs that are not cached yet, so that navigating to them is
+    a cache hit. Returns the computed months.
+    '''
+    keys = {get_calendar_cache_key(user, year, month): (year, month) for year, month in months}
+    missing = [keys[key] for key in keys.keys() - cache.get_many(keys).keys()]
+
+    for year, month in missing:
+        get_cached_calendar_events(user, year, month)
+
+    return missing
+
+
+def combine_and_sort_by_time(lessons, assessments, homeworks):
+    '''
+    Combines and sorts assessments, lessons, and homework items
+    by their datetime field.
+    Expects events from get_user_events() querysets.
+    '''
+
+    event_date = []
+
+    event_date += [describe_event('lesson', lesson) for lesson in lessons]
+    event_date += [describe_event('assessment', assessment) for assessment in assessments]
+    event_date += [describe_event('homework', homework) for homework in homeworks]
+
+    sorted_events = sorted(event_date, key=lambda x: x[-1])
+    return [(type, pk, description) for type, pk, description, _ in sorted_events]
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries, LessonSeriesException
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.accessors import get_owner_id
+from utils.constants import UNKNOWN_ASSESSMENT_DURATION
+from utils.data_version import bump_data_version
+from utils.query_filters import get_local_midnight
+
+from .models import EventTimeline, StudyBlock
+from .study_planner import replan_after_change
+from .timeline import SOURCE_FIELDS, sync_lesson_dependents, sync_timeline
+
+
+def only_reminder_sent_updated(update_fields):
+    return bool(update_fields) and update_fields <= {'reminder_sent'}
+
+
+def bump_owner_data_version(sender, instance, **kwargs):
+    '''
+    Invalidates cached calendars of the user whose subject
+    or event was saved or deleted. Marking reminders as sent
+    doesn't change calendars, so such saves are skipped.
+    Bumped on commit, so that calendars computed from
+    uncommitted data are not cached under the new version.
+    '''
+    if only_reminder_sent_updated(kwargs.get('update_fields')):
+        return
+
+    if user_id := get_owner_id(instance):
+        transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+def replan_owner_study_blocks(sender, instance, update_fields=None, created=False, **kwargs):
+    '''
+    Replans study blocks of the user whose event was saved, up to
+    the end of the event (or due of homework, or the last lesson
+    of a series), and wherever blocks of homework due at the saved
+    lesson or of the saved homework are.
+    '''
+    if only_reminder_sent_updated(update_fields):
+        return
+
+    if isinstance(instance, Lesson) and created and instance.series_id:
+        # Materialised occurrence was already planned around as expanded.
+        return
+
+    if isinstance(instance, LessonSeries):
+        until = get_local_midnight(instance.end_date + timedelta(days=1)) + instance.duration
+        affected_blocks = None
+    elif isinstance(instance, LessonSeriesException):
+        occurrence = instance.series.get_occurrence(instance.date)
+        until = occurrence.start_time + occurrence.duration
+        affected_blocks = None
+    elif isinstance(instance, Lesson):
+        until = instance.start_time + instance.duration
+        affected_blocks = StudyBlock.objects.filter(homework__lesson_due=instance)
+    elif isinstance(instance, Assessment):
+        duration = instance.duration or (instance.lesson and instance.lesson.duration) or UNKNOWN_ASSESSMENT_DURATION
+        until = instance.derived_start_time_prop + duration
+        affected_blocks = None
+    else:
+        until = instance.derived_due_at_prop
+        affected_blocks = StudyBlock.objects.filter(homework=instance)
+
+    if user_id := get_owner_id(instance):
+        transaction.on_commit(lambda: replan_after_change(user_id, until, affected_blocks))
+
+
+def sync_saved_event(sender, instance, update_fields=None, created=False, **kwargs):
+    '''
+    Syncs timeline row of the saved event, and of events linked to
+    the saved lesson, which take their time and subject from it.
+    Saves of fields rows are not derived from are skipped.
+    '''
+    event_type = sender.__name__.lower()
+
+    if update_fields and not update_fields & SOURCE_FIELDS[event_type]:
+        return
+
+    if only_reminder_sent_updated(update_fields):
+        EventTimeline.objects.filter(event_type=event_type, event_id=instance.pk).update(reminder_sent=instance.reminder_sent)
+        return
+
+    sync_timeline(event_type, [instance.pk])
+
+    if isinstance(instance, Lesson) and not created:
+        sync_lesson_dependents([instance.pk])
+
+
+def remove_deleted_event(sender, instance, **kwargs):
+    EventTimeline.objects.filter(event_type=sender.__name__.lower(), event_id=instance.pk).delete()
+
+
+for model in [Subject, Lesson, LessonSeries, LessonSeriesException, Assessment, Homework]:
+    post_save.connect(bump_owner_data_version, sender=model, dispatch_uid=f'bump_data_version_on_{model.__name__}_save')
+    post_delete.connect(bump_owner_data_version, sender=model, dispatch_uid=f'bump_data_version_on_{model.__name__}_delete')
+
+for model in [Lesson, LessonSeries, LessonSeriesException, Assessment, Homework]:
+    post_save.connect(replan_owner_study_blocks, sender=model, dispatch_uid=f'replan_study_blocks_on_{model.__name__}_save')
+
+for model in [Lesson, Assessment, Homework]:
+    post_save.connect(sync_saved_event, sender=model, dispatch_uid=f'sync_timeline_on_{model.__name__}_save')
+    post_delete.connect(remove_deleted_event, sender=model, dispatch_uid=f'sync_timeline_on_{model.__name__}_delete')
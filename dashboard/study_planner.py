@@ -0,0 +1,225 @@
+import heapq
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils.timezone import now
+
+from homework.models import Homework
+
+from utils.constants import (
+    DEFAULT_HOMEWORK_EFFORT, MIN_STUDY_BLOCK_LENGTH,
+    FREE_TIME_DAY_START, FREE_TIME_DAY_END
+)
+from utils.query_filters import filter_by_field
+
+from .free_time import get_free_slots, merge_intervals
+from .models import StudyBlock
+
+
+def get_remaining_effort(effort, completion_percent):
+    '''
+    Returns time still needed for homework with given effort
+    estimate (or the default one) and completion percent.
+    '''
+    return (effort or DEFAULT_HOMEWORK_EFFORT) * (100 - completion_percent) / 100
+
+
+def get_open_homework(user, start):
+    '''
+    Returns (homework_id, release, due, remaining effort) of user's
+    homework that is not completed and is due after start.
+    Work on homework can't be planned before it's given (or before start).
+    '''
+    homeworks = filter_by_field(Homework.objects.with_derived_fields(), 'derived_user_id', exact=user.id)
+    homeworks = (
+        filter_by_field(homeworks, 'derived_due_at', gt=start)
+        .filter(completion_percent__lt=100)
+        .values_list('id', 'derived_start_time', 'derived_due_at', 'effort', 'completion_percent')
+    )
+
+    return [
+        (homework_id, max(given_at or start, start), due_at, get_remaining_effort(effort, completion_percent))
+        for homework_id, given_at, due_at, effort, completion_percent in homeworks
+    ]
+
+
+def schedule_edf(jobs, free_slots):
+    '''
+    Schedules (homework_id, release, due, remaining effort) jobs into sorted
+    free (start, end) slots, always working on the released job with the
+    earliest due date (preemptive EDF, optimal for meeting due dates on a
+    single worker), in O((jobs + slots) log jobs).
+
+    Returns a tuple of:
+        - (homework_id, start, end) blocks in time order,
+        - {homework_id: effort} of jobs that couldn't fit before their due,
+        - (start, end) periods when all released work is done (or overdue),
+          ending with the next release (None if there is none). Schedule
+          after such period doesn't depend on jobs released before it.
+    '''
+    jobs = sorted(jobs, key=lambda job: job[1])
+    remaining = {homework_id: effort for homework_id, _, _, effort in jobs}
+    released = []       # (due, homework_id) heap
+    next_job = 0
+    blocks = []
+    idle_periods = []
+
+    def add_idle_period(time):
+        next_release = jobs[next_job][1] if next_job < len(jobs) else None
+        if not idle_periods or idle_periods[-1][1] != next_release:
+            idle_periods.append((time, next_release))
+
+    for slot_start, slot_end in free_slots:
+        time = slot_start
+
+        while time < slot_end:
+            while next_job < len(jobs) and jobs[next_job][1] <= time:
+                homework_id, _, due, _ = jobs[next_job]
+                heapq.heappush(released, (due, homework_id))
+                next_job += 1
+
+            while released and released[0][0] <= time:
+                heapq.heappop(released)
+
+            if not released:
+                add_idle_period(time)
+                if next_job < len(jobs) and jobs[next_job][1] < slot_end:
+                    time = jobs[next_job][1]
+                    continue
+                break
+
+            due, homework_id = released[0]
+            block_end = min(slot_end, time + remaining[homework_id], due)
+            if next_job < len(jobs):
+                # Job released meanwhile might be due earlier.
+                block_end = min(block_end, jobs[next_job][1])
+
+            if blocks and blocks[-1][0] == homework_id and blocks[-1][2] == time:
+                blocks[-1] = (homework_id, blocks[-1][1], block_end)
+            else:
+                blocks.append((homework_id, time, block_end))
+
+            remaining[homework_id] -= block_end - time
+            if not remaining[homework_id]:
+                heapq.heappop(released)
+                if not released:
+                    add_idle_period(block_end)
+            time = block_end
+
+        if next_job == len(jobs) and not released:
+            break
+
+    unfit = {homework_id: effort for homework_id, effort in remaining.items() if effort}
+    return blocks, unfit, idle_periods
+
+
+def find_window_end(idle_periods, until, old_blocks, releases):
+    '''
+    Returns the first moment not before until, when the new schedule
+    is idle, and the old plan had no work in progress either (no block
+    ending after it of homework released before it), or None if there
+    isn't any. Old plan after such moment can be kept as it is.
+    '''
+    in_progress = merge_intervals(
+        (releases.get(homework_id, start), end) for homework_id, start, end in old_blocks
+    )
+    index = 0
+
+    for idle_start, idle_end in idle_periods:
+        time = max(idle_start, until)
+
+        while index < len(in_progress) and in_progress[index][1] <= time:
+            index += 1
+        if index < len(in_progress) and in_progress[index][0] < time:
+            time = in_progress[index][1]
+
+        if idle_end is None or time <= idle_end:
+            return time
+
+    return None
+
+
+def replan_study_blocks(user, until=None):
+    '''
+    Plans user's open homework into free time from now on and persists
+    the plan as study blocks. Returns {homework_id: effort} of homework
+    that can't be fit before its due.
+
+    If until is given, only the part of the plan up to the first moment
+    after until, from which the old plan stays valid, is replaced
+    (see find_window_end()), so small edits rewrite only the affected window.
+    '''
+    start = now()
+
+    with transaction.atomic():
+        # Serializes replanning of the same user.
+        User.objects.select_for_update().filter(pk=user.pk).first()
+
+        jobs = get_open_homework(user, start)
+        old_blocks = StudyBlock.objects.filter(user=user, end_time__gt=start)
+
+        if not jobs:
+            old_blocks.delete()
+            return {}
+
+        free_slots = get_free_slots(
+            user, start, max(due for _, _, due, _ in jobs),
+            MIN_STUDY_BLOCK_LENGTH, FREE_TIME_DAY_START, FREE_TIME_DAY_END,
+        )
+        blocks, unfit, idle_periods = schedule_edf(jobs, free_slots)
+
+        window_end = None
+        if until is not None:
+            releases = {homework_id: release for homework_id, release, _, _ in jobs}
+            window_end = find_window_end(
+                idle_periods, until, old_blocks.values_list('homework_id', 'start_time', 'end_time'), releases
+            )
+
+        if window_end is not None:
+            old_blocks = old_blocks.filter(start_time__lt=window_end)
+            blocks = [block for block in blocks if block[1] < window_end]
+
+        old_blocks.delete()
+        StudyBlock.objects.bulk_create(
+            StudyBlock(user=user, homework_id=homework_id, start_time=block_start, end_time=block_end)
+            for homework_id, block_start, block_end in blocks
+        )
+
+    return unfit
+
+
+def get_study_plan(user):
+    '''
+    Returns user's planned study blocks from now on, and
+    {homework_id: effort} of open homework that is not fully planned.
+    '''
+    start = now()
+    blocks = list(StudyBlock.objects.filter(user=user, end_time__gt=start).select_related('homework'))
+    unplanned = {homework_id: effort for homework_id, _, _, effort in get_open_homework(user, start)}
+
+    for block in blocks:
+        if block.homework_id in unplanned:
+            unplanned[block.homework_id] -= block.end_time - block.start_time
+
+    return blocks, {homework_id: effort for homework_id, effort in unplanned.items() if effort > timedelta()}
+
+
+def replan_after_change(user_id, until, affected_blocks=None):
+    '''
+    Replans study blocks of the user after a change of their
+    timetable or homework that affects time up to until.
+    Affected existing blocks (e.g. of the changed homework)
+    are replanned too, wherever they are. Users who haven't
+    planned their study (have no blocks) are skipped.
+    '''
+    if not StudyBlock.objects.filter(user=user_id).exists():
+        return
+
+    if affected_blocks is not None:
+        last_affected_end = affected_blocks.aggregate(Max('end_time'))['end_time__max']
+        if last_affected_end is not None:
+            until = max(until, last_affected_end)
+
+    replan_study_blocks(User(pk=user_id), until)
@@ -1,3 +1,731 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localtime, make_aware, now
+from django.contrib.auth.models import User
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries
+from assessment.models import Assessment
+from homework.models import Homework
+from userprofile.models import UserProfile
+from lesson.shift import shift_lessons
+from notification.scheduler import send_notifications
+from utils.query_plan import uses_index
+
+from .agenda import decode_cursor, get_agenda
+from .free_time import get_free_slots, merge_intervals
+from .models import EventTimeline, StudyBlock
+from .study_planner import replan_study_blocks, schedule_edf
+from .timeline import rebuild_timeline
+from .heatmap import get_daily_event_counts
+from .week_calendar import get_week_calendar, pack_columns
+from .month_calendar import get_calendar_events, get_cached_calendar_events, prefetch_calendar_events
+
+
+def local_datetime(day, hour=12, minute=0):
+    return make_aware(datetime.combine(day, time(hour, minute)))
+
+
+@override_settings(CALENDAR_PREFETCH_ADJACENT_MONTHS=False)
+class DashboardTestCase(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile and subject, and a month in the future.'''
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Calculus')
+
+        next_month = (localtime(now()).date().replace(day=1) + timedelta(days=32)).replace(day=1)
+        self.year, self.month = next_month.year, next_month.month
+
+    def day(self, day):
+        return date(self.year, self.month, day)
+
+    def add_lessons(self, *start_times):
+        return Lesson.objects.all().bulk_create(
+            Lesson(subject=self.subject, start_time=start_time, duration=timedelta(minutes=90))
+            for start_time in start_times
+        )
+
+
+class CalendarEventsTests(DashboardTestCase):
+
+    def test_events_grouped_by_local_day_and_sorted(self):
+        '''Test events of every model are grouped by local day and sorted by time.'''
+        lesson, = self.add_lessons(local_datetime(self.day(3), hour=10))
+        assessment, = Assessment.objects.all().bulk_create([
+            Assessment(subject=self.subject, start_time=local_datetime(self.day(3), hour=8))
+        ])
+        lesson_assessment, = Assessment.objects.all().bulk_create([Assessment(lesson=lesson)])
+        homework, = Homework.objects.all().bulk_create([
+            Homework(subject=self.subject, task='Task', due_at=local_datetime(self.day(5), hour=23, minute=59))
+        ])
+
+        events = get_calendar_events(self.user, self.year, self.month)
+
+        self.assertEqual(
+            [(event_type, pk) for event_type, pk, _ in events[3]],
+            [('assessment', assessment.pk), ('lesson', lesson.pk), ('assessment', lesson_assessment.pk)],
+        )
+        self.assertEqual(events[5], [('homework', homework.pk, 'Calculus Homework')])
+        self.assertEqual(set(events), {3, 5})
+
+
+    def test_events_outside_month_excluded(self):
+        '''Test events starting at local midnight after the month are excluded.'''
+        last_day = (self.day(1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        lesson, _ = self.add_lessons(
+            local_datetime(last_day, hour=23, minute=30),
+            local_datetime(last_day + timedelta(days=1), hour=0),
+        )
+
+        events = get_calendar_events(self.user, self.year, self.month)
+
+        self.assertEqual(events, {last_day.day: [('lesson', lesson.pk, f'Calculus {lesson.get_type_display()}')]})
+
+
+    def test_other_users_events_excluded(self):
+        '''Test events of other users are not included.'''
+        other_user = User.objects.create_user(username='otheruser')
+        other_subject = Subject.objects.create(user=other_user, name='Calculus')
+        Lesson.objects.all().bulk_create([
+            Lesson(subject=other_subject, start_time=local_datetime(self.day(1)), duration=timedelta(minutes=90))
+        ])
+
+        self.assertEqual(get_calendar_events(self.user, self.year, self.month), {})
+
+
+    def test_one_query_per_model(self):
+        '''Test calendar events are fetched with one query per model regardless of event density.'''
+        lessons = self.add_lessons(*(local_datetime(self.day(day % 28 + 1), hour=day % 12 + 8) for day in range(60)))
+        Assessment.objects.all().bulk_create(Assessment(lesson=lesson) for lesson in lessons[:20])
+        Homework.objects.all().bulk_create(Homework(lesson_due=lesson, task='Task') for lesson in lessons[:20])
+
+        with self.assertNumQueries(4):
+            get_calendar_events(self.user, self.year, self.month)
+
+
+class DashboardViewTests(DashboardTestCase):
+
+    def get_dashboard(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'), params)
+        return response, len(queries)
+
+
+    def test_date_param_selects_month(self):
+        '''Test date GET param selects displayed month and navigation dates.'''
+        lesson, = self.add_lessons(local_datetime(self.day(10)))
+
+        response, _ = self.get_dashboard(date=self.day(15).isoformat())
+
+        self.assertEqual(response.context['year'], self.year)
+        self.assertEqual(response.context['calendar_events'][10][0][:2], ('lesson', lesson.pk))
+        self.assertEqual(response.context['next_date'], (self.day(1) + timedelta(days=32)).replace(day=1).isoformat())
+        self.assertEqual(response.context['previous_date'], (self.day(1) - timedelta(days=1)).replace(day=1).isoformat())
+
+
+    def test_months_at_ends_of_date_range(self):
+        '''Test months at the ends of the date range aren't linked past it, or show the current month if they can't be queried.'''
+        for date_param, link in [('0001-01-01', 'previous_date'), ('9999-12-15', 'next_date')]:
+            response, _ = self.get_dashboard(date=date_param)
+
+            self.assertEqual(response.status_code, 200)
+            if response.context['year'] != localtime(now()).year:
+                self.assertIsNone(response.context[link])
+
+        self.assertEqual(self.get_dashboard(date='9999-11-15')[0].context['next_date'], '9999-12-01')
+
+
+    def test_invalid_date_param_falls_back_to_today(self):
+        '''Test invalid date GET param shows the current month.'''
+        response, _ = self.get_dashboard(date='not-a-date', mode='unknown')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['year'], localtime(now()).year)
+        self.assertEqual(response.context['mode'], 'month')
+
+
+    def test_query_count_does_not_depend_on_event_density(self):
+        '''Test rendering dashboard costs the same number of queries for any number of events.'''
+        self.add_lessons(local_datetime(self.day(1)))
+        _, sparse_queries = self.get_dashboard(date=self.day(1).isoformat())
+        cache.clear()
+
+        lessons = self.add_lessons(*(local_datetime(self.day(day % 28 + 1), hour=day % 12 + 8) for day in range(90)))
+        Homework.objects.all().bulk_create(Homework(lesson_due=lesson, task='Task') for lesson in lessons)
+        _, dense_queries = self.get_dashboard(date=self.day(1).isoformat())
+
+        self.assertEqual(sparse_queries, dense_queries)
+
+
+    def test_series_occurrences_shown_as_lessons(self):
+        '''Test occurrences of lesson series are shown in month and week views, linking to occurrence pages.'''
+        series = LessonSeries.objects.create(
+            subject=self.subject,
+            start_time=local_datetime(self.day(1), hour=9),
+            duration=timedelta(minutes=90),
+            end_date=self.day(14),
+        )
+        occurrence_url = reverse('lesson_occurrence', args=[series.pk, self.day(8).isoformat()])
+
+        response, _ = self.get_dashboard(date=self.day(1).isoformat())
+        self.assertEqual(response.context['calendar_events'][8], [('lesson', f'{series.pk}:{self.day(8).isoformat()}', 'Calculus Lecture')])
+        self.assertContains(response, occurrence_url)
+
+        response, _ = self.get_dashboard(date=self.day(8).isoformat(), mode='week')
+        self.assertContains(response, occurrence_url)
+
+
+class CalendarCacheTests(DashboardTestCase):
+
+    def test_cached_calendar_reused(self):
+        '''Test calendar of the same month is computed once.'''
+        lesson, = self.add_lessons(local_datetime(self.day(2)))
+        get_cached_calendar_events(self.user, self.year, self.month)
+
+        with self.assertNumQueries(0):
+            calendar_events = get_cached_calendar_events(self.user, self.year, self.month)
+
+        self.assertEqual(calendar_events[2][0][:2], ('lesson', lesson.pk))
+
+
+    def test_event_save_invalidates_cache(self):
+        '''Test saving an event makes cached calendar of its user stale.'''
+        get_cached_calendar_events(self.user, self.year, self.month)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = Lesson.objects.create(
+                subject=self.subject, start_time=local_datetime(self.day(4)), duration=timedelta(minutes=90)
+            )
+
+        calendar_events = get_cached_calendar_events(self.user, self.year, self.month)
+        self.assertEqual(calendar_events[4][0][:2], ('lesson', lesson.pk))
+
+
+    def test_subject_delete_invalidates_cache(self):
+        '''Test bulk deleting subject makes cached calendar of its user stale.'''
+        self.add_lessons(local_datetime(self.day(4)))
+        get_cached_calendar_events(self.user, self.year, self.month)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subject.delete()
+
+        self.assertEqual(get_cached_calendar_events(self.user, self.year, self.month), {})
+
+
+    def test_reminder_sent_update_keeps_cache(self):
+        '''Test marking reminder as sent doesn't invalidate cached calendar.'''
+        lesson, = self.add_lessons(local_datetime(self.day(4)))
+        get_cached_calendar_events(self.user, self.year, self.month)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            lesson.reminder_sent = True
+            lesson.save(update_fields=['reminder_sent'])
+
+        self.assertEqual(callbacks, [])
+
+
+    def test_prefetch_computes_missing_months(self):
+        '''Test prefetching computes and caches only months not cached yet.'''
+        months = [(self.year, self.month), (self.year + 1, self.month)]
+        get_cached_calendar_events(self.user, *months[0])
+
+        self.assertEqual(prefetch_calendar_events(self.user, months), months[1:])
+
+        with self.assertNumQueries(0):
+            get_cached_calendar_events(self.user, *months[1])
+
+
+    def test_prefetch_skipped_when_cached(self):
+        '''Test prefetching doesn't query events when all months are cached.'''
+        get_cached_calendar_events(self.user, self.year, self.month)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(prefetch_calendar_events(self.user, [(self.year, self.month)]), [])
+
+
+class HeatmapTests(DashboardTestCase):
+
+    def test_counts_grouped_by_local_date(self):
+        '''Test events are counted per local date of each model's time with one timeline query.'''
+        lessons = self.add_lessons(
+            local_datetime(self.day(1), hour=0, minute=30),
+            local_datetime(self.day(1), hour=23, minute=30),
+            local_datetime(self.day(2)),
+        )
+        Assessment.objects.all().bulk_create([Assessment(lesson=lessons[2])])
+        Homework.objects.all().bulk_create([
+            Homework(lesson_given=lessons[0], lesson_due=lessons[2], task='Task'),
+            Homework(subject=self.subject, due_at=local_datetime(self.day(1)), task='Task'),
+        ])
+        rebuild_timeline(User.objects.filter(pk=self.user.pk))
+
+        with self.assertNumQueries(2):
+            counts = get_daily_event_counts(
+                self.user, local_datetime(self.day(1), hour=0), local_datetime(self.day(3), hour=0)
+            )
+
+        self.assertEqual(counts, {self.day(1): [2, 0, 1], self.day(2): [1, 1, 1]})
+
+
+    def test_view_returns_inclusive_range(self):
+        '''Test heatmap view includes events of the end date.'''
+        self.add_lessons(local_datetime(self.day(1)), local_datetime(self.day(5)), local_datetime(self.day(6)))
+        rebuild_timeline(User.objects.filter(pk=self.user.pk))
+
+        response = self.client.get(
+            reverse('dashboard_heatmap'), {'start': self.day(1).isoformat(), 'end': self.day(5).isoformat()}
+        )
+
+        self.assertEqual(response.json(), {
+            'types': ['lesson', 'assessment', 'homework'],
+            'days': {self.day(1).isoformat(): [1, 0, 0], self.day(5).isoformat(): [1, 0, 0]},
+        })
+
+
+    def test_view_rejects_invalid_range(self):
+        '''Test heatmap view rejects missing, reversed, too long and out of range ranges.'''
+        for params in [
+            {'start': self.day(1).isoformat()},
+            {'start': self.day(5).isoformat(), 'end': self.day(1).isoformat()},
+            {'start': self.day(1).isoformat(), 'end': self.day(1).replace(year=self.year + 2).isoformat()},
+            {'start': '9999-12-31', 'end': '9999-12-31'},
+        ]:
+            response = self.client.get(reverse('dashboard_heatmap'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class AgendaTests(DashboardTestCase):
+
+    def setUp(self):
+        '''Create interleaved events of all models, some of them at the same time.'''
+        super().setUp()
+        self.lessons = self.add_lessons(
+            local_datetime(self.day(2)), local_datetime(self.day(1)), local_datetime(self.day(3))
+        )
+        self.assessments = Assessment.objects.all().bulk_create([
+            Assessment(lesson=self.lessons[0]),
+            Assessment(subject=self.subject, start_time=local_datetime(self.day(1), hour=9)),
+        ])
+        self.homeworks = Homework.objects.all().bulk_create([
+            Homework(lesson_due=self.lessons[0], task='Task'),
+            Homework(subject=self.subject, due_at=local_datetime(self.day(2)), task='Task'),
+        ])
+        self.start = (local_datetime(self.day(1), hour=0), 'lesson', 0)
+
+
+    def test_events_merged_chronologically(self):
+        '''Test events are merged by time, then by type and id.'''
+        events, has_more = get_agenda(self.user, self.start, limit=10)
+
+        self.assertEqual([(event_type, pk) for event_type, pk, _, _ in events], [
+            ('assessment', self.assessments[1].pk),
+            ('lesson', self.lessons[1].pk),
+            ('lesson', self.lessons[0].pk),
+            ('assessment', self.assessments[0].pk),
+            ('homework', self.homeworks[0].pk),
+            ('homework', self.homeworks[1].pk),
+            ('lesson', self.lessons[2].pk),
+        ])
+        self.assertFalse(has_more)
+
+
+    def test_pages_continue_from_cursor(self):
+        '''Test paging through the cursor returns every event exactly once with one query per model and series per page.'''
+        all_events, _ = get_agenda(self.user, self.start, limit=10)
+
+        paged_events = []
+        params = {'limit': 2, 'after': f'{self.start[0].isoformat()}_lesson_0'}
+        while params['after']:
+            with self.assertNumQueries(4):
+                events, has_more = get_agenda(self.user, decode_cursor(params['after']), limit=2)
+            response = self.client.get(reverse('dashboard_agenda'), params)
+            paged_events += [(event['type'], event['id']) for event in response.json()['events']]
+            params['after'] = response.json()['next']
+
+        self.assertEqual(paged_events, [(event_type, pk) for event_type, pk, _, _ in all_events])
+
+
+    def test_agenda_starts_from_now(self):
+        '''Test agenda without cursor doesn't include past events.'''
+        self.add_lessons(now() - timedelta(hours=1))
+
+        response = self.client.get(reverse('dashboard_agenda'), {'limit': 1})
+
+        self.assertEqual(response.json()['events'][0]['id'], self.assessments[1].pk)
+
+
+    def test_series_occurrences_merged_and_paged(self):
+        '''Test expanded occurrences of series come after lessons at the same time and are paged through by their keys.'''
+        series, = LessonSeries.objects.all().bulk_create([
+            LessonSeries(subject=self.subject, start_time=local_datetime(self.day(1)), duration=timedelta(minutes=90), end_date=self.day(8)),
+        ])
+        keys = [f'{series.pk}:{self.day(day).isoformat()}' for day in [1, 8]]
+
+        events, _ = get_agenda(self.user, self.start, limit=10)
+        events = [(event_type, pk) for event_type, pk, _, _ in events]
+
+        self.assertEqual(events[1:3], [('lesson', self.lessons[1].pk), ('lesson', keys[0])])
+        self.assertEqual(events[-1], ('lesson', keys[1]))
+
+        paged_events = []
+        params = {'limit': 1, 'after': f'{self.start[0].isoformat()}_lesson_0'}
+        while params['after']:
+            response = self.client.get(reverse('dashboard_agenda'), params)
+            paged_events += [(event['type'], event['id']) for event in response.json()['events']]
+            params['after'] = response.json()['next']
+
+        self.assertEqual(paged_events, events)
+
+
+    def test_series_expanded_only_up_to_limit(self):
+        '''Test long series are expanded only as far as the page reaches, merged by time and key.'''
+        series_list = LessonSeries.objects.all().bulk_create([
+            LessonSeries(subject=self.subject, start_time=local_datetime(self.day(4)), duration=timedelta(minutes=90), end_date=self.day(4).replace(year=self.year + 50))
+            for _ in range(2)
+        ])
+        cursor = (local_datetime(self.day(4), hour=0), 'lesson', 0)
+
+        with patch.object(LessonSeries, 'get_occurrence', autospec=True, side_effect=LessonSeries.get_occurrence) as get_occurrence:
+            events, has_more = get_agenda(self.user, cursor, limit=2)
+
+        self.assertEqual([pk for _, pk, _, _ in events], sorted(f'{series.pk}:{self.day(4).isoformat()}' for series in series_list))
+        self.assertTrue(has_more)
+        self.assertLessEqual(get_occurrence.call_count, 4)
+
+
+    def test_invalid_cursor_rejected(self):
+        '''Test agenda view rejects malformed cursors.'''
+        for cursor in ['', 'now_lesson_1', f'{self.start[0].isoformat()}_subject_1']:
+            response = self.client.get(reverse('dashboard_agenda'), {'after': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+class WeekCalendarTests(DashboardTestCase):
+
+    def test_pack_columns(self):
+        '''Test overlapping intervals get separate columns and stretch over free ones.'''
+        layout = pack_columns([(0, 10), (0, 3), (0, 3), (4, 10), (20, 21), (10, 12)])
+
+        self.assertEqual(layout, [(0, 1, 3), (1, 1, 3), (2, 1, 3), (1, 2, 3), (0, 1, 1), (0, 1, 1)])
+
+
+    def test_pack_columns_dense_week(self):
+        '''Test columns never overlap and don't exceed the maximum number of simultaneous intervals.'''
+        intervals = [(start, start + 90) for start in range(0, 60 * 45, 45)]
+        layout = pack_columns(intervals)
+
+        for (start, end), (column, span, columns) in zip(intervals, layout):
+            self.assertLessEqual(column + span, columns)
+            self.assertEqual(columns, 2)
+            for (other_start, other_end), (other_column, other_span, _) in zip(intervals, layout):
+                if (start, end) != (other_start, other_end) and start < other_end and other_start < end:
+                    self.assertFalse(set(range(column, column + span)) & set(range(other_column, other_column + other_span)))
+
+
+    def test_overlapping_events_laid_out_side_by_side(self):
+        '''Test overlapping lesson and assessment of a day share its width.'''
+        lesson, = self.add_lessons(local_datetime(self.day(1), hour=6))
+        assessment, = Assessment.objects.all().bulk_create([
+            Assessment(subject=self.subject, start_time=local_datetime(self.day(1), hour=7))
+        ])
+        homework, = Homework.objects.all().bulk_create([
+            Homework(subject=self.subject, due_at=local_datetime(self.day(1), hour=7), task='Task')
+        ])
+        week_start = self.day(1) - timedelta(days=self.day(1).weekday())
+
+        with self.assertNumQueries(4):
+            week = get_week_calendar(self.user, week_start)
+
+        day = week[self.day(1).weekday()]
+        self.assertEqual(day['homework'], [('homework', homework.pk, 'Calculus Homework')])
+        self.assertEqual(
+            [(event['pk'], event['top'], event['height'], event['left'], event['width']) for event in day['events']],
+            [(lesson.pk, 25.0, 6.25, 0.0, 50.0), (assessment.pk, 29.17, 4.17, 50.0, 50.0)],
+        )
+
+
+    def test_event_past_midnight_split_between_days(self):
+        '''Test event lasting past midnight is shown on both days.'''
+        monday = self.day(1) + timedelta(days=-self.day(1).weekday() % 7)
+        self.add_lessons(local_datetime(monday, hour=23))
+
+        week = get_week_calendar(self.user, monday)
+
+        first_day, second_day = [day for day in week if day['events']]
+        self.assertEqual((first_day['events'][0]['top'], first_day['events'][0]['height']), (95.83, 4.17))
+        self.assertEqual((second_day['events'][0]['top'], second_day['events'][0]['height']), (0.0, 2.08))
+
+
+    def test_week_mode(self):
+        '''Test week mode shows the week of the date and navigates by weeks.'''
+        response = self.client.get(reverse('dashboard'), {'mode': 'week', 'date': self.day(10).isoformat()})
+
+        week_start = self.day(10) - timedelta(days=self.day(10).weekday())
+        self.assertEqual(response.context['week_start'], week_start)
+        self.assertEqual(len(response.context['week']), 7)
+        self.assertEqual(response.context['next_date'], (week_start + timedelta(days=7)).isoformat())
+
+
+    def test_weeks_at_ends_of_date_range(self):
+        '''Test weeks at the ends of the date range aren't linked past it, or show the current week if they can't be queried.'''
+        for date_param, link in [('0001-01-03', 'previous_date'), ('9999-12-30', 'next_date')]:
+            response = self.client.get(reverse('dashboard'), {'mode': 'week', 'date': date_param})
+
+            self.assertEqual(response.status_code, 200)
+            if response.context['week_start'].year != localtime(now()).year:
+                self.assertIsNone(response.context[link])
+
+
+class FreeTimeTests(DashboardTestCase):
+
+    def test_merge_intervals(self):
+        '''Test overlapping and touching intervals are merged.'''
+        self.assertEqual(
+            merge_intervals([(5, 7), (1, 3), (2, 4), (4, 5), (9, 10)]),
+            [(1, 7), (9, 10)],
+        )
+
+
+    def test_free_slots_between_events(self):
+        '''Test free windows avoid lessons and assessments, respect day bounds and minimal length.'''
+        self.add_lessons(local_datetime(self.day(1), hour=9), local_datetime(self.day(1), hour=10))
+        Assessment.objects.all().bulk_create([
+            Assessment(subject=self.subject, start_time=local_datetime(self.day(1), hour=14), duration=timedelta(minutes=30)),
+            Assessment(subject=self.subject, start_time=local_datetime(self.day(1), hour=15)),
+        ])
+
+        with self.assertNumQueries(3):
+            slots = get_free_slots(
+                self.user,
+                local_datetime(self.day(1), hour=0),
+                local_datetime(self.day(3), hour=0),
+                timedelta(minutes=60),
+                time(8),
+                time(20),
+            )
+
+        self.assertEqual(slots, [
+            (local_datetime(self.day(1), hour=8), local_datetime(self.day(1), hour=9)),
+            (local_datetime(self.day(1), hour=11, minute=30), local_datetime(self.day(1), hour=14)),
+            (local_datetime(self.day(1), hour=16), local_datetime(self.day(1), hour=20)),
+            (local_datetime(self.day(2), hour=8), local_datetime(self.day(2), hour=20)),
+        ])
+
+
+    def test_event_started_before_range_is_busy(self):
+        '''Test event started before the range but lasting in it is taken into account.'''
+        self.add_lessons(local_datetime(self.day(1), hour=23))
+
+        slots = get_free_slots(
+            self.user,
+            local_datetime(self.day(2), hour=0),
+            local_datetime(self.day(3), hour=0),
+            timedelta(minutes=15),
+            time(0),
+            time(2),
+        )
+
+        self.assertEqual(slots, [(local_datetime(self.day(2), hour=0, minute=30), local_datetime(self.day(2), hour=2))])
+
+
+    def test_view(self):
+        '''Test free time view returns windows and validates params.'''
+        response = self.client.get(reverse('dashboard_free_time'), {
+            'start': self.day(1).isoformat(), 'end': self.day(1).isoformat(),
+            'min_length': 120, 'day_start': '09:00', 'day_end': '12:00',
+        })
+        self.assertEqual(response.json(), {'slots': [[
+            local_datetime(self.day(1), hour=9).isoformat(), local_datetime(self.day(1), hour=12).isoformat()
+        ]]})
+
+        for params in [
+            {'min_length': 0}, {'day_start': '12:00', 'day_end': '09:00'}, {'day_end': '25:00'},
+            {'start': '9999-12-31'}, {'min_length': 10 ** 15},
+        ]:
+            response = self.client.get(reverse('dashboard_free_time'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class StudyPlannerTests(DashboardTestCase):
+
+    def add_homework(self, given_day, given_hour, due_day, due_hour, effort, completion_percent=0):
+        homework, = Homework.objects.all().bulk_create([Homework(
+            subject=self.subject,
+            task='Task',
+            start_time=local_datetime(self.day(given_day), hour=given_hour),
+            due_at=local_datetime(self.day(due_day), hour=due_hour),
+            effort=effort,
+            completion_percent=completion_percent,
+        )])
+        return homework
+
+    def get_blocks(self):
+        return [
+            (block.homework_id, localtime(block.start_time).day, localtime(block.start_time).hour, localtime(block.end_time).hour)
+            for block in StudyBlock.objects.filter(user=self.user)
+        ]
+
+
+    def test_schedule_edf(self):
+        '''Test job due earlier preempts released work and overdue work is reported.'''
+        blocks, unfit, idle_periods = schedule_edf(
+            [('a', 0, 10, 4), ('b', 2, 5, 2), ('c', 12, 14, 5)],
+            [(0, 3), (4, 10), (12, 20)],
+        )
+
+        self.assertEqual(blocks, [('a', 0, 2), ('b', 2, 3), ('b', 4, 5), ('a', 5, 7), ('c', 12, 14)])
+        self.assertEqual(unfit, {'c': 3})
+        self.assertEqual(idle_periods, [(7, 12), (14, None)])
+
+
+    def test_blocks_planned_in_free_time_before_due(self):
+        '''Test remaining effort is planned around lessons before due, ordered by due.'''
+        self.add_lessons(local_datetime(self.day(1), hour=9))
+        late = self.add_homework(1, 8, 2, 12, timedelta(hours=4), completion_percent=50)
+        early = self.add_homework(1, 8, 1, 12, timedelta(hours=2))
+
+        unfit = replan_study_blocks(self.user)
+
+        self.assertEqual(unfit, {})
+        self.assertEqual(self.get_blocks(), [
+            (early.pk, 1, 8, 9),
+            (early.pk, 1, 10, 11),
+            (late.pk, 1, 11, 13),
+        ])
+
+
+    def test_unfit_homework_reported(self):
+        '''Test homework without enough free time before due is reported with missing effort.'''
+        homework = self.add_homework(1, 8, 1, 10, timedelta(hours=3))
+
+        unfit = replan_study_blocks(self.user)
+
+        self.assertEqual(unfit, {homework.pk: timedelta(hours=1)})
+        response = self.client.get(reverse('dashboard_study_plan'))
+        self.assertEqual(response.json()['unplanned'], [{'homework': homework.pk, 'minutes': 60}])
+        self.assertEqual(len(response.json()['blocks']), 1)
+
+
+    def test_small_edit_replans_affected_window_only(self):
+        '''Test changing homework rewrites blocks up to its due, and keeps the later plan.'''
+        first = self.add_homework(1, 8, 1, 12, timedelta(hours=2))
+        later = self.add_homework(2, 8, 2, 12, timedelta(hours=2))
+        replan_study_blocks(self.user)
+        later_block_ids = list(StudyBlock.objects.filter(homework=later).values_list('pk', flat=True))
+
+        first.completion_percent = 50
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+
+        self.assertEqual(self.get_blocks(), [(first.pk, 1, 8, 9), (later.pk, 2, 8, 10)])
+        self.assertEqual(list(StudyBlock.objects.filter(homework=later).values_list('pk', flat=True)), later_block_ids)
+
+
+
+    def test_edit_without_study_plan_doesnt_replan(self):
+        '''Test changing homework of a user without study blocks doesn't plan them.'''
+        homework = self.add_homework(1, 8, 1, 12, timedelta(hours=2))
+
+        homework.completion_percent = 50
+        with self.captureOnCommitCallbacks(execute=True):
+            homework.save()
+
+        self.assertFalse(StudyBlock.objects.exists())
+
+
+class ConflictsViewTests(DashboardTestCase):
+
+    def test_conflicts_view_returns_overlapping_pairs(self):
+        '''Test conflicts endpoint returns pairs of overlapping lessons and assessments as JSON.'''
+        lesson, _ = self.add_lessons(local_datetime(self.day(3), hour=10), local_datetime(self.day(4), hour=10))
+        assessment, = Assessment.objects.all().bulk_create([
+            Assessment(subject=self.subject, start_time=local_datetime(self.day(3), hour=11), duration=timedelta(hours=1))
+        ])
+
+        response = self.client.get(reverse('dashboard_conflicts'))
+
+        self.assertEqual(
+            [[(event['type'], event['id']) for event in pair] for pair in response.json()['conflicts']],
+            [[('lesson', lesson.pk), ('assessment', assessment.pk)]],
+        )
+
+
+class EventTimelineTests(DashboardTestCase):
+
+    def timeline_rows(self):
+        return list(
+            EventTimeline.objects.order_by('event_type', 'event_id')
+            .values_list('event_type', 'event_id', 'user', 'subject', 'starts_at', 'ends_at', 'reminder_at', 'reminder_sent', 'last_modified')
+        )
+
+
+    def test_timeline_follows_saves_and_deletes(self):
+        '''Test saving a lesson syncs rows of events linked to it, and deleting it removes them.'''
+        lesson = Lesson.objects.create(subject=self.subject, start_time=local_datetime(self.day(1)), duration=timedelta(minutes=90))
+        Assessment.objects.create(lesson=lesson)
+        Homework.objects.create(lesson_due=lesson, task='Task')
+
+        lesson.start_time = local_datetime(self.day(2))
+        lesson.save()
+
+        self.assertEqual(
+            list(EventTimeline.objects.order_by('event_type').values_list('event_type', 'user', 'starts_at', 'ends_at')),
+            [
+                ('assessment', self.user.pk, lesson.start_time, lesson.start_time + lesson.duration),
+                ('homework', self.user.pk, lesson.start_time, lesson.start_time),
+                ('lesson', self.user.pk, lesson.start_time, lesson.start_time + lesson.duration),
+            ]
+        )
+
+        lesson.delete()
+        self.assertFalse(EventTimeline.objects.exists())
+
+
+    def test_bulk_changes_keep_timeline_in_sync(self):
+        '''Test bulk creating and shifting lessons leaves the same timeline rows as rebuilding it.'''
+        lessons = Lesson.objects.bulk_create(
+            Lesson(subject=self.subject, start_time=local_datetime(self.day(day)), duration=timedelta(minutes=90))
+            for day in [1, 2]
+        )
+        Homework.objects.create(lesson_due=lessons[1], task='Task')
+
+        shift_lessons(self.user, Lesson.objects.filter(pk__in=[lesson.pk for lesson in lessons]), timedelta(hours=2))
+        synced = self.timeline_rows()
+        rebuild_timeline(User.objects.filter(pk=self.user.pk))
+
+        self.assertEqual(len(synced), 3)
+        self.assertEqual(synced, self.timeline_rows())
+
+
+    def test_scheduler_sends_reminders_found_in_timeline(self):
+        '''Test scheduler finds due reminders with the partial index of the timeline and marks them as sent.'''
+        User.objects.filter(pk=self.user.pk).update(email='user@example.com')
+        UserProfile.objects.filter(user=self.user).update(notification_method=UserProfile.NotificationMethod.EMAIL)
+        Lesson.objects.all().bulk_create([
+            Lesson(
+                subject=self.subject, start_time=now() + timedelta(hours=1), duration=timedelta(minutes=90),
+                scheduled_reminder_time=now() - timedelta(minutes=1),
+            )
+        ])
+        rebuild_timeline(User.objects.filter(pk=self.user.pk))
+
+        self.assertTrue(uses_index(
+            EventTimeline.objects.filter(reminder_at__lte=now(), reminder_sent=False), 'event_timeline_reminder_idx'
+        ))
+
+        send_notifications()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(EventTimeline.objects.get().reminder_sent)
+        self.assertTrue(Lesson.objects.get().reminder_sent)
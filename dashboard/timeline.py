@@ -0,0 +1,136 @@
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce
+
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.bulk_copy import insert_from_select
+from utils.bulk_delete import raw_delete
+from utils.constants import UNKNOWN_ASSESSMENT_DURATION
+from utils.query_filters import field_q
+
+from .models import EventTimeline
+
+TIMELINE_MODELS = {
+    'lesson': Lesson,
+    'assessment': Assessment,
+    'homework': Homework,
+}
+# Fields of events their timeline rows are derived from.
+SOURCE_FIELDS = {
+    'lesson': {'subject', 'start_time', 'duration', 'scheduled_reminder_time', 'reminder_sent', 'last_modified'},
+    'assessment': {'subject', 'lesson', 'start_time', 'duration', 'scheduled_reminder_time', 'reminder_sent', 'last_modified'},
+    'homework': {'subject', 'lesson_given', 'lesson_due', 'due_at', 'scheduled_reminder_time', 'reminder_sent', 'last_modified'},
+}
+USER_FIELDS = {
+    'lesson': 'subject__user',
+    'assessment': 'derived_user_id',
+    'homework': 'derived_user_id',
+}
+
+
+def end_time(start, duration):
+    return ExpressionWrapper(F(start) + duration, output_field=DateTimeField())
+
+
+def get_timeline_source(event_type):
+    '''
+    Returns (queryset of events of the type, {timeline field: expression})
+    selecting timeline rows of the events.
+    '''
+    if event_type == 'lesson':
+        return Lesson.objects.all(), {
+            'user': F('subject__user'),
+            'subject': F('subject'),
+            'starts_at': F('start_time'),
+            'ends_at': end_time('start_time', F('duration')),
+        }
+
+    if event_type == 'assessment':
+        return Assessment.objects.with_derived_fields(), {
+            'user': F('derived_user_id'),
+            'subject': F('derived_subject_id'),
+            'starts_at': F('derived_start_time'),
+            'ends_at': end_time(
+                'derived_start_time',
+                Coalesce('derived_duration', Value(UNKNOWN_ASSESSMENT_DURATION), output_field=DurationField())
+            ),
+        }
+
+    return Homework.objects.with_derived_fields(), {
+        'user': F('derived_user_id'),
+        'subject': F('derived_subject_id'),
+        'starts_at': F('derived_due_at'),
+        'ends_at': F('derived_due_at'),
+    }
+
+
+def insert_timeline(event_type, *filters):
+    '''
+    Inserts timeline rows of events of the type matching filters
+    with one INSERT ... SELECT. Returns the number of them.
+    '''
+    source, values = get_timeline_source(event_type)
+
+    return insert_from_select(EventTimeline, source.filter(*filters), {
+        'event_type': Value(event_type),
+        'event_id': F('pk'),
+        **values,
+        'reminder_at': F('scheduled_reminder_time'),
+        'reminder_sent': F('reminder_sent'),
+        'last_modified': F('last_modified'),
+    })
+
+
+def sync_timeline(event_type, pks):
+    '''
+    Replaces timeline rows of events of the type with the given pks
+    (a list or a values queryset) with their current values, with one
+    DELETE and one INSERT ... SELECT. Rows of deleted events are removed.
+    For changes not sending post_save or post_delete signals, like
+    bulk inserts and updates, which must call it in their transaction.
+    '''
+    raw_delete(EventTimeline.objects.filter(event_type=event_type, event_id__in=pks))
+    insert_timeline(event_type, Q(pk__in=pks))
+
+
+def sync_lesson_dependents(lesson_pks):
+    '''
+    Syncs timeline rows of assessments and homework taking
+    their time or subject from the lessons (see sync_timeline()).
+    '''
+    sync_timeline('assessment', Assessment.objects.filter(lesson__in=lesson_pks).values('pk'))
+    sync_timeline('homework', Homework.objects.filter(Q(lesson_given__in=lesson_pks) | Q(lesson_due__in=lesson_pks)).values('pk'))
+
+
+def add_to_timeline(event_type, pks):
+    '''
+    Adds timeline rows of new events of the type with the given pks
+    inserted without post_save signals, with one INSERT ... SELECT.
+    '''
+    insert_timeline(event_type, Q(pk__in=pks))
+
+
+def sync_created(objs):
+    '''
+    Adds timeline rows of events (of one model) inserted
+    without post_save signals. Other objects are ignored.
+    '''
+    for event_type, model in TIMELINE_MODELS.items():
+        if objs and isinstance(objs[0], model):
+            add_to_timeline(event_type, [obj.pk for obj in objs])
+
+
+def rebuild_timeline(users):
+    '''
+    Recreates timeline rows of all events of the users in the queryset,
+    after changes that don't maintain them, or to repair drift.
+    Returns the number of rows.
+    '''
+    raw_delete(EventTimeline.objects.filter(user__in=users))
+
+    return sum(
+        insert_timeline(event_type, field_q(TIMELINE_MODELS[event_type], user_field, **{'in': users}))
+        for event_type, user_field in USER_FIELDS.items()
+    )
@@ -1,6 +1,11 @@
 from django.urls import path
-from .views import DashboardView
+from .views import AgendaView, ConflictsView, DashboardView, FreeTimeView, HeatmapView, StudyPlanView
 
 urlpatterns = [
     path(route='', view=DashboardView.as_view(), name='dashboard'),
+    path(route='agenda/', view=AgendaView.as_view(), name='dashboard_agenda'),
+    path(route='free-time/', view=FreeTimeView.as_view(), name='dashboard_free_time'),
+    path(route='study-plan/', view=StudyPlanView.as_view(), name='dashboard_study_plan'),
+    path(route='conflicts/', view=ConflictsView.as_view(), name='dashboard_conflicts'),
+    path(route='heatmap/', view=HeatmapView.as_view(), name='dashboard_heatmap'),
 ]
\ No newline at end of file
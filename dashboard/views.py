@@ -1,15 +1,33 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.timezone import localtime, now
 from django.views import View
 
-from lesson.models import Lesson
-from assessment.models import Assessment
-from homework.models import Homework
+from utils.constants import (
+    AGENDA_PAGE_SIZE, MAX_AGENDA_PAGE_SIZE, MAX_HEATMAP_RANGE,
+    DEFAULT_FREE_SLOT_LENGTH, FREE_TIME_DAY_START, FREE_TIME_DAY_END, MAX_FREE_TIME_RANGE
+)
+from utils.counters import get_totals
+from utils.query_filters import get_local_midnight
+from utils.time_conflicts import find_all_conflicts
 
-from utils.query_filters import filter_by_date_range
+from .agenda import decode_cursor, encode_cursor, get_agenda
+from .free_time import get_free_slots
+from .heatmap import get_daily_event_counts
+from .study_planner import get_study_plan, replan_study_blocks
+from .month_calendar import EVENT_TYPES, get_cached_calendar_events, prefetch_calendar_events
+from .week_calendar import get_week_calendar
 
-from datetime import date as datetime_date, timedelta
+from datetime import date as datetime_date, datetime, timedelta
 import calendar
+import math
+
+DATE_PARAM_FORMAT = '%Y-%m-%d'
+TIME_PARAM_FORMAT = '%H:%M'
+VALID_MODES = ['month', 'week']
+DEFAULT_MODE = 'month'
 
 
 class DashboardView(LoginRequiredMixin, View):
@@ -20,72 +38,240 @@ class DashboardView(LoginRequiredMixin, View):
 
         GET = self.request.GET
         mode = GET.get('mode')
-        date = GET.get('date')
+        date = parse_date_param(GET.get('date'))
 
-        today = datetime_date.today()
-        # year = today.year
-        # month = today.month
-        # month_name = calendar.month_name[month]
-        # month_calendar = calendar.monthcalendar(year, month)
+        if mode not in VALID_MODES:
+            mode = DEFAULT_MODE
 
-        # calendar_events = get_calendar_events(user, get_month_days(year, month))
+        get_context = self.get_week_context if mode == 'week' else self.get_month_context
 
-        context = { 
-            # 'year': year,
-            # 'month': month_name,
-            # 'calendar': month_calendar,
-            # 'calendar_events': calendar_events,
-        }
+        try:
+            context = get_context(user, date)
+        except OverflowError:
+            # Times of the first and last days of the date range can't be queried in UTC.
+            date = localtime(now()).date()
+            context = get_context(user, date)
+
+        context['mode'] = mode
+        context['date'] = date.strftime(DATE_PARAM_FORMAT)
+        context['totals'] = get_totals(user)
 
         return render(request, self.template_name, context)
-    
 
-def get_month_days(year, month):
+    def get_month_context(self, user, date):
+        year = date.year
+        month = date.month
+        month_name = calendar.month_name[month]
+        month_calendar = calendar.monthcalendar(year, month)
+
+        calendar_events = get_cached_calendar_events(user, year, month)
+
+        start_of_month = date.replace(day=1)
+        # Months outside the date range aren't linked to.
+        previous_month = (start_of_month - timedelta(days=1)).replace(day=1) if start_of_month > datetime_date.min else None
+        next_month = (start_of_month + timedelta(days=32)).replace(day=1) if start_of_month < datetime_date.max.replace(day=1) else None
+
+        if settings.CALENDAR_PREFETCH_ADJACENT_MONTHS:
+            prefetch_calendar_events(user, [
+                (adjacent_month.year, adjacent_month.month)
+                for adjacent_month in [previous_month, next_month] if adjacent_month
+            ])
+
+        return {
+            'year': year,
+            'month': month_name,
+            'calendar': month_calendar,
+            'calendar_events': calendar_events,
+            'previous_date': previous_month and previous_month.strftime(DATE_PARAM_FORMAT),
+            'next_date': next_month and next_month.strftime(DATE_PARAM_FORMAT),
+        }
+
+    def get_week_context(self, user, date):
+        week_start = date - timedelta(days=date.weekday())
+        # Weeks outside the date range aren't linked to.
+        has_previous = week_start - datetime_date.min >= timedelta(days=7)
+        has_next = datetime_date.max - week_start >= timedelta(days=7)
+
+        return {
+            'week_start': week_start,
+            'week_end': week_start + timedelta(days=6),
+            'week': get_week_calendar(user, week_start),
+            'hours': range(24),
+            'previous_date': (week_start - timedelta(days=7)).strftime(DATE_PARAM_FORMAT) if has_previous else None,
+            'next_date': (week_start + timedelta(days=7)).strftime(DATE_PARAM_FORMAT) if has_next else None,
+        }
+
+
+class HeatmapView(LoginRequiredMixin, View):
     '''
-    Returns a list of all days in the specified month as date objects.
+    Returns numbers of user's events per day between "start" and "end"
+    GET params (inclusive, "YYYY-MM-DD") as compact JSON:
+    {"types": [...], "days": {"YYYY-MM-DD": [count per type], ...}}.
     '''
-    start_of_month = datetime_date(year, month, 1)
-    num_days = calendar.monthrange(year, month)[-1]
-    return [start_of_month + timedelta(days=n) for n in range(num_days)]
+
+    def get(self, request):
+        try:
+            start = datetime.strptime(request.GET['start'], DATE_PARAM_FORMAT).date()
+            end = datetime.strptime(request.GET['end'], DATE_PARAM_FORMAT).date()
+            max_end = start + MAX_HEATMAP_RANGE
+        except (KeyError, ValueError, OverflowError):
+            return JsonResponse({'error': 'Provide "start" and "end" dates in YYYY-MM-DD format.'}, status=400)
+
+        if not start <= end < max_end:
+            return JsonResponse(
+                {'error': f'"end" must be after "start" by less than {MAX_HEATMAP_RANGE.days} days.'},
+                status=400
+            )
+
+        counts = get_daily_event_counts(
+            self.request.user,
+            get_local_midnight(start),
+            get_local_midnight(end + timedelta(days=1)),
+        )
+
+        return JsonResponse(
+            {
+                'types': EVENT_TYPES,
+                'days': {day.strftime(DATE_PARAM_FORMAT): day_counts for day, day_counts in counts.items()},
+            },
+            json_dumps_params={'separators': (',', ':')}
+        )
 
 
-def get_calendar_events(user, month_days):
+class AgendaView(LoginRequiredMixin, View):
     '''
-    Returns a list off all lessons, assessments and homeworks
-    user has in one month along with their dates
+    Returns user's upcoming events in chronological order as JSON:
+    {"events": [{"type", "id", "title", "time"}, ...], "next": cursor or null}.
+    The next page is requested by passing the cursor as "after" GET param.
+    Page size can be set with "limit" GET param.
     '''
-    lessons = Lesson.objects.filter(subject__user=user)
-    assessments = Assessment.objects.with_derived_fields().filter(derived_user_id=user.id)
-    homeworks = Homework.objects.with_derived_fields().filter(derived_user_id=user.id)
-    
-    calendar_events = {}
 
-    # for day in month_days:
-    #     day_lessons = filter_by_day(lessons, day)
-    #     day_assessments = filter_by_day(assessments, day, date_field='derived_start_time')
-    #     day_homeworks = filter_by_day(homeworks, day, date_field='derived_due_at')
+    def get(self, request):
+        GET = self.request.GET
+
+        try:
+            limit = min(int(GET.get('limit', AGENDA_PAGE_SIZE)), MAX_AGENDA_PAGE_SIZE)
+            cursor = decode_cursor(GET['after']) if 'after' in GET else (now(), EVENT_TYPES[0], 0)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid "limit" or "after" param.'}, status=400)
 
-    #     events = combine_and_sort_by_time(day_lessons, day_assessments, day_homeworks)
-    #     if events:
-    #         calendar_events[day.day] = events
+        if limit < 1:
+            return JsonResponse({'error': '"limit" must be positive.'}, status=400)
 
-    return calendar_events
+        events, has_more = get_agenda(self.request.user, cursor, limit)
 
+        return JsonResponse({
+            'events': [
+                {'type': event_type, 'id': pk, 'title': description, 'time': time.isoformat()}
+                for event_type, pk, description, time in events
+            ],
+            'next': encode_cursor(events[-1]) if has_more else None,
+        })
 
-def combine_and_sort_by_time(lessons, assessments, homeworks):
+
+class FreeTimeView(LoginRequiredMixin, View):
     '''
-    Combines and sorts assessments, lessons, and homework items
-    by their datetime field.
+    Returns user's free time windows without lessons and assessments as JSON:
+    {"slots": [[start, end], ...]}, between "start" and "end" dates (inclusive,
+    "YYYY-MM-DD", defaulting to the coming week), from now on.
+    Windows are at least "min_length" minutes long and limited to
+    "day_start".."day_end" ("HH:MM") of each day.
     '''
 
-    event_date = []
+    def get(self, request):
+        GET = self.request.GET
+
+        try:
+            start = parse_date_param(GET.get('start'))
+            end = datetime.strptime(GET['end'], DATE_PARAM_FORMAT).date() if 'end' in GET else start + timedelta(days=6)
+            min_length = timedelta(minutes=int(GET['min_length'])) if 'min_length' in GET else DEFAULT_FREE_SLOT_LENGTH
+            day_start = datetime.strptime(GET['day_start'], TIME_PARAM_FORMAT).time() if 'day_start' in GET else FREE_TIME_DAY_START
+            day_end = datetime.strptime(GET['day_end'], TIME_PARAM_FORMAT).time() if 'day_end' in GET else FREE_TIME_DAY_END
+            max_end = start + MAX_FREE_TIME_RANGE
+        except (ValueError, OverflowError):
+            return JsonResponse({'error': 'Invalid "start", "end", "min_length", "day_start" or "day_end" param.'}, status=400)
+
+        if not start <= end < max_end:
+            return JsonResponse(
+                {'error': f'"end" must be after "start" by less than {MAX_FREE_TIME_RANGE.days} days.'},
+                status=400
+            )
+
+        if min_length <= timedelta() or day_start >= day_end:
+            return JsonResponse({'error': '"min_length" must be positive and "day_start" before "day_end".'}, status=400)
+
+        slots = get_free_slots(
+            self.request.user,
+            max(get_local_midnight(start), now()),
+            get_local_midnight(end + timedelta(days=1)),
+            min_length,
+            day_start,
+            day_end,
+        )
+
+        return JsonResponse({
+            'slots': [[slot_start.isoformat(), slot_end.isoformat()] for slot_start, slot_end in slots],
+        })
+
+
+class StudyPlanView(LoginRequiredMixin, View):
+    '''
+    Returns user's planned study blocks from now on and open homework
+    that doesn't fit before its due as JSON:
+    {"blocks": [{"homework", "task", "start", "end"}, ...],
+     "unplanned": [{"homework", "minutes"}, ...]}.
+    POST replans all homework first.
+    '''
+
+    def get(self, request):
+        blocks, unplanned = get_study_plan(self.request.user)
+
+        return JsonResponse({
+            'blocks': [
+                {
+                    'homework': block.homework_id,
+                    'task': block.homework.task,
+                    'start': block.start_time.isoformat(),
+                    'end': block.end_time.isoformat(),
+                }
+                for block in blocks
+            ],
+            'unplanned': [
+                {'homework': homework_id, 'minutes': math.ceil(effort.total_seconds() / 60)}
+                for homework_id, effort in unplanned.items()
+            ],
+        })
+
+    def post(self, request):
+        replan_study_blocks(self.request.user)
+        return self.get(request)
 
-    event_date += [('lesson', lesson.id, f'{lesson.subject} {lesson.get_type_display()}', lesson.start_time)
-                   for lesson in lessons]
-    event_date += [('assessment', assessment.id, f'{assessment.derived_subject} {assessment.get_type_display()}', assessment.derived_start_time)
-                   for assessment in assessments]
-    event_date += [('homework', homework.id, f'{homework.derived_subject} Homework', homework.derived_due_at)
-                   for homework in homeworks]
 
-    sorted_events = sorted(event_date, key=lambda x: x[-1])
-    return [(type, pk, description) for type, pk, description, _ in sorted_events]
\ No newline at end of file
+class ConflictsView(LoginRequiredMixin, View):
+    '''
+    Returns pairs of user's overlapping lessons and assessments
+    from now on as JSON: {"conflicts": [[event, event], ...]},
+    where events are {"type", "id", "start", "end"}.
+    '''
+
+    def get(self, request):
+        return JsonResponse({
+            'conflicts': [
+                [
+                    {'type': event_type, 'id': pk, 'start': start.isoformat(), 'end': end.isoformat()}
+                    for event_type, pk, start, end in pair
+                ]
+                for pair in find_all_conflicts(self.request.user)
+            ],
+        })
+
+
+def parse_date_param(value):
+    '''
+    Returns date from a "YYYY-MM-DD" GET param,
+    or today (in local time) if it's missing or invalid.
+    '''
+    try:
+        return datetime.strptime(value, DATE_PARAM_FORMAT).date()
+    except (TypeError, ValueError):
+        return localtime(now()).date()
@@ -0,0 +1,189 @@
+import heapq
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.utils.timezone import localtime
+
+from lesson.series import get_occurrences, get_user_series
+
+from utils.constants import UNKNOWN_ASSESSMENT_DURATION
+from utils.query_filters import filter_by_field, get_local_midnight
+from utils.time_conflicts import MAX_DURATIONS
+
+from .month_calendar import EVENT_TIME_FIELDS, describe_event, get_user_events
+
+DAYS_IN_WEEK = 7
+DAY = timedelta(days=1)
+
+
+def pack_columns(intervals):
+    '''
+    Lays out (start, end) intervals side by side, so that overlapping
+    ones never share a column. Returns (column, span, columns) for each
+    interval, in the given order: columns is the number of columns in its
+    group of transitively overlapping intervals, and span is the number of
+    columns it can stretch over to the right without overlapping others.
+
+    Columns are assigned by a sweep line over sorted interval starts,
+    which reuses the lowest column freed by already ended intervals
+    (optimal interval graph colouring), in O(n log n). Finding the span
+    takes O(k log n) per interval, where k is the number of columns
+    in its group, which is the maximum number of simultaneous events.
+    '''
+    layout = [None] * len(intervals)
+    active = []         # (end, column) of intervals overlapping the sweep line
+    free_columns = []
+    group = []          # indexes of intervals in the current overlapping group
+    group_columns = 0
+
+    # By start, longer first, so that long intervals take leftmost columns.
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][1], reverse=True)
+    order.sort(key=lambda i: intervals[i][0])
+
+    for index in order:
+        start, end = intervals[index]
+
+        while active and active[0][0] <= start:
+            _, column = heapq.heappop(active)
+            heapq.heappush(free_columns, column)
+
+        if not active:
+            set_group_spans(intervals, group, group_columns, layout)
+            group, free_columns, group_columns = [], [], 0
+
+        if free_columns:
+            column = heapq.heappop(free_columns)
+        else:
+            column = group_columns
+            group_columns += 1
+
+        heapq.heappush(active, (end, column))
+        group.append(index)
+        layout[index] = column
+
+    set_group_spans(intervals, group, group_columns, layout)
+    return layout
+
+
+def set_group_spans(intervals, group, group_columns, layout):
+    '''
+    Replaces columns assigned to a group of intervals in the layout
+    with (column, span, columns), see pack_columns().
+    '''
+    # Intervals of a column don't overlap, and are appended in start order,
+    # so both their starts and ends are sorted.
+    column_starts = [[] for _ in range(group_columns)]
+    column_ends = [[] for _ in range(group_columns)]
+
+    for index in group:
+        start, end = intervals[index]
+        column_starts[layout[index]].append(start)
+        column_ends[layout[index]].append(end)
+
+    for index in group:
+        start, end = intervals[index]
+        column = layout[index]
+        span = 1
+
+        for next_column in range(column + 1, group_columns):
+            # Last interval of the column starting before this one ends
+            # is the only one that can overlap it.
+            last_before_end = bisect_left(column_starts[next_column], end) - 1
+            if last_before_end >= 0 and column_ends[next_column][last_before_end] > start:
+                break
+            span += 1
+
+        layout[index] = (column, span, group_columns)
+
+
+def get_week_events(user, week_start):
+    '''
+    Returns lessons, assessments and homework of the user taking place
+    (or due) in the week starting at the given date, as lists of
+    (type, pk, description, start, end), one query per model.
+    Lessons and assessments started before the week but still
+    lasting in it are included, and so are expanded occurrences
+    of user's lesson series.
+    '''
+    start = get_local_midnight(week_start)
+    end = get_local_midnight(week_start + DAYS_IN_WEEK * DAY)
+    week_events = {}
+
+    for event_type, queryset in get_user_events(user).items():
+        time_field = EVENT_TIME_FIELDS[event_type]
+        queryset = filter_by_field(
+            queryset, time_field, gte=start - MAX_DURATIONS.get(event_type, timedelta()), lt=end
+        )
+
+        if event_type == 'lesson':
+            queryset = [*queryset, *get_occurrences(get_user_series(user), start - MAX_DURATIONS['lesson'], end)]
+
+        week_events[event_type] = []
+        for event in queryset:
+            _, pk, description, event_start = describe_event(event_type, event)
+            event_end = event_start + get_duration(event_type, event)
+            if event_end > start or event_start >= start:
+                week_events[event_type].append((event_type, pk, description, event_start, event_end))
+
+    return week_events['lesson'], week_events['assessment'], week_events['homework']
+
+
+def get_duration(event_type, event):
+    if event_type == 'lesson':
+        return event.duration
+    if event_type == 'assessment':
+        return event.derived_duration or UNKNOWN_ASSESSMENT_DURATION
+    return timedelta()
+
+
+def get_week_calendar(user, week_start):
+    '''
+    Returns a list of days of the week starting at the given date,
+    each a dict with "date", "homework" due that day as
+    (type, pk, description), and "events" (lessons and assessments)
+    laid out on the day's time grid by pack_columns() as dicts with
+    type, pk, description and top, height, left, width in percents.
+    Events lasting past midnight are split between days.
+    '''
+    lessons, assessments, homeworks = get_week_events(user, week_start)
+    days = []
+
+    for day_index in range(DAYS_IN_WEEK):
+        date = week_start + day_index * DAY
+        day_start = get_local_midnight(date)
+        day_end = get_local_midnight(date + DAY)
+        day_length = (day_end - day_start).total_seconds()
+
+        segments = [
+            (event_type, pk, description, max(start, day_start), min(end, day_end))
+            for event_type, pk, description, start, end in lessons + assessments
+            if start < day_end and (end > day_start or start >= day_start)
+        ]
+        layout = pack_columns([(start, end) for *_, start, end in segments])
+
+        days.append({
+            'date': date,
+            'homework': [
+                (event_type, pk, description)
+                for event_type, pk, description, due_at, _ in homeworks
+                if localtime(due_at).date() == date
+            ],
+            'events': [
+                {
+                    'type': event_type,
+                    'pk': pk,
+                    'description': description,
+                    'top': percent((start - day_start).total_seconds(), day_length),
+                    'height': percent((end - start).total_seconds(), day_length),
+                    'left': percent(column, columns),
+                    'width': percent(span, columns),
+                }
+                for (event_type, pk, description, start, end), (column, span, columns) in zip(segments, layout)
+            ],
+        })
+
+    return days
+
+
+def percent(part, whole):
+    return round(100 * part / whole, 2)
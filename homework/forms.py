@@ -1,4 +1,4 @@
-from django.forms import ModelForm
+from django.forms import Form, IntegerField, ModelForm
 from .models import Homework
 
 from utils.mixins import DateTimeWidgetMixin
@@ -13,11 +13,34 @@ class HomeworkCreateForm(HomeworkBaseForm):
     class Meta(HomeworkBaseForm.Meta):
         model = Homework
         fields = ['subject', 'lesson_given', 'lesson_due', 'start_time',
-                  'due_at', 'task', 'completion_percent', 'has_subtasks']
+                  'due_at', 'task', 'completion_percent', 'effort', 'has_subtasks']
 
 
 class HomeworkUpdateForm(HomeworkBaseForm):
     class Meta():
         model = Homework
         fields = ['lesson_due', 'due_at', 'task',
-                  'completion_percent', 'has_subtasks', 'reminder_sent']
\ No newline at end of file
+                  'completion_percent', 'effort', 'has_subtasks', 'reminder_sent']
+
+
+class HomeworkProgressForm(Form):
+    '''
+    Completion percents of many homework, with "progress_<id>" field
+    per homework initialised to its current percent.
+    '''
+    def __init__(self, *args, homework, **kwargs):
+        super().__init__(*args, **kwargs)
+        for item in homework:
+            self.fields[f'progress_{item.pk}'] = IntegerField(
+                label=item.task[:50],
+                min_value=0,
+                max_value=100,
+                initial=item.completion_percent,
+            )
+
+    def get_changed_progress(self):
+        '''Returns (homework id, completion percent) pairs of changed fields.'''
+        return [
+            (int(name.removeprefix('progress_')), self.cleaned_data[name])
+            for name in self.changed_data
+        ]
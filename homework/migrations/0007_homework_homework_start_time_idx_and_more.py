@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homework', '0006_alter_homework_scheduled_reminder_time'),
+        ('lesson', '0007_alter_lesson_scheduled_reminder_time'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['start_time'], name='homework_start_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['due_at'], name='homework_due_at_idx'),
+        ),
+    ]
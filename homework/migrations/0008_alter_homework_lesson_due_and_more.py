@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homework', '0007_homework_homework_start_time_idx_and_more'),
+        ('lesson', '0008_lesson_lesson_start_time_idx'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='homework',
+            name='lesson_due',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='due_homework', to='lesson.lesson'),
+        ),
+        migrations.AlterField(
+            model_name='homework',
+            name='lesson_given',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='given_homework', to='lesson.lesson'),
+        ),
+        migrations.AlterField(
+            model_name='homework',
+            name='subject',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='subject.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['subject', 'start_time'], name='homework_subject_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['subject', 'due_at'], name='homework_subject_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['subject', 'completion_percent'], name='homework_subject_percent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['subject', 'created_at'], name='homework_subject_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['lesson_given', 'completion_percent'], name='homework_given_percent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['lesson_due', 'completion_percent'], name='homework_due_percent_idx'),
+        ),
+    ]
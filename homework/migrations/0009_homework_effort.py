@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homework', '0008_alter_homework_lesson_due_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homework',
+            name='effort',
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:24
+
+import datetime
+from django.db import migrations, models
+
+
+def delete_orphaned_homework(apps, schema_editor):
+    '''
+    Deletes homework left without subject and lessons, or without
+    due and lesson due, by lessons deleted while their homework was
+    kept (on_delete=SET_NULL), which the constraints reject.
+    Such homework is now deleted with its lessons instead.
+    '''
+    Homework = apps.get_model('homework', 'Homework')
+    Homework.objects.filter(
+        models.Q(subject__isnull=True, lesson_given__isnull=True, lesson_due__isnull=True) |
+        models.Q(due_at__isnull=True, lesson_due__isnull=True)
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    # Deleting in the same transaction as altering the table fails on
+    # PostgreSQL, which has pending deferred foreign key checks then.
+    atomic = False
+
+    dependencies = [
+        ('homework', '0009_homework_effort'),
+        ('lesson', '0012_lesson_lesson_duration_range_and_more'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_orphaned_homework, migrations.RunPython.noop, atomic=True),
+        migrations.AddConstraint(
+            model_name='homework',
+            constraint=models.CheckConstraint(condition=models.Q(('completion_percent__gte', 0), ('completion_percent__lte', 100)), name='homework_completion_percent_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='homework',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('effort__gte', datetime.timedelta(seconds=300)), ('effort__lte', datetime.timedelta(days=4))), ('effort__isnull', True), _connector='OR'), name='homework_effort_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='homework',
+            constraint=models.CheckConstraint(condition=models.Q(('subject__isnull', False), ('lesson_given__isnull', False), ('lesson_due__isnull', False), _connector='OR'), name='homework_has_subject_or_lesson'),
+        ),
+        migrations.AddConstraint(
+            model_name='homework',
+            constraint=models.CheckConstraint(condition=models.Q(('due_at__isnull', False), ('lesson_due__isnull', False), _connector='OR'), name='homework_has_due_at_or_lesson_due'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homework', '0010_homework_homework_completion_percent_range_and_more'),
+        ('lesson', '0012_lesson_lesson_duration_range_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='homework',
+            name='lesson_due',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='due_homework', to='lesson.lesson'),
+        ),
+        migrations.AlterField(
+            model_name='homework',
+            name='lesson_given',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='given_homework', to='lesson.lesson'),
+        ),
+    ]
@@ -7,11 +7,15 @@ from subject.models import Subject
 from lesson.models import Lesson
 
 from utils.accessors import get_subject, get_userprofile, get_time_display_format
-from utils.constants import MAX_TASK_LENGTH, MAX_TIMEFRAME, RECENT_PAST_TIMEFRAME
+from utils.check_constraints import CleanMirroredConstraintsMixin, any_not_null_constraint, range_constraint
+from utils.constants import (
+    MAX_TASK_LENGTH, MAX_TIMEFRAME, RECENT_PAST_TIMEFRAME,
+    MIN_HOMEWORK_EFFORT as MIN_EFFORT, MAX_HOMEWORK_EFFORT as MAX_EFFORT
+)
 from utils.reminder_time import should_schedule_reminder, calculate_scheduled_reminder_time
 from utils.time_format import format_time
 
-REMINDER_TRIGGER_FIELD = 'derived_due_at_prop'
+REMINDER_TRIGGER_FIELD = 'reminder_trigger'
 
 class HomeworkManager(models.Manager):
 
@@ -21,32 +25,54 @@ class HomeworkManager(models.Manager):
         return obj
 
     def bulk_create(self, objs, **kwargs):
-        for obj in objs:
-            obj.full_clean()
-        return super().bulk_create(objs, **kwargs)
+        # Imported here, as it depends on event models.
+        from utils.batch_validation import validated_bulk_create
+        return validated_bulk_create(super().bulk_create, objs, **kwargs)
+    
+    DERIVED_FIELDS = {
+        'derived_user_id': ('subject__user', 'lesson_given__subject__user', 'lesson_due__subject__user'),
+        'derived_subject_id': ('subject', 'lesson_given__subject', 'lesson_due__subject'),
+        'derived_start_time': ('start_time', 'lesson_given__start_time'),
+        'derived_due_at': ('due_at', 'lesson_due__start_time'),
+    }
     
     def with_derived_fields(self):
-        return self.annotate( # TO-DO: make sure homework is deleted when its subject is deleted, no matter if they are connected directly or via lesson
-            derived_user_id = Coalesce('subject__user', 'lesson_given__subject__user', 'lesson_due__subject__user'),
-            derived_subject_id=Coalesce('subject', 'lesson_given__subject', 'lesson_due__subject'),
-            derived_start_time=Coalesce('start_time', 'lesson_given__start_time'),
-            derived_due_at=Coalesce('due_at', 'lesson_due__start_time'),
-        )
+        return self.annotate(**{
+            field_name: Coalesce(*sources)
+            for field_name, sources in self.DERIVED_FIELDS.items()
+        })
 
 
-class Homework(models.Model):
+class Homework(CleanMirroredConstraintsMixin, models.Model):
 
     class Meta:
         db_table = 'homework'
+        indexes = [
+            models.Index(fields=['start_time'], name='homework_start_time_idx'),
+            models.Index(fields=['due_at'], name='homework_due_at_idx'),
+            models.Index(fields=['subject', 'start_time'], name='homework_subject_start_idx'),
+            models.Index(fields=['subject', 'due_at'], name='homework_subject_due_idx'),
+            models.Index(fields=['subject', 'completion_percent'], name='homework_subject_percent_idx'),
+            models.Index(fields=['subject', 'created_at'], name='homework_subject_created_idx'),
+            models.Index(fields=['lesson_given', 'completion_percent'], name='homework_given_percent_idx'),
+            models.Index(fields=['lesson_due', 'completion_percent'], name='homework_due_percent_idx'),
+        ]
+        constraints = [
+            range_constraint('homework_completion_percent_range', 'completion_percent', 0, 100, nullable=False),
+            range_constraint('homework_effort_range', 'effort', MIN_EFFORT, MAX_EFFORT),
+            any_not_null_constraint('homework_has_subject_or_lesson', 'subject', 'lesson_given', 'lesson_due'),
+            any_not_null_constraint('homework_has_due_at_or_lesson_due', 'due_at', 'lesson_due'),
+        ]
 
         
-    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True)
-    lesson_given = models.ForeignKey(Lesson, on_delete=models.SET_NULL, blank=True, null=True, related_name='given_homework')
-    lesson_due = models.ForeignKey(Lesson, on_delete=models.SET_NULL, blank=True, null=True, related_name='due_homework')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True, db_index=False) # covered by indexes starting with subject
+    lesson_given = models.ForeignKey(Lesson, on_delete=models.CASCADE, blank=True, null=True, related_name='given_homework', db_index=False) # covered by indexes starting with lesson_given
+    lesson_due = models.ForeignKey(Lesson, on_delete=models.CASCADE, blank=True, null=True, related_name='due_homework', db_index=False) # covered by indexes starting with lesson_due
     start_time = models.DateTimeField(blank=True, null=True)
     due_at = models.DateTimeField(blank=True, null=True)
     task = models.CharField(max_length=MAX_TASK_LENGTH)
     completion_percent = models.IntegerField(default=0)
+    effort = models.DurationField(blank=True, null=True) # estimated total time needed, used by the study planner
     has_subtasks = models.BooleanField(default=False)
     scheduled_reminder_time = models.DateTimeField(null=True, blank=True)
     reminder_sent = models.BooleanField(default=False)
@@ -66,23 +92,46 @@ class Homework(models.Model):
         return self.due_at or (self.lesson_due.start_time if self.lesson_due else None)
     
 
+    @property
+    def reminder_trigger(self):
+        '''
+        Fields the reminder time is calculated from. Compared instead of
+        the derived time itself, so that loading an instance doesn't
+        fetch its lesson.
+        '''
+        return self.due_at, self.lesson_due_id
+
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
+        # Read without loading it if deferred, for counter of open homework.
+        self._original_completion_percent = self.__dict__.get('completion_percent')
 
 
     def clean(self):
         super().clean()
 
+        errors = self.get_rule_errors()
+
+        if errors:
+            raise ValidationError(errors)
+
+
+    def get_rule_errors(self):
+        '''
+        Returns {field: error} of broken rules, which are checked
+        without queries once the lessons and subject are loaded.
+        '''
         errors = {}
 
         errors.update(self.validate_percentage())
+        errors.update(self.validate_effort())
         errors.update(self.validate_existence())
         errors.update(self.validate_subject_consistency())
         errors.update(self.validate_time_constraints())
 
-        if errors:
-            raise ValidationError(errors)
+        return errors
 
     
     def validate_percentage(self):
@@ -98,6 +147,19 @@ class Homework(models.Model):
         return errors
         
 
+    def validate_effort(self):
+
+        errors = {}
+
+        if self.effort is not None and not (MIN_EFFORT <= self.effort <= MAX_EFFORT):
+            errors['effort'] = ValidationError(
+                message=f'Effort must be between {MIN_EFFORT.seconds // 60} minutes and {MAX_EFFORT.days * 24} hours.',
+                code='invalid_effort'
+            )
+
+        return errors
+
+
     def validate_existence(self):
 
         errors = {}
@@ -280,32 +342,46 @@ class Homework(models.Model):
         return errors
 
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, trusted=False, **kwargs):
+        '''
+        Saves homework validated with full_clean(). Trusted saves of internal
+        updates (like marking reminders as sent) skip the validation,
+        relying on check constraints of the database instead.
+        '''
+        if not trusted:
+            self.full_clean()
+        self.prepare_for_save()
+        super().save(*args, **kwargs)
+        self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
+        self._original_completion_percent = self.__dict__.get('completion_percent')
+
 
-        if self.lesson_given or self.lesson_due:
+    def prepare_for_save(self):
+        '''
+        Sets fields derived on save: clears subject of homework linked
+        to lessons, defaults start time to now, clears own times equal
+        to ones of the lessons, and sets reminder time.
+        Also used for validated objects of bulk_create().
+        '''
+        if self.lesson_given_id or self.lesson_due_id:
             self.subject = None
 
-        if not self.start_time and not self.lesson_given:
+        if not self.start_time and not self.lesson_given_id:
             self.start_time = now()
 
-        if self.start_time and self.lesson_given and self.start_time == self.lesson_given.start_time:
+        if self.start_time and self.lesson_given_id and self.start_time == self.lesson_given.start_time:
             self.start_time = None
             
-        if self.due_at and self.lesson_due and self.due_at == self.lesson_due.start_time:
+        if self.due_at and self.lesson_due_id and self.due_at == self.lesson_due.start_time:
             self.due_at = None
 
-        userprofile = get_userprofile(self)
-        if should_schedule_reminder(self, userprofile, 'homework', REMINDER_TRIGGER_FIELD):
+        if should_schedule_reminder(self, 'homework', REMINDER_TRIGGER_FIELD):
             self.scheduled_reminder_time = calculate_scheduled_reminder_time(
                 instance=self,
-                userprofile=userprofile,
+                userprofile=get_userprofile(self),
                 event_type='homework'
             )
 
-        super().save(*args, **kwargs)
-        self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
-
 
     def __str__(self):
         subject = get_subject(self)
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.timezone import now
+
+from utils.constants import MAX_PROGRESS_UPDATES
+from utils.counters import update_counters
+from utils.data_version import bump_data_version
+from utils.query_filters import filter_by_field
+
+from .models import Homework
+
+
+def parse_progress(pairs):
+    '''
+    Returns ({homework id: completion percent}, {key: message}) of
+    (homework id, completion percent) pairs of raw values. Errors are
+    keyed by the homework id as given.
+    '''
+    progress = {}
+    errors = {}
+
+    for homework_id, completion_percent in pairs:
+        try:
+            homework_id, completion_percent = int(homework_id), int(completion_percent)
+        except (TypeError, ValueError):
+            errors[str(homework_id)] = 'Homework id and completion percent must be integers.'
+            continue
+
+        if not 0 <= completion_percent <= 100:
+            errors[str(homework_id)] = 'Completion percent must be between 0 and 100.'
+        else:
+            progress[homework_id] = completion_percent
+
+    return progress, errors
+
+
+def update_progress(user, pairs):
+    '''
+    Sets completion percent of many homework of the user from
+    (homework id, completion percent) pairs, if all of them are valid.
+    Returns (number of changed homework, {homework id: message}).
+
+    Ownership and current percents are checked with one query locking
+    the rows, and changed percents are set with one UPDATE.
+    Reminder times depend on due only, so they are not recalculated,
+    and the rules of full_clean() involving other fields are skipped,
+    as only the percent changes (its range is kept by a check constraint).
+    '''
+    progress, errors = parse_progress(pairs)
+
+    if len(progress) + len(errors) > MAX_PROGRESS_UPDATES:
+        return 0, {None: f'You can\'t update more than {MAX_PROGRESS_UPDATES} homework at once.'}
+
+    if errors or not progress:
+        return 0, errors
+
+    # Imported here, as dashboard depends on homework models.
+    from dashboard.models import EventTimeline, StudyBlock
+    from dashboard.study_planner import replan_after_change
+
+    with transaction.atomic():
+        current = {
+            pk: (completion_percent, due_at)
+            for pk, completion_percent, due_at in filter_by_field(
+                Homework.objects.with_derived_fields().filter(pk__in=progress),
+                'derived_user_id',
+                exact=user.id,
+            )
+            .select_for_update(of=('self',))
+            .values_list('pk', 'completion_percent', 'derived_due_at')
+        }
+
+        if missing := progress.keys() - current.keys():
+            return 0, {str(pk): 'Homework not found.' for pk in sorted(missing)}
+
+        changed = {pk: percent for pk, percent in progress.items() if percent != current[pk][0]}
+
+        if not changed:
+            return 0, {}
+
+        modified_at = now()
+        Homework.objects.filter(pk__in=changed).update(
+            completion_percent=Case(
+                *(When(pk=pk, then=Value(percent)) for pk, percent in changed.items()),
+                output_field=IntegerField(),
+            ),
+            last_modified=modified_at,
+        )
+        # Only the modification time of their timeline rows changes.
+        EventTimeline.objects.filter(event_type='homework', event_id__in=changed).update(last_modified=modified_at)
+
+        # Updates send no post_save signals.
+        update_counters(user.id, open_homework_count=sum(
+            (percent < 100) - (current[pk][0] < 100) for pk, percent in changed.items()
+        ))
+
+        until = max(current[pk][1] for pk in changed)
+        affected_blocks = StudyBlock.objects.filter(homework__in=list(changed))
+
+        transaction.on_commit(lambda: bump_data_version(user.id))
+        transaction.on_commit(lambda: replan_after_change(user.id, until, affected_blocks))
+
+    return len(changed), {}
@@ -1,12 +1,19 @@
+import json
 from datetime import timedelta
 
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils.timezone import now
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 
 from subject.models import Subject
 from lesson.models import Lesson
+from userprofile.models import UserProfile
+
+from utils.query_plan import analyze, uses_index
 
 from .models import Homework
 
@@ -311,4 +318,247 @@ class HomeworkModelTests(TestCase):
             )
             self.fail('ValidationError was not raised when creating homework with task exciding max allowed length')
         except ValidationError as e:
-            self.assertIn('task', e.error_dict)
\ No newline at end of file
+            self.assertIn('task', e.error_dict)
+
+
+class HomeworkListQueryPlanTests(TestCase):
+
+    SUBJECTS = 20
+    HOMEWORK_PER_SUBJECT = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        '''Create a test user with enough homework for the planner to pick indexes by selectivity.'''
+        cls.user = User.objects.create_user(username='testuser')
+        subjects = Subject.objects.all().bulk_create(
+            Subject(user=cls.user, name=f'Subject {i}') for i in range(cls.SUBJECTS)
+        )
+        lessons = Lesson.objects.all().bulk_create(
+            Lesson(subject=subject, start_time=now() + timedelta(days=i), duration=timedelta(minutes=90))
+            for subject in subjects
+            for i in range(2)
+        )
+        Homework.objects.all().bulk_create(
+            Homework(
+                subject=subject,
+                task='Task',
+                start_time=now() + timedelta(days=i),
+                due_at=now() + timedelta(days=i + 7),
+                completion_percent=i * 2,
+            )
+            for subject in subjects
+            for i in range(cls.HOMEWORK_PER_SUBJECT)
+        )
+        Homework.objects.all().bulk_create(
+            Homework(lesson_given=given, lesson_due=due, task='Task')
+            for given, due in zip(lessons[::2], lessons[1::2])
+        )
+        analyze(Subject, Lesson, Homework)
+        cls.subject = subjects[0]
+        cls.lesson_given = lessons[0]
+        cls.lesson_due = lessons[1]
+
+
+    def test_subject_and_completion_filter_uses_index(self):
+        '''Test filtering homework by subject and completion percent uses (subject, completion_percent) index.'''
+        queryset = Homework.objects.filter(subject=self.subject, completion_percent__gte=50)
+        self.assertTrue(uses_index(queryset, 'homework_subject_percent_idx'))
+
+
+    def test_subject_filter_sorted_by_due_at_uses_index(self):
+        '''Test filtering homework by subject and sorting by due time uses (subject, due_at) index.'''
+        queryset = Homework.objects.filter(subject=self.subject).order_by('due_at')
+        self.assertTrue(uses_index(queryset, 'homework_subject_due_idx'))
+
+
+    def test_lesson_given_filter_uses_index(self):
+        '''Test filtering homework by lesson it was given at uses (lesson_given, completion_percent) index.'''
+        queryset = Homework.objects.filter(lesson_given=self.lesson_given)
+        self.assertTrue(uses_index(queryset, 'homework_given_percent_idx'))
+
+
+    def test_lesson_due_filter_uses_index(self):
+        '''Test filtering homework by lesson it is due at uses (lesson_due, completion_percent) index.'''
+        queryset = Homework.objects.filter(lesson_due=self.lesson_due)
+        self.assertTrue(uses_index(queryset, 'homework_due_percent_idx'))
+
+
+class HomeworkBulkCreateTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile, subject and five future lessons.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Databases')
+        self.lessons = Lesson.objects.bulk_create(
+            Lesson(subject=self.subject, start_time=now() + timedelta(days=day), duration=timedelta(minutes=90))
+            for day in range(1, 6)
+        )
+
+    def create_homework(self, count):
+        with CaptureQueriesContext(connection) as queries:
+            Homework.objects.bulk_create(
+                Homework(lesson_due=self.lessons[index % len(self.lessons)], task=f'Task {index}')
+                for index in range(count)
+            )
+        return len(queries)
+
+
+    def test_bulk_created_homework_gets_save_defaults_and_reminders(self):
+        '''Test bulk created homework from a generator is saved like by save(), with reminder times.'''
+        self.create_homework(5)
+
+        homework = Homework.objects.get(task='Task 2')
+        self.assertIsNone(homework.subject)
+        self.assertIsNotNone(homework.start_time)
+        self.assertEqual(
+            homework.scheduled_reminder_time,
+            self.lessons[2].start_time - self.user.userprofile.homework_reminder_timing
+        )
+
+
+    def test_bulk_create_query_count_doesnt_grow_with_batch(self):
+        '''Test validating homework referencing lessons takes the same queries for any batch size.'''
+        self.assertEqual(self.create_homework(2), self.create_homework(40))
+
+
+    def test_invalid_homework_fails_whole_batch(self):
+        '''Test batch with homework breaking a rule or referencing a missing lesson isn't created.'''
+        for invalid in [
+            Homework(subject=self.subject, task='Percent', due_at=now() + timedelta(days=1), completion_percent=101),
+            Homework(lesson_due_id=0, task='Missing lesson'),
+        ]:
+            with self.assertRaises(ValidationError):
+                Homework.objects.bulk_create([Homework(lesson_due=self.lessons[0], task='Valid'), invalid])
+
+        self.assertFalse(Homework.objects.exists())
+
+
+class HomeworkCheckConstraintTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile, subject and homework due in a week.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Compilers')
+        self.homework = Homework.objects.create(subject=self.subject, task='Write a lexer', due_at=now() + timedelta(days=7))
+
+
+    def test_trusted_save_skips_validation_queries(self):
+        '''Test trusted save of a valid change doesn't run validation queries.'''
+        homework = Homework.objects.get(pk=self.homework.pk)
+        homework.completion_percent = 50
+
+        with CaptureQueriesContext(connection) as queries:
+            homework.save(trusted=True, update_fields=['completion_percent'])
+
+        # UPDATE, and owner lookup of the data version signal.
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(Homework.objects.get(pk=self.homework.pk).completion_percent, 50)
+
+
+    def test_database_rejects_rule_breaking_writes(self):
+        '''Test trusted saves and updates breaking model rules fail with IntegrityError.'''
+        self.homework.completion_percent = 120
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.homework.save(trusted=True)
+
+        for invalid_update in [{'effort': timedelta(days=30)}, {'subject': None}, {'due_at': None}]:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Homework.objects.filter(pk=self.homework.pk).update(**invalid_update)
+
+
+    def test_form_validation_doesnt_query_check_constraints(self):
+        '''Test full_clean() reports rule errors from clean() without checking constraints with queries.'''
+        self.homework.completion_percent = 120
+
+        with self.assertRaises(ValidationError) as context, CaptureQueriesContext(connection) as queries:
+            self.homework.full_clean(exclude=['subject'])
+
+        self.assertEqual(context.exception.error_dict['completion_percent'][0].code, 'invalid_completion_percent')
+        self.assertEqual(len(queries), 0)
+
+
+    def test_deleting_lesson_deletes_its_homework(self):
+        '''Test deleting lesson deletes homework given or due at it instead of leaving it without subject.'''
+        lesson, = Lesson.objects.all().bulk_create([
+            Lesson(subject=self.subject, start_time=now() - timedelta(days=1), duration=timedelta(minutes=90))
+        ])
+        homework = Homework.objects.create(lesson_given=lesson, task='Read a chapter', due_at=now() + timedelta(days=3))
+
+        lesson.delete()
+
+        self.assertFalse(Homework.objects.filter(pk=homework.pk).exists())
+        self.assertTrue(Homework.objects.filter(pk=self.homework.pk).exists())
+
+
+class HomeworkProgressTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile, subject and three homework, and homework of another user.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+        subject = Subject.objects.create(user=self.user, name='Networks')
+        self.homework = Homework.objects.bulk_create(
+            Homework(subject=subject, task=f'Task {day}', due_at=now() + timedelta(days=day))
+            for day in range(1, 4)
+        )
+
+        other_user = User.objects.create_user(username='otheruser')
+        UserProfile.objects.create(user=other_user)
+        other_subject = Subject.objects.create(user=other_user, name='Networks')
+        self.other_homework = Homework.objects.create(subject=other_subject, task='Other', due_at=now() + timedelta(days=1))
+
+    def post_json(self, progress):
+        return self.client.post(
+            reverse('homework_progress'),
+            json.dumps({'progress': progress}),
+            content_type='application/json'
+        )
+
+
+    def test_json_progress_updates_with_one_update(self):
+        '''Test JSON progress of many homework is checked with one query and set with one UPDATE.'''
+        progress = [{'id': self.homework[0].pk, 'completion_percent': 100}, {'id': self.homework[1].pk, 'completion_percent': 40}]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_json(progress)
+
+        self.assertEqual(response.json(), {'updated': 2})
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "homework"') for query in queries), 1)
+        self.assertEqual(
+            list(Homework.objects.filter(pk__in=[h.pk for h in self.homework]).order_by('pk').values_list('completion_percent', flat=True)),
+            [100, 40, 0]
+        )
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.open_homework_count, 2)
+
+
+    def test_foreign_or_invalid_progress_updates_nothing(self):
+        '''Test progress with homework of another user or percent out of range isn't applied at all.'''
+        for progress in [
+            [{'id': self.homework[0].pk, 'completion_percent': 50}, {'id': self.other_homework.pk, 'completion_percent': 50}],
+            [{'id': self.homework[0].pk, 'completion_percent': 50}, {'id': self.homework[1].pk, 'completion_percent': 101}],
+        ]:
+            response = self.post_json(progress)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(len(response.json()['errors']), 1)
+
+        self.assertFalse(Homework.objects.exclude(completion_percent=0).exists())
+
+
+    def test_form_updates_changed_progress(self):
+        '''Test progress form lists open homework and updates changed percents.'''
+        response = self.client.get(reverse('homework_progress'))
+        self.assertEqual(len(response.context['form'].fields), 3)
+
+        data = {f'progress_{homework.pk}': 0 for homework in self.homework}
+        data[f'progress_{self.homework[2].pk}'] = 75
+
+        response = self.client.post(reverse('homework_progress'), data)
+
+        self.assertRedirects(response, reverse('homework_list'), fetch_redirect_response=False)
+        self.assertEqual(Homework.objects.get(pk=self.homework[2].pk).completion_percent, 75)
@@ -1,16 +1,20 @@
+import json
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Q
+from django.http import JsonResponse
+from django.shortcuts import redirect
 from django.views.generic import ListView, DetailView
-from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from django.views.generic.edit import CreateView, UpdateView, DeleteView, FormView
 from django.urls import reverse_lazy
 from django.utils.timezone import now
 
-from utils.constants import MAX_TIMEFRAME, RECENT_PAST_TIMEFRAME
+from utils.constants import MAX_PROGRESS_UPDATES, MAX_TIMEFRAME, RECENT_PAST_TIMEFRAME
 from utils.mixins import (
     CancelLinkMixin, ModelNameMixin,
     OwnershipRequiredMixin, DerivedFieldsMixin
 )
-from utils.query_filters import apply_date_range_filter_if_valid, apply_sorting
+from utils.query_filters import apply_date_range_filter_if_valid, apply_sorting, filter_by_field
 from utils.sidebar_context import (
     SidebarSectionsMixin, SidebarStateMixin,
     section
@@ -19,8 +23,9 @@ from utils.sidebar_context import (
 from subject.models import Subject
 from lesson.models import Lesson
 
-from .forms import HomeworkCreateForm, HomeworkUpdateForm
+from .forms import HomeworkCreateForm, HomeworkProgressForm, HomeworkUpdateForm
 from .models import Homework
+from .progress import update_progress
 
 from .filter_config import build_homework_filters
 from .sort_config import build_homework_sorting
@@ -45,13 +50,13 @@ class HomeworkListView(LoginRequiredMixin, SidebarStateMixin,
         '''
         Return homework of the user sending requests
         '''
-        queryset = super().get_queryset().filter(derived_user_id=self.request.user.id)
+        queryset = filter_by_field(super().get_queryset(), 'derived_user_id', exact=self.request.user.id)
         GET = self.request.GET
         filter_config = build_homework_filters(user=self.request.user)
         sort_config = build_homework_sorting()
 
         if subject_filter := GET.get('subject'):
-            queryset = queryset.filter(derived_subject_id=subject_filter)
+            queryset = filter_by_field(queryset, 'derived_subject_id', exact=subject_filter)
 
         if lesson_given_filter := GET.get('lesson_given'):
             queryset = queryset.filter(lesson_given=lesson_given_filter)
@@ -187,4 +192,51 @@ class HomeworkDeleteView(LoginRequiredMixin, OwnershipRequiredMixin, CancelLinkM
     model = Homework
     owner_field = 'derived_user_id'
     success_message = 'Assessment deleted successfully!'
-    success_url = reverse_lazy('homework_list')
\ No newline at end of file
+    success_url = reverse_lazy('homework_list')
+
+
+class HomeworkProgressView(LoginRequiredMixin, CancelLinkMixin, FormView):
+    '''
+    Updates completion percents of many of user's homework at once:
+    with a form of their open homework (see HomeworkProgressForm), or with
+    JSON body {"progress": [{"id", "completion_percent"}, ...]} answered
+    with {"updated": count} or {"errors": {id: message}}.
+    Nothing is updated if any of them is invalid.
+    '''
+    form_class = HomeworkProgressForm
+    template_name = 'homework/homework_progress.html'
+
+    def post(self, request, *args, **kwargs):
+        if request.content_type != 'application/json':
+            return super().post(request, *args, **kwargs)
+
+        try:
+            pairs = [(item['id'], item['completion_percent']) for item in json.loads(request.body)['progress']]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {'error': 'Provide "progress" list of {"id", "completion_percent"} objects.'},
+                status=400
+            )
+
+        updated, errors = update_progress(request.user, pairs)
+
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+        return JsonResponse({'updated': updated})
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['homework'] = filter_by_field(
+            Homework.objects.with_derived_fields().filter(completion_percent__lt=100),
+            'derived_user_id',
+            exact=self.request.user.id,
+        ).order_by('derived_due_at', 'pk').only('pk', 'task', 'completion_percent', 'due_at', 'lesson_due')[:MAX_PROGRESS_UPDATES]
+        return kwargs
+
+    def form_valid(self, form):
+        _, progress_errors = update_progress(self.request.user, form.get_changed_progress())
+
+        if not progress_errors:
+            return redirect('homework_list')
+
+        return self.render_to_response(self.get_context_data(form=form, progress_errors=progress_errors))
@@ -1,5 +1,7 @@
 from django.contrib import admin
 
-from .models import Lesson
+from .models import Lesson, LessonSeries, LessonSeriesException
 
-admin.site.register(Lesson)
\ No newline at end of file
+admin.site.register(Lesson)
+admin.site.register(LessonSeries)
+admin.site.register(LessonSeriesException)
\ No newline at end of file
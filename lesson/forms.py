@@ -1,6 +1,15 @@
-from django.forms import ModelForm
-from .models import Lesson
+from datetime import date as datetime_date, timedelta
 
+from django.core.validators import FileExtensionValidator
+from django.core.exceptions import ValidationError
+from django.forms import (
+    BooleanField, CheckboxSelectMultiple, ChoiceField, DateField, DateInput, FileField,
+    Form, IntegerField, ModelChoiceField, ModelForm, ModelMultipleChoiceField
+)
+from .models import Lesson, LessonSeries
+from .timetable_import import CSV_COLUMNS, IMPORT_FILE_EXTENSIONS
+
+from utils.constants import MAX_TIMEFRAME
 from utils.mixins import DateTimeWidgetMixin
 
 class LessonCreateForm(DateTimeWidgetMixin, ModelForm):
@@ -13,3 +22,78 @@ class LessonUpdateForm(DateTimeWidgetMixin, ModelForm):
     class Meta:
         model = Lesson
         fields = ['type', 'start_time', 'duration', 'reminder_sent']
+
+
+class LessonSeriesCreateForm(DateTimeWidgetMixin, ModelForm):
+    class Meta:
+        model = LessonSeries
+        fields = ['subject', 'type', 'start_time', 'duration', 'recurrence', 'end_date']
+        widgets = {'end_date': DateInput(attrs={'type': 'date'})}
+
+
+class LessonImportForm(Form):
+    file = FileField(
+        validators=[FileExtensionValidator(allowed_extensions=IMPORT_FILE_EXTENSIONS)],
+        help_text=(
+            f'iCalendar (.ics) export of your timetable, or CSV with columns: {", ".join(CSV_COLUMNS)} '
+            '(start time as YYYY-MM-DD HH:MM, duration in minutes).'
+        ),
+    )
+
+
+class LessonShiftForm(Form):
+    '''
+    Shift of future lessons of a subject by days and minutes
+    (negative to move them earlier), optionally only ones starting
+    between dates or of a type. Lessons can't be shifted by more than
+    MAX_TIMEFRAME, as they wouldn't be in the future or within it.
+    '''
+    subject = ModelChoiceField(queryset=None)
+    days = IntegerField(initial=0, min_value=-MAX_TIMEFRAME.days, max_value=MAX_TIMEFRAME.days)
+    minutes = IntegerField(
+        initial=0, min_value=-MAX_TIMEFRAME // timedelta(minutes=1), max_value=MAX_TIMEFRAME // timedelta(minutes=1)
+    )
+    start_date = DateField(required=False, widget=DateInput(attrs={'type': 'date'}), help_text='Only lessons starting on or after this date.')
+    end_date = DateField(required=False, widget=DateInput(attrs={'type': 'date'}), help_text='Only lessons starting on or before this date.')
+    type = ChoiceField(choices=[('', 'Any')] + Lesson.Type.choices, required=False)
+
+    def __init__(self, *args, subjects, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['subject'].queryset = subjects
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        if not cleaned_data.get('days') and not cleaned_data.get('minutes'):
+            raise ValidationError('Set days or minutes to shift lessons by.')
+
+        start_date, end_date = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            self.add_error('end_date', 'End date must not be before start date.')
+        if end_date == datetime_date.max:
+            # Lessons are filtered by the midnight after it.
+            self.add_error('end_date', 'End date is out of range.')
+
+        return cleaned_data
+
+    def get_delta(self):
+        return timedelta(days=self.cleaned_data['days'], minutes=self.cleaned_data['minutes'])
+
+
+class LessonRolloverForm(Form):
+    '''
+    Copy of lessons of subjects between source dates to the range
+    starting at target start date, optionally with assessments.
+    '''
+    subjects = ModelMultipleChoiceField(queryset=None, widget=CheckboxSelectMultiple)
+    source_start = DateField(widget=DateInput(attrs={'type': 'date'}))
+    source_end = DateField(widget=DateInput(attrs={'type': 'date'}))
+    target_start = DateField(
+        widget=DateInput(attrs={'type': 'date'}),
+        help_text='Lessons keep their weekday and time if it\'s the same weekday as the source start.'
+    )
+    with_assessments = BooleanField(required=False, label='Copy assessments too')
+
+    def __init__(self, *args, subjects, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['subjects'].queryset = subjects
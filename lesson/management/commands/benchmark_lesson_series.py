@@ -0,0 +1,121 @@
+import time
+from datetime import datetime, timedelta, time as datetime_time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localtime, make_aware, now
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries
+from lesson.views import LessonListView
+from userprofile.models import UserProfile
+
+from utils.constants import FREE_TIME_DAY_START, FREE_TIME_DAY_END
+
+from dashboard.free_time import get_free_slots
+from dashboard.month_calendar import get_calendar_events
+from dashboard.week_calendar import get_week_calendar
+
+SUBJECTS = 15
+SEMESTER = timedelta(weeks=26)
+LESSON_SLOTS = [datetime_time(hour) for hour in range(8, 20, 2)]
+
+
+class Command(BaseCommand):
+    help = 'Compares a semester timetable of lazily expanded lesson series with materialised lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lessons-per-week', type=int, default=30, help='Number of lessons a week')
+
+    def handle(self, *args, **options):
+        lessons_per_week = options['lessons_per_week']
+
+        with transaction.atomic():
+            results = {}
+            for name, create_timetable in [('series', create_series), ('materialised', create_lessons)]:
+                user, monday, creation_time = create_user_timetable(create_timetable, lessons_per_week)
+                results[name] = [('create', creation_time, None), *measure_reads(user, monday)]
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{lessons_per_week} lessons a week over {SEMESTER.days // 7} weeks')
+        self.stdout.write(f'{"":<14}' + ''.join(f'{name:>24}' for name in results))
+        for index, (operation, *_) in enumerate(results['series']):
+            row = ''
+            for measurements in results.values():
+                _, elapsed, queries = measurements[index]
+                row += f'{elapsed * 1000:>12.1f}ms' + (f'{queries:>6} queries' if queries is not None else ' ' * 14)
+            self.stdout.write(f'{operation:<14}{row}')
+
+
+def create_user_timetable(create_timetable, lessons_per_week):
+    '''
+    Creates user with subjects, and their weekly timetable for a semester
+    starting next Monday with the given function, through model validation
+    like the create views. Returns the user, the Monday and creation time.
+    '''
+    user = User.objects.create_user(username=f'benchmark_{time.time_ns()}')
+    UserProfile.objects.create(user=user)
+    subjects = Subject.objects.all().bulk_create(
+        Subject(user=user, name=f'Subject {i}') for i in range(SUBJECTS)
+    )
+
+    today = localtime(now()).date()
+    monday = today + timedelta(days=7 - today.weekday())
+    slots = [
+        (
+            subjects[i % SUBJECTS],
+            make_aware(datetime.combine(monday + timedelta(days=i % 5), LESSON_SLOTS[i // 5 % len(LESSON_SLOTS)])),
+        )
+        for i in range(lessons_per_week)
+    ]
+
+    started = time.perf_counter()
+    create_timetable(slots, monday + SEMESTER - timedelta(days=1))
+    return user, monday, time.perf_counter() - started
+
+
+def create_series(slots, end_date):
+    for subject, start_time in slots:
+        LessonSeries.objects.create(subject=subject, start_time=start_time, duration=timedelta(minutes=90), end_date=end_date)
+
+
+def create_lessons(slots, end_date):
+    Lesson.objects.bulk_create([
+        Lesson(subject=subject, start_time=start_time + timedelta(weeks=week), duration=timedelta(minutes=90))
+        for week in range(SEMESTER.days // 7)
+        for subject, start_time in slots
+    ])
+
+
+def measure_reads(user, monday):
+    '''
+    Returns (operation, time, queries) of reading the user's timetable
+    in a month, a week, free time over the semester, and a lesson list page.
+    '''
+    month = monday + timedelta(weeks=8)
+    start = make_aware(datetime.combine(monday, datetime_time.min))
+    request = RequestFactory().get('/lessons/', {'page': 10})
+    request.user = user
+
+    operations = [
+        ('month', lambda: get_calendar_events(user, month.year, month.month)),
+        ('week', lambda: get_week_calendar(user, month)),
+        ('free time', lambda: get_free_slots(
+            user, start, start + SEMESTER, timedelta(hours=2), FREE_TIME_DAY_START, FREE_TIME_DAY_END
+        )),
+        ('list page', lambda: LessonListView.as_view()(request).render()),
+    ]
+
+    measurements = []
+    for operation, function in operations:
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - started
+        measurements.append((operation, elapsed, len(queries)))
+
+    return measurements
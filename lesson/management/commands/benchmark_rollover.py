@@ -0,0 +1,90 @@
+import time
+from datetime import datetime, timedelta, time as datetime_time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localtime, make_aware, now
+
+from subject.models import Subject
+from lesson.models import Lesson
+from lesson.rollover import rollover_lessons
+from assessment.models import Assessment
+from userprofile.models import UserProfile
+
+from utils.constants import MAX_SUBJECTS_PER_USER
+
+TERM = timedelta(weeks=16)
+LESSON_SLOTS = [datetime_time(hour) for hour in range(7, 23)]
+LESSON_DURATION = timedelta(minutes=15)
+
+
+class Command(BaseCommand):
+    help = 'Measures rolling a full timetable over to the next term, compared with recreating its lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subjects', type=int, default=MAX_SUBJECTS_PER_USER, help='Number of subjects of the account')
+
+    def handle(self, *args, **options):
+        subjects = options['subjects']
+
+        with transaction.atomic():
+            user, term_start, lessons = create_term(subjects)
+            next_term = term_start + TERM + timedelta(weeks=1)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                copied, assessments, errors = rollover_lessons(
+                    user, Subject.objects.filter(user=user), term_start, term_start + TERM - timedelta(days=1), next_term, True
+                )
+                rollover_time = time.perf_counter() - started
+
+            if errors:
+                self.stderr.write('\n'.join(errors))
+                return
+
+            started = time.perf_counter()
+            Lesson.objects.bulk_create(
+                Lesson(subject_id=lesson.subject_id, start_time=lesson.start_time + 2 * (TERM + timedelta(weeks=1)), duration=lesson.duration)
+                for lesson in lessons
+            )
+            bulk_create_time = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{subjects} subjects, {copied} lessons and {assessments} assessments over {TERM.days // 7} weeks')
+        self.stdout.write(f'{"rollover":<28}{rollover_time * 1000:>10.1f}ms{len(queries):>6} queries')
+        self.stdout.write(f'{"validated bulk_create":<28}{bulk_create_time * 1000:>10.1f}ms')
+
+
+def create_term(subject_count):
+    '''
+    Creates user with subjects having two lessons a week and
+    an assessment at the last lesson, for a term starting
+    next Monday. Returns the user, the Monday and the lessons.
+    '''
+    user = User.objects.create_user(username=f'benchmark_{time.time_ns()}')
+    UserProfile.objects.create(user=user, receive_lesson_reminders=True)
+    subjects = Subject.objects.all().bulk_create(
+        Subject(user=user, name=f'Subject {i}') for i in range(subject_count)
+    )
+
+    today = localtime(now()).date()
+    monday = today + timedelta(days=7 - today.weekday())
+    # Subjects take hourly slots of each weekday in turn, then the next quarters of them.
+    slots = [
+        make_aware(datetime.combine(monday + timedelta(days=slot % 7), LESSON_SLOTS[slot // 7 % len(LESSON_SLOTS)]))
+        + slot // (7 * len(LESSON_SLOTS)) * LESSON_DURATION
+        for slot in range(2 * subject_count)
+    ]
+
+    lessons = Lesson.objects.all().bulk_create(
+        Lesson(subject=subject, start_time=slots[2 * i + half] + timedelta(weeks=week), duration=LESSON_DURATION)
+        for i, subject in enumerate(subjects)
+        for week in range(TERM.days // 7)
+        for half in range(2)
+    )
+    Assessment.objects.all().bulk_create(Assessment(lesson=lesson) for lesson in lessons[2 * TERM.days // 7 - 1::2 * TERM.days // 7])
+
+    return user, monday, lessons
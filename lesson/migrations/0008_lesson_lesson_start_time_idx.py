@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lesson', '0007_alter_lesson_scheduled_reminder_time'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['start_time'], name='lesson_start_time_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lesson', '0008_lesson_lesson_start_time_idx'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='subject.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['subject', 'start_time'], name='lesson_subject_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['subject', 'type', 'start_time'], name='lesson_subject_type_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['subject', 'created_at'], name='lesson_subject_created_idx'),
+        ),
+    ]
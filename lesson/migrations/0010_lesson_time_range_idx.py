@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# timestamptz + interval is only stable, as adding days depends on the time
+# zone. Adding an interval of seconds doesn't, so the function is immutable
+# and can be indexed. Unknown duration is an hour (UNKNOWN_ASSESSMENT_DURATION).
+CREATE_TIME_RANGE_FUNCTION = '''
+    CREATE FUNCTION event_time_range(start_time timestamptz, duration interval)
+    RETURNS tstzrange
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$
+        SELECT tstzrange(
+            start_time,
+            start_time + make_interval(secs => extract(epoch FROM coalesce(duration, interval '1 hour'))),
+            '[)'
+        )
+    $$
+'''
+
+# btree_gist lets GiST index subject_id along with the range. It ships with
+# PostgreSQL contrib modules; where it's missing, only the range is indexed.
+CREATE_TIME_RANGE_INDEX = '''
+    CREATE INDEX lesson_subject_time_range_idx ON lesson
+    USING gist ({columns}event_time_range(start_time, duration))
+'''
+
+
+def create_time_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'")
+        has_btree_gist = cursor.fetchone() is not None
+
+    if has_btree_gist:
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+
+    schema_editor.execute(CREATE_TIME_RANGE_FUNCTION)
+    schema_editor.execute(CREATE_TIME_RANGE_INDEX.format(columns='subject_id, ' if has_btree_gist else ''))
+
+
+def drop_time_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX lesson_subject_time_range_idx')
+    schema_editor.execute('DROP FUNCTION event_time_range(timestamptz, interval)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lesson', '0009_alter_lesson_subject_lesson_lesson_subject_start_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_time_range_index, drop_time_range_index),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lesson', '0010_lesson_time_range_idx'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonSeriesException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+            ],
+            options={
+                'db_table': 'lesson_series_exception',
+            },
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='series_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='LessonSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('L', 'Lecture'), ('P', 'Practice'), ('S', 'Seminar'), ('Y', 'Self-Study')], default='L', max_length=1)),
+                ('start_time', models.DateTimeField(help_text='Start of the first lesson.')),
+                ('duration', models.DurationField()),
+                ('recurrence', models.PositiveSmallIntegerField(choices=[(1, 'Weekly'), (2, 'Biweekly')], default=1)),
+                ('end_date', models.DateField(help_text='Date of the last lesson.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_modified', models.DateTimeField(auto_now=True)),
+                ('subject', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='subject.subject')),
+            ],
+            options={
+                'verbose_name_plural': 'lesson series',
+                'db_table': 'lesson_series',
+            },
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='series',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='lesson.lessonseries'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('series', 'series_date'), name='lesson_series_date_unique'),
+        ),
+        migrations.AddField(
+            model_name='lessonseriesexception',
+            name='series',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='lesson.lessonseries'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonseries',
+            index=models.Index(fields=['subject', 'end_date'], name='lesson_series_subject_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonseries',
+            index=models.Index(fields=['end_date'], name='lesson_series_end_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lessonseriesexception',
+            constraint=models.UniqueConstraint(fields=('series', 'date'), name='lesson_series_exception_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:24
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lesson', '0011_lesson_series'),
+        ('subject', '0004_alter_subject_user'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('duration__gte', datetime.timedelta(seconds=900)), ('duration__lte', datetime.timedelta(seconds=28800))), ('duration__isnull', True), _connector='OR'), name='lesson_duration_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='lessonseries',
+            constraint=models.CheckConstraint(condition=models.Q(('duration__gte', datetime.timedelta(seconds=900)), ('duration__lte', datetime.timedelta(seconds=28800))), name='lesson_series_duration_range'),
+        ),
+    ]
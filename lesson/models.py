@@ -1,16 +1,23 @@
+from datetime import datetime, timedelta
+
 from django.db import models
-from django.utils.timezone import now
+from django.urls import reverse
+from django.utils.timezone import now, localtime, make_aware
 from django.core.exceptions import ValidationError
 
 from subject.models import Subject
 
-from utils.constants import MAX_LESSON_DURATION as MAX_DURATION, MIN_LESSON_DURATION as MIN_DURATION
+from utils.constants import (
+    MAX_LESSON_DURATION as MAX_DURATION, MIN_LESSON_DURATION as MIN_DURATION, MAX_TIMEFRAME
+)
 from utils.accessors import get_userprofile, get_time_display_format
+from utils.check_constraints import CleanMirroredConstraintsMixin, range_constraint
 from utils.default import set_dafault_if_none
 from utils.reminder_time import should_schedule_reminder, calculate_scheduled_reminder_time
 from utils.time_format import format_time
 
 REMINDER_TRIGGER_FIELD = 'start_time'
+DAYS_IN_WEEK = 7
 
 class LessonManager(models.Manager):
 
@@ -20,9 +27,9 @@ class LessonManager(models.Manager):
         return obj
     
     def bulk_create(self, objs, **kwargs):
-        for obj in objs:
-            obj.full_clean()
-        return super().bulk_create(objs, **kwargs)
+        # Imported here, as it depends on event models.
+        from utils.batch_validation import validated_bulk_create
+        return validated_bulk_create(super().bulk_create, objs, **kwargs)
     
     def with_derived_fields(self):
         return self.annotate(
@@ -30,10 +37,21 @@ class LessonManager(models.Manager):
         )
     
 
-class Lesson(models.Model):
+class Lesson(CleanMirroredConstraintsMixin, models.Model):
 
     class Meta:
         db_table = 'lesson'
+        indexes = [
+            models.Index(fields=['start_time'], name='lesson_start_time_idx'),
+            models.Index(fields=['subject', 'start_time'], name='lesson_subject_start_idx'),
+            models.Index(fields=['subject', 'type', 'start_time'], name='lesson_subject_type_start_idx'),
+            models.Index(fields=['subject', 'created_at'], name='lesson_subject_created_idx'),
+        ]
+        constraints = [
+            # Also serves as index for finding materialised occurrences.
+            models.UniqueConstraint(fields=['series', 'series_date'], name='lesson_series_date_unique'),
+            range_constraint('lesson_duration_range', 'duration', MIN_DURATION, MAX_DURATION),
+        ]
 
     class Type(models.TextChoices):
         LECTURE = 'L', 'Lecture'
@@ -42,12 +60,15 @@ class Lesson(models.Model):
         SELF_STUDY = 'Y', 'Self-Study'
         
 
-    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, db_index=False) # covered by indexes starting with subject
     type = models.CharField(max_length=1, choices=Type, default=Type.LECTURE)
     start_time = models.DateTimeField()
     duration = models.DurationField(blank=True, null=True)
     scheduled_reminder_time = models.DateTimeField(null=True, blank=True)
     reminder_sent = models.BooleanField(default=False)
+    # Set for materialised occurrences of a series, see LessonSeries.
+    series = models.ForeignKey('LessonSeries', on_delete=models.CASCADE, blank=True, null=True, editable=False, db_index=False) # covered by lesson_series_date_unique
+    series_date = models.DateField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     last_modified = models.DateTimeField(auto_now=True)
 
@@ -61,6 +82,31 @@ class Lesson(models.Model):
     def clean(self):
         super().clean()
 
+        errors = self.get_rule_errors()
+
+        if not errors and self.subject_id and self.start_time and self.duration:
+            # Imported here, as they depend on event models.
+            from .series import get_occurrence_key
+            from utils.time_conflicts import find_conflicts
+
+            # Occurrence being materialised doesn't conflict with itself expanded.
+            exclude = ('lesson', get_occurrence_key(self) if self._state.adding and self.series_id else self.pk)
+
+            if find_conflicts(self.subject.user, self.start_time, self.start_time + self.duration, exclude):
+                errors['start_time'] = ValidationError(
+                    message='Lesson overlaps with another of your lessons or assessments.',
+                    code='time_conflict'
+                )
+        
+        if errors:
+            raise ValidationError(errors)
+
+
+    def get_rule_errors(self):
+        '''
+        Returns {field: error} of broken rules, which are checked
+        without queries (all but overlapping with other events).
+        '''
         errors = {}
 
         if self.duration < MIN_DURATION:
@@ -75,32 +121,241 @@ class Lesson(models.Model):
                 code='max_duration_exceeded'
             )
         
-        if self.start_time and self.start_time < now():
+        # Occurrences of a series, which was validated instead, may be materialised
+        # after they took place, e.g. to attach homework given at them.
+        if self.start_time and self.start_time < now() and not (self._state.adding and self.series_id):
             errors['start_time'] =  ValidationError(
                 message='Lesson must start in the future.',
                 code='lesson_starts_in_past'
             )
-        
-        if errors:
-            raise ValidationError(errors)
+
+        return errors
 
         
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        set_dafault_if_none(self, 'duration', self.subject.user.userprofile.lesson_duration)
-        
-        
-        userprofile=get_userprofile(self)
-        if should_schedule_reminder(self, userprofile, 'lesson', REMINDER_TRIGGER_FIELD):
+    def save(self, *args, trusted=False, **kwargs):
+        '''
+        Saves lesson validated with full_clean(). Trusted saves of internal
+        updates (like marking reminders as sent) skip the validation,
+        relying on check constraints of the database instead.
+        '''
+        if not trusted:
+            self.full_clean()
+        self.prepare_for_save()
+        super().save(*args, **kwargs)
+        self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
+
+
+    def prepare_for_save(self):
+        '''
+        Sets fields derived on save: default duration and reminder time.
+        Also used for validated objects of bulk_create().
+        '''
+        set_dafault_if_none(self, 'duration', lambda: self.subject.user.userprofile.lesson_duration)
+
+        if should_schedule_reminder(self, 'lesson', REMINDER_TRIGGER_FIELD):
             self.scheduled_reminder_time = calculate_scheduled_reminder_time(
                 instance=self,
-                userprofile=userprofile,
+                userprofile=get_userprofile(self),
                 event_type='lesson'
             )
 
+
+    def delete(self, *args, **kwargs):
+        '''
+        Deletes lesson. Deleted occurrence of a series is
+        recorded as its exception, so that it isn't expanded again.
+        '''
+        if self.series_id:
+            LessonSeriesException.objects.get_or_create(series_id=self.series_id, date=self.series_date)
+        return super().delete(*args, **kwargs)
+
+
+    @property
+    def is_occurrence(self):
+        '''True for not materialised occurrences of a series, expanded in memory.'''
+        return self.pk is None and self.series_id is not None
+
+
+    def get_absolute_url(self):
+        if self.is_occurrence:
+            return reverse('lesson_occurrence', kwargs={'series_id': self.series_id, 'date': self.series_date.isoformat()})
+        return reverse('lesson_detail', kwargs={'pk': self.pk})
+
+
+    def __str__(self):
+        return f'{self.get_type_display()} — {self.subject} on {format_time(self.start_time, get_time_display_format(self))}'
+
+
+class LessonSeriesManager(models.Manager):
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        obj.save()
+        return obj
+
+    def with_derived_fields(self):
+        return self.annotate(
+            derived_user_id = models.F('subject__user')
+        )
+
+
+class LessonSeries(CleanMirroredConstraintsMixin, models.Model):
+    '''
+    Lesson repeating every week or two at the same local time until
+    end date. Occurrences are not stored, but expanded for queried
+    ranges (see lesson.series), and materialised as lessons only when
+    something is attached to them. Exceptions are skipped dates.
+    '''
+
+    class Meta:
+        db_table = 'lesson_series'
+        verbose_name_plural = 'lesson series'
+        indexes = [
+            models.Index(fields=['subject', 'end_date'], name='lesson_series_subject_end_idx'),
+            models.Index(fields=['end_date'], name='lesson_series_end_date_idx'),
+        ]
+        constraints = [
+            range_constraint('lesson_series_duration_range', 'duration', MIN_DURATION, MAX_DURATION, nullable=False),
+        ]
+
+    class Recurrence(models.IntegerChoices):
+        WEEKLY = 1, 'Weekly'
+        BIWEEKLY = 2, 'Biweekly'
+
+
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, db_index=False) # covered by lesson_series_subject_end_idx
+    type = models.CharField(max_length=1, choices=Lesson.Type, default=Lesson.Type.LECTURE)
+    start_time = models.DateTimeField(help_text='Start of the first lesson.')
+    duration = models.DurationField()
+    recurrence = models.PositiveSmallIntegerField(choices=Recurrence, default=Recurrence.WEEKLY)
+    end_date = models.DateField(help_text='Date of the last lesson.')
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_modified = models.DateTimeField(auto_now=True)
+
+    objects = LessonSeriesManager()
+
+    def clean(self):
+        super().clean()
+
+        errors = {}
+
+        if self.duration and self.duration < MIN_DURATION:
+            errors['duration'] = ValidationError(
+                message=f'Lesson duration must be at least {MIN_DURATION.seconds // 60} minutes.',
+                code='min_duration_not_met'
+            )
+
+        if self.duration and self.duration > MAX_DURATION:
+            errors['duration'] = ValidationError(
+                message=f'Lesson duration can\'t exceed {MAX_DURATION.seconds // 3600} hours.',
+                code='max_duration_exceeded'
+            )
+
+        if self.start_time and self.start_time < now():
+            errors['start_time'] = ValidationError(
+                message='Lesson series must start in the future.',
+                code='lesson_starts_in_past'
+            )
+
+        if self.start_time and self.end_date:
+            start_date = localtime(self.start_time).date()
+
+            if self.end_date < start_date:
+                errors['end_date'] = ValidationError(
+                    message='End date can\'t be before the first lesson.',
+                    code='end_before_start'
+                )
+            elif self.end_date - start_date > MAX_TIMEFRAME:
+                errors['end_date'] = ValidationError(
+                    message=f'Lesson series can\'t last more than {MAX_TIMEFRAME.days} days.',
+                    code='max_timeframe_exceeded'
+                )
+
+        if not errors and self.subject_id and self.start_time and self.duration and self.end_date:
+            # Imported here, as it depends on event models.
+            from utils.time_conflicts import find_batch_conflicts
+
+            # Occurrences of the saved series, materialised or not, don't conflict with it.
+            exclude = {'series': [self.pk], 'lesson': Lesson.objects.filter(series=self).values('pk')} if self.pk else None
+            skipped = set(self.exceptions.values_list('date', flat=True)) if self.pk else set()
+            ranges = [
+                (start_time, start_time + self.duration)
+                for start_time in map(self.get_occurrence_start, sorted(set(self.get_occurrence_dates()) - skipped))
+            ]
+
+            if find_batch_conflicts(self.subject.user, ranges, exclude):
+                errors['start_time'] = ValidationError(
+                    message='Lesson series overlaps with another of your lessons or assessments.',
+                    code='time_conflict'
+                )
+
+        if errors:
+            raise ValidationError(errors)
+
+
+    def save(self, *args, **kwargs):
+        self.full_clean()
         super().save(*args, **kwargs)
-        self._original_reminder_trigger_time = getattr(self, REMINDER_TRIGGER_FIELD)
 
 
+    def get_occurrence_dates(self, first=None, last=None):
+        '''
+        Yields local dates of occurrences between first
+        and last dates (inclusive, default to the whole series),
+        including skipped and materialised ones.
+        '''
+        start_date = localtime(self.start_time).date()
+        step = self.recurrence * DAYS_IN_WEEK
+        first = max(first or start_date, start_date)
+        last = min(last or self.end_date, self.end_date)
+
+        date = first + timedelta(days=-(first - start_date).days % step)
+        while date <= last:
+            yield date
+            date += timedelta(days=step)
+
+
+    def is_occurrence_date(self, date):
+        return next(self.get_occurrence_dates(date, date), None) == date
+
+
+    def get_occurrence_start(self, date):
+        '''Returns start time of the occurrence on the given date, at the local time of the first one.'''
+        return make_aware(datetime.combine(date, localtime(self.start_time).time()))
+
+
+    def get_occurrence(self, date):
+        '''
+        Returns unsaved lesson of the occurrence on the given date,
+        starting at the local time of the first one.
+        '''
+        return Lesson(
+            subject=self.subject,
+            type=self.type,
+            start_time=self.get_occurrence_start(date),
+            duration=self.duration,
+            series=self,
+            series_date=date,
+            created_at=self.created_at,
+            last_modified=self.last_modified,
+        )
+
+
+    def __str__(self):
+        return f'{self.get_recurrence_display()} {self.get_type_display()} — {self.subject}'
+
+
+class LessonSeriesException(models.Model):
+    '''Date on which occurrence of a series is skipped.'''
+
+    class Meta:
+        db_table = 'lesson_series_exception'
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'date'], name='lesson_series_exception_unique'),
+        ]
+
+    series = models.ForeignKey(LessonSeries, on_delete=models.CASCADE, related_name='exceptions', db_index=False) # covered by lesson_series_exception_unique
+    date = models.DateField()
+
     def __str__(self):
-        return f'{self.get_type_display()} — {self.subject} on {format_time(self.start_time, get_time_display_format(self))}'
\ No newline at end of file
+        return f'{self.series} skipped on {self.date}'
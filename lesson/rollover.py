@@ -0,0 +1,204 @@
+from datetime import date as datetime_date, datetime, time, timedelta, timezone
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, DurationField, F, OuterRef, Q, Subquery, Value, When
+from django.utils.timezone import get_current_timezone, localdate, make_aware, now
+
+from assessment.models import Assessment
+
+from utils.constants import MAX_ROLLOVER_RANGE, MAX_TIMEFRAME
+from utils.bulk_copy import insert_from_select
+from utils.counters import update_counters
+from utils.data_version import bump_data_version
+from utils.query_filters import get_local_midnight
+from utils.reminder_time import get_reminder_timing_from_user_profile, is_reminder_enabled
+from utils.time_conflicts import find_all_conflicts
+
+from .models import Lesson
+
+
+def get_local_noon(date):
+    # In UTC, as aware datetimes of the same zone are subtracted by their local times.
+    return make_aware(datetime.combine(date, time(12)), get_current_timezone()).astimezone(timezone.utc)
+
+
+def get_day_shifts(source_start, source_end, days):
+    '''
+    Returns [(start, end, shift)] of runs of local days between source
+    start and end dates (inclusive), shifting times of which by shift
+    moves them by days, keeping their local time. Shifts of runs differ
+    by daylight saving time changes between source and target days.
+    '''
+    runs = []
+    date = source_start
+
+    while date <= source_end:
+        shift = get_local_noon(date + timedelta(days=days)) - get_local_noon(date)
+
+        if runs and runs[-1][2] == shift:
+            runs[-1][1] = get_local_midnight(date + timedelta(days=1))
+        else:
+            runs.append([get_local_midnight(date), get_local_midnight(date + timedelta(days=1)), shift])
+        date += timedelta(days=1)
+
+    return runs
+
+
+def shifted(field, day_shifts):
+    '''
+    Returns expression of the datetime field moved by shift
+    of the run of days it's in (see get_day_shifts()).
+    '''
+    default_shift = max(day_shifts, key=lambda run: run[1] - run[0])[2]
+
+    return F(field) + Case(
+        *(
+            When(Q(**{f'{field}__gte': start, f'{field}__lt': end}), then=Value(shift))
+            for start, end, shift in day_shifts if shift != default_shift
+        ),
+        default=Value(default_shift),
+        output_field=DurationField(),
+    )
+
+
+def reminder_time(userprofile, event_type, trigger_time):
+    '''
+    Returns expression of reminder time calculated from trigger_time
+    expression like on save, or NULL if the user doesn't receive
+    reminders of event_type.
+    '''
+    if not is_reminder_enabled(userprofile, event_type):
+        return Value(None, output_field=DateTimeField())
+    return trigger_time - get_reminder_timing_from_user_profile(userprofile, event_type)
+
+
+def get_rollover_errors(source_start, source_end, target_start):
+    '''
+    Returns messages of rules the rollover dates break. Bounding
+    the ranges also keeps days after them within the date range.
+    '''
+    errors = []
+
+    if source_start > source_end:
+        errors.append('Source range must not end before it starts.')
+    elif source_end - source_start >= MAX_ROLLOVER_RANGE:
+        errors.append(f'Source range must be shorter than {MAX_ROLLOVER_RANGE.days} days.')
+    elif source_end == datetime_date.max:
+        errors.append('Source range must end before the last supported date.')
+
+    if target_start <= localdate():
+        errors.append('Target range must start in the future.')
+    elif target_start - localdate() > MAX_TIMEFRAME:
+        errors.append(f'Target range can\'t start more than {MAX_TIMEFRAME.days} days ahead.')
+
+    return errors
+
+
+def rollover_lessons(user, subjects, source_start, source_end, target_start, with_assessments=False):
+    '''
+    Copies lessons of the user's subjects (a queryset) between source
+    start and end dates (inclusive) to the range starting at target
+    start date, keeping their weekday offsets and local times, and
+    optionally assessments of the subjects in the range (with own
+    time or linked to the copied lessons).
+    Returns (number of copied lessons, number of copied assessments, [messages]).
+
+    Rows are copied by the database with one INSERT ... SELECT per model,
+    with shifted times and reminder times calculated from the user's
+    profile in the same statement. Copies overlapping other events are
+    then found with one query (see find_all_conflicts()), and nothing
+    is copied if there are any.
+    '''
+    if errors := get_rollover_errors(source_start, source_end, target_start):
+        return 0, 0, errors
+
+    # Imported here, as dashboard depends on lesson models.
+    from dashboard.study_planner import replan_after_change
+    from dashboard.timeline import add_to_timeline
+
+    userprofile = user.userprofile
+    day_shifts = get_day_shifts(source_start, source_end, (target_start - source_start).days)
+    source_range = Q(start_time__gte=get_local_midnight(source_start), start_time__lt=get_local_midnight(source_end + timedelta(days=1)))
+    subjects = subjects.filter(user=user)
+    copied_at = now()
+
+    with transaction.atomic():
+        lesson_count = insert_from_select(Lesson, Lesson.objects.filter(source_range, subject__in=subjects), {
+            'subject': F('subject'),
+            'type': F('type'),
+            'start_time': shifted('start_time', day_shifts),
+            'duration': F('duration'),
+            'scheduled_reminder_time': reminder_time(userprofile, 'lesson', shifted('start_time', day_shifts)),
+            'reminder_sent': Value(False),
+            'created_at': Value(copied_at),
+            'last_modified': Value(copied_at),
+        })
+        assessment_count = 0
+
+        if with_assessments:
+            assessment_values = {
+                'type': F('type'),
+                'duration': F('duration'),
+                'description': F('description'),
+                'reminder_sent': Value(False),
+                'created_at': Value(copied_at),
+                'last_modified': Value(copied_at),
+            }
+
+            assessment_count += insert_from_select(
+                Assessment,
+                Assessment.objects.filter(source_range, subject__in=subjects),
+                assessment_values | {
+                    'subject': F('subject'),
+                    'start_time': shifted('start_time', day_shifts),
+                    'scheduled_reminder_time': reminder_time(userprofile, 'assessment', shifted('start_time', day_shifts)),
+                },
+            )
+            # Linked to the copy of their lesson: one of the same subject starting at the shifted time.
+            assessment_count += insert_from_select(
+                Assessment,
+                Assessment.objects.filter(
+                    lesson__in=Lesson.objects.filter(source_range, subject__in=subjects)
+                ).alias(copy_start_time=shifted('lesson__start_time', day_shifts)),
+                assessment_values | {
+                    'lesson': Subquery(
+                        Lesson.objects.filter(
+                            subject=OuterRef('lesson__subject'),
+                            start_time=OuterRef('copy_start_time'),
+                            created_at=copied_at,
+                        ).values('pk')[:1]
+                    ),
+                    'scheduled_reminder_time': reminder_time(userprofile, 'assessment', shifted('lesson__start_time', day_shifts)),
+                },
+            )
+
+        if not lesson_count and not assessment_count:
+            return 0, 0, []
+
+        # Assessments linked to lessons take place during them, so they can't conflict.
+        copied = {
+            ('lesson', pk) for pk in Lesson.objects.filter(subject__in=subjects, created_at=copied_at).values_list('pk', flat=True)
+        } | {
+            ('assessment', pk) for pk in Assessment.objects.filter(subject__in=subjects, created_at=copied_at).values_list('pk', flat=True)
+        }
+        conflicts = [
+            pair for pair in find_all_conflicts(user, get_local_midnight(target_start))
+            if {event[:2] for event in pair} & copied
+        ]
+
+        if conflicts:
+            transaction.set_rollback(True)
+            dates = sorted({localdate(later[2]) for _, later in conflicts})
+            return 0, 0, [
+                f'Copies would overlap with your other lessons or assessments on {", ".join(map(str, dates))}.'
+            ]
+
+        update_counters(user.id, lesson_count=lesson_count, assessment_count=assessment_count)
+        for event_type in ['lesson', 'assessment']:
+            add_to_timeline(event_type, [pk for copied_type, pk in copied if copied_type == event_type])
+
+        until = get_local_midnight(target_start + (source_end - source_start) + timedelta(days=1))
+        transaction.on_commit(lambda: bump_data_version(user.id))
+        transaction.on_commit(lambda: replan_after_change(user.id, until))
+
+    return lesson_count, assessment_count, []
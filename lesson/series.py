@@ -0,0 +1,217 @@
+import heapq
+from collections import defaultdict
+from datetime import date as datetime_date, timedelta
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.timezone import localtime, now
+
+from .models import Lesson, LessonSeries, LessonSeriesException
+
+OCCURRENCE_KEY = '{series_id}:{date}'
+
+
+def get_user_series(user):
+    '''
+    Returns queryset of lesson series of the user,
+    with everything their occurrences display selected.
+    '''
+    return LessonSeries.objects.filter(subject__user=user).select_related('subject__user__userprofile')
+
+
+def get_skipped_dates(series_list, first, last):
+    '''
+    Returns a dict mapping ids of the series to sets of dates between
+    first and last (inclusive), on which their occurrences are not
+    expanded: exceptions and materialised occurrences.
+    Uses a single query.
+    '''
+    skipped = defaultdict(set)
+    if not series_list:
+        return skipped
+
+    exceptions = LessonSeriesException.objects.filter(
+        series__in=series_list, date__range=(first, last)
+    ).values_list('series_id', 'date')
+    materialised = Lesson.objects.filter(
+        series__in=series_list, series_date__range=(first, last)
+    ).values_list('series_id', 'series_date')
+
+    for series_id, date in exceptions.union(materialised, all=True):
+        skipped[series_id].add(date)
+
+    return skipped
+
+
+def iter_series_occurrences(series, start, end, skipped):
+    '''
+    Yields occurrences of the series starting between aware datetimes
+    start (inclusive) and end (exclusive), both optional, as unsaved
+    lessons in order of start time. Dates in skipped are skipped.
+    '''
+    first = localtime(start).date() if start else None
+    last = localtime(end).date() if end else None
+
+    for date in series.get_occurrence_dates(first, last):
+        if date in skipped:
+            continue
+
+        occurrence = series.get_occurrence(date)
+        if (start is None or occurrence.start_time >= start) and (end is None or occurrence.start_time < end):
+            yield occurrence
+
+
+def expand_series(series_list, start=None, end=None):
+    '''
+    Returns occurrences of the series starting between aware datetimes
+    start (inclusive) and end (exclusive), or all of them, as unsaved
+    lessons sorted by start time. Exceptions and materialised occurrences
+    (which are queried as lessons) are skipped.
+    '''
+    first = localtime(start).date() if start else datetime_date.min
+    last = localtime(end).date() if end else datetime_date.max
+    skipped = get_skipped_dates(series_list, first, last)
+    occurrences = [
+        occurrence
+        for series in series_list
+        for occurrence in iter_series_occurrences(series, start, end, skipped[series.id])
+    ]
+
+    return sorted(occurrences, key=lambda occurrence: occurrence.start_time)
+
+
+def get_occurrences(series_queryset, start=None, end=None):
+    '''
+    Returns occurrences of the series in the queryset starting between
+    aware datetimes start and end (both optional), see expand_series().
+    Only series overlapping the range are loaded, which takes a query,
+    and one more if there are any.
+    '''
+    if start is not None:
+        series_queryset = series_queryset.filter(end_date__gte=localtime(start).date())
+    if end is not None:
+        series_queryset = series_queryset.filter(start_time__lt=end)
+
+    return expand_series(list(series_queryset), start, end)
+
+
+def iter_occurrences(series_queryset, start):
+    '''
+    Returns iterator over occurrences of the series in the queryset
+    starting at or after aware datetime start, ordered by start time
+    and key. Each series is expanded only as far as the iterator is
+    consumed, so taking the first few occurrences costs the same
+    for series of any length. Queries like get_occurrences().
+    '''
+    series_list = list(series_queryset.filter(end_date__gte=localtime(start).date()))
+    skipped = get_skipped_dates(series_list, localtime(start).date(), datetime_date.max)
+
+    return heapq.merge(
+        *(iter_series_occurrences(series, start, None, skipped[series.id]) for series in series_list),
+        key=lambda occurrence: (occurrence.start_time, get_occurrence_key(occurrence)),
+    )
+
+
+def get_occurrence_key(lesson):
+    '''
+    Returns key identifying an expanded occurrence,
+    used instead of pk where events are listed.
+    '''
+    return OCCURRENCE_KEY.format(series_id=lesson.series_id, date=lesson.series_date.isoformat())
+
+
+def parse_occurrence_key(key):
+    '''
+    Returns (series id, date) from an occurrence key, or raises ValueError.
+    '''
+    series_id, date = key.split(':')
+    return int(series_id), datetime_date.fromisoformat(date)
+
+
+def materialize_occurrence(series, date):
+    '''
+    Returns lesson of the series occurrence on the given date,
+    saving it first if it's not materialised yet.
+    Expects date to be a valid, not skipped occurrence date.
+    '''
+    if lesson := Lesson.objects.filter(series=series, series_date=date).first():
+        return lesson
+
+    try:
+        with transaction.atomic():
+            lesson = series.get_occurrence(date)
+            lesson.save()
+    except IntegrityError:
+        # Materialised concurrently.
+        lesson = Lesson.objects.get(series=series, series_date=date)
+
+    return lesson
+
+
+def materialize_due_occurrences():
+    '''
+    Materialises occurrences starting within lesson reminder timing
+    of their users from now, so that reminders are scheduled and
+    sent for them like for other lessons. Returns created lessons.
+    '''
+    current_time = now()
+    series_list = list(
+        LessonSeries.objects
+        .filter(end_date__gte=localtime(current_time).date(), subject__user__userprofile__receive_lesson_reminders=True)
+        .select_related('subject__user__userprofile')
+    )
+
+    if not series_list:
+        return []
+
+    # Occurrence is due if it starts within its user's timing, so none starts after the longest one.
+    longest_timing = max(series.subject.user.userprofile.lesson_reminder_timing for series in series_list)
+    lessons = []
+
+    for occurrence in expand_series(series_list, current_time, current_time + longest_timing + timedelta(microseconds=1)):
+        if occurrence.start_time - occurrence.subject.user.userprofile.lesson_reminder_timing > current_time:
+            continue
+
+        try:
+            lessons.append(materialize_occurrence(occurrence.series, occurrence.series_date))
+        except ValidationError:
+            # E.g. overlaps a lesson added since; it stays expanded without a reminder.
+            continue
+
+    return lessons
+
+
+class LessonsWithOccurrences:
+    '''
+    Sequence of lessons of the queryset and expanded occurrences
+    merged by start time, which can be paginated like a queryset.
+    Slicing fetches lessons only up to the end of the slice.
+    '''
+    ordered = True
+
+    def __init__(self, lessons, occurrences, descending=False):
+        self.model = lessons.model
+        self.lessons = lessons.order_by('-start_time' if descending else 'start_time')
+        self.occurrences = occurrences[::-1] if descending else occurrences
+        self.descending = descending
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.lessons.count() + len(self.occurrences)
+        return self._count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start, stop, _ = index.indices(len(self))
+        merged = heapq.merge(
+            self.lessons[:stop], self.occurrences,
+            key=lambda lesson: lesson.start_time, reverse=self.descending,
+        )
+        return list(islice(merged, start, stop))
+
+    def __iter__(self):
+        return iter(self[:])
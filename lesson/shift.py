@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.constants import MAX_TIMEFRAME
+from utils.data_version import bump_data_version
+from utils.query_filters import get_local_midnight
+from utils.reminder_time import get_reminder_timing_from_user_profile, is_reminder_enabled
+from utils.time_conflicts import find_batch_conflicts
+from utils.time_format import format_time
+
+from .models import Lesson
+
+
+def get_shifted_lessons(subject, start_date=None, end_date=None, lesson_type=None):
+    '''
+    Returns future lessons of the subject, optionally only ones starting
+    between start and end dates (inclusive, local) or of a type.
+    '''
+    lessons = Lesson.objects.filter(subject=subject, start_time__gt=now())
+
+    if start_date:
+        lessons = lessons.filter(start_time__gte=get_local_midnight(start_date))
+    if end_date:
+        lessons = lessons.filter(start_time__lt=get_local_midnight(end_date + timedelta(days=1)))
+    if lesson_type:
+        lessons = lessons.filter(type=lesson_type)
+
+    return lessons
+
+
+def get_shift_errors(user, lessons, delta):
+    '''
+    Returns messages of rules shifted lessons would break, checked for
+    all of them at once: lessons must stay in the future and within
+    MAX_TIMEFRAME, must not overlap other events (see find_batch_conflicts()),
+    and homework due at them must still start before the due.
+    Takes [(pk, start_time, duration)] of the lessons.
+    '''
+    errors = []
+    time_format = user.userprofile.time_display_format
+    current_time = now()
+
+    if min(start for _, start, _ in lessons) + delta <= current_time:
+        errors.append('Shifted lessons must start in the future.')
+    if max(start for _, start, _ in lessons) + delta > current_time + MAX_TIMEFRAME:
+        errors.append(f'Shifted lessons can\'t start more than {MAX_TIMEFRAME.days} days ahead.')
+
+    ranges = [(start + delta, start + delta + duration) for _, start, duration in lessons]
+    conflicts = find_batch_conflicts(user, ranges, exclude={'lesson': [pk for pk, _, _ in lessons]})
+
+    errors.extend(
+        f'Lesson on {format_time(lessons[index][1], time_format)} would overlap with another of your lessons or assessments.'
+        for index in sorted(conflicts, key=lambda index: lessons[index][1])
+    )
+
+    if Homework.objects.filter(
+        lesson_due__in=[pk for pk, _, _ in lessons], due_at__isnull=True
+    ).alias(
+        derived_start_time=Coalesce('start_time', 'lesson_given__start_time')
+    ).filter(derived_start_time__gte=F('lesson_due__start_time') + delta).exists():
+        errors.append('Homework due at shifted lessons would be due before it starts.')
+
+    return errors
+
+
+def get_reminder_update(userprofile, event_type, trigger_time):
+    '''
+    Returns {'scheduled_reminder_time': expression} recalculating reminder
+    time from trigger_time expression, if the user receives reminders
+    of event_type, like calculate_scheduled_reminder_time() on save.
+    '''
+    if not is_reminder_enabled(userprofile, event_type):
+        return {}
+    return {'scheduled_reminder_time': trigger_time - get_reminder_timing_from_user_profile(userprofile, event_type)}
+
+
+def shift_lessons(user, lessons, delta):
+    '''
+    Moves the user's lessons of the queryset by delta, if all of them
+    can be moved (see get_shift_errors()).
+    Returns (number of shifted lessons, [messages]).
+
+    Lessons are locked and read with one query, and moved with
+    set-based UPDATEs in one transaction: start and reminder times
+    of lessons, and reminder times of assessments and homework
+    taking their time from them (their times are derived in queries).
+    '''
+    # Imported here, as dashboard depends on lesson models.
+    from dashboard.models import StudyBlock
+    from dashboard.study_planner import replan_after_change
+    from dashboard.timeline import sync_lesson_dependents, sync_timeline
+
+    userprofile = user.userprofile
+
+    with transaction.atomic():
+        rows = list(
+            lessons.filter(subject__user=user)
+            .select_for_update(of=('self',))
+            .order_by('start_time')
+            .values_list('pk', 'start_time', 'duration')
+        )
+
+        if not rows:
+            return 0, []
+
+        if errors := get_shift_errors(user, rows, delta):
+            return 0, errors
+
+        pks = [pk for pk, _, _ in rows]
+        lesson_start_time = Subquery(Lesson.objects.filter(pk=OuterRef('lesson')).values('start_time'))
+        lesson_due_start_time = Subquery(Lesson.objects.filter(pk=OuterRef('lesson_due')).values('start_time'))
+        modified_at = now()
+
+        Lesson.objects.filter(pk__in=pks).update(
+            start_time=F('start_time') + delta,
+            last_modified=modified_at,
+            **get_reminder_update(userprofile, 'lesson', F('start_time') + delta),
+        )
+        # Run after lessons are moved, so that subqueries read new start times.
+        Assessment.objects.filter(lesson__in=pks).update(
+            last_modified=modified_at,
+            **get_reminder_update(userprofile, 'assessment', lesson_start_time),
+        )
+        Homework.objects.filter(lesson_due__in=pks, due_at__isnull=True).update(
+            last_modified=modified_at,
+            **get_reminder_update(userprofile, 'homework', lesson_due_start_time),
+        )
+
+        # Updates send no post_save signals.
+        sync_timeline('lesson', pks)
+        sync_lesson_dependents(pks)
+
+        until = max(start + duration for _, start, duration in rows) + max(delta, timedelta())
+        affected_blocks = StudyBlock.objects.filter(homework__lesson_due__in=pks)
+
+        transaction.on_commit(lambda: bump_data_version(user.id))
+        transaction.on_commit(lambda: replan_after_change(user.id, until, affected_blocks))
+
+    return len(rows), []
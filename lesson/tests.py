@@ -1,13 +1,28 @@
-from datetime import timedelta
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
-from django.utils.timezone import now
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now, localtime, make_aware
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 
 from subject.models import Subject
+from assessment.models import Assessment
+from homework.models import Homework
+from userprofile.models import UserProfile
+from utils.query_filters import filter_by_date_range, get_timeframe_bounds
+from utils.query_plan import analyze, uses_index
+from utils.time_conflicts import filter_overlapping, find_all_conflicts, find_conflicts, get_timed_events
 
-from .models import Lesson
+from .models import Lesson, LessonSeries, LessonSeriesException
+from .rollover import rollover_lessons
+from .series import get_occurrences, get_user_series, materialize_due_occurrences, materialize_occurrence
+from .shift import get_shifted_lessons, shift_lessons
+from .timetable_import import import_lessons, parse_csv, parse_ics
 
 class LessontModelTests(TestCase):
 
@@ -124,4 +139,683 @@ class LessontModelTests(TestCase):
             start_time=self.START_TIME
         )
         self.assertIn(self.subject.name, str(lesson))
-        self.assertIn('self-study', str(lesson).lower())
\ No newline at end of file
+        self.assertIn('self-study', str(lesson).lower())
+
+
+class LessonDateRangeFilterTests(TestCase):
+
+    DURATION = timedelta(minutes=30) # lessons around midnight must not overlap
+
+    def setUp(self):
+        '''Create a test user with profile, subject and reference date in the future.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Discrete Mathematics')
+        self.date = localtime(now()).date() + timedelta(days=10)
+
+    def create_lesson(self, hour, minute=0, days=0):
+        return Lesson.objects.create(
+            subject=self.subject,
+            start_time=make_aware(datetime(self.date.year, self.date.month, self.date.day, hour, minute))
+                + timedelta(days=days),
+            duration=self.DURATION,
+        )
+
+
+    def test_timeframe_bounds_are_half_open_local_midnights(self):
+        '''Test timeframe bounds start and end at local midnight.'''
+        start, end = get_timeframe_bounds('day', self.date)
+        self.assertEqual(localtime(start).date(), self.date)
+        self.assertEqual((localtime(start).hour, localtime(start).minute), (0, 0))
+        self.assertEqual(localtime(end).date(), self.date + timedelta(days=1))
+        self.assertEqual((localtime(end).hour, localtime(end).minute), (0, 0))
+
+
+    def test_day_filter_includes_whole_local_day_only(self):
+        '''Test filtering by day includes lessons up to local midnight and excludes ones starting at it.'''
+        late_lesson = self.create_lesson(hour=23, minute=30)
+        self.create_lesson(hour=0, days=1)
+        self.create_lesson(hour=23, minute=59, days=-1)
+
+        lessons = filter_by_date_range(Lesson.objects.all(), 'day', date=self.date)
+        self.assertQuerySetEqual(lessons, [late_lesson])
+
+
+    def test_next_3_days_filter_covers_four_days(self):
+        '''Test filtering by next 3 days includes the reference date and three following days.'''
+        lessons = [self.create_lesson(hour=12, days=days) for days in range(5)]
+
+        filtered = filter_by_date_range(Lesson.objects.order_by('start_time'), 'next_3_days', date=self.date)
+        self.assertQuerySetEqual(filtered, lessons[:4])
+
+
+    def test_day_filter_uses_start_time_index(self):
+        '''Test filtering by timeframe compares start_time directly, so its index is used.'''
+        queryset = filter_by_date_range(Lesson.objects.all(), 'week', date=self.date)
+        self.assertTrue(uses_index(queryset, 'lesson_start_time_idx'))
+
+
+class LessonListQueryPlanTests(TestCase):
+
+    SUBJECTS = 20
+    LESSONS_PER_SUBJECT = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        '''Create a test user with enough lessons for the planner to pick indexes by selectivity.'''
+        cls.user = User.objects.create_user(username='testuser')
+        subjects = Subject.objects.all().bulk_create(
+            Subject(user=cls.user, name=f'Subject {i}') for i in range(cls.SUBJECTS)
+        )
+        types = Lesson.Type.values
+        Lesson.objects.all().bulk_create(
+            Lesson(
+                subject=subject,
+                type=types[i % len(types)],
+                start_time=now() + timedelta(days=i),
+                duration=timedelta(minutes=90),
+            )
+            for subject in subjects
+            for i in range(cls.LESSONS_PER_SUBJECT)
+        )
+        analyze(Subject, Lesson)
+        cls.subject = subjects[0]
+
+
+    def test_subject_filter_sorted_by_start_time_uses_index(self):
+        '''Test filtering lessons by subject and sorting by start time uses (subject, start_time) index.'''
+        queryset = Lesson.objects.filter(subject=self.subject).order_by('start_time')
+        self.assertTrue(uses_index(queryset, 'lesson_subject_start_idx'))
+
+
+    def test_subject_and_type_filter_uses_index(self):
+        '''Test filtering lessons by subject and exact type uses (subject, type, start_time) index.'''
+        queryset = Lesson.objects.filter(subject=self.subject, type=Lesson.Type.SEMINAR).order_by('start_time')
+        self.assertTrue(uses_index(queryset, 'lesson_subject_type_start_idx'))
+
+
+    def test_subject_filter_sorted_by_created_at_uses_index(self):
+        '''Test filtering lessons by subject and sorting by creation time uses (subject, created_at) index.'''
+        queryset = Lesson.objects.filter(subject=self.subject).order_by('-created_at')
+        self.assertTrue(uses_index(queryset, 'lesson_subject_created_idx'))
+
+
+class LessonDeleteViewTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with a lesson and related assessment and homework.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Linear Algebra')
+        self.lesson, self.next_lesson = Lesson.objects.all().bulk_create(
+            Lesson(subject=self.subject, start_time=now() + timedelta(days=days), duration=timedelta(minutes=90))
+            for days in (1, 8)
+        )
+        Assessment.objects.all().bulk_create([Assessment(lesson=self.lesson)])
+        Homework.objects.all().bulk_create([
+            Homework(lesson_given=self.lesson, lesson_due=self.next_lesson, task='Task'),
+            Homework(lesson_due=self.lesson, task='Task'),
+        ])
+
+
+    def test_related_objects_counts_in_one_query(self):
+        '''Test delete page counts assessments and homework of the lesson in a single query.'''
+        url = reverse('lesson_delete', kwargs={'pk': self.lesson.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.context['related_objects'], {'assessment': 1, 'homework': 2})
+        count_queries = [query for query in queries if 'COUNT(' in query['sql'].upper()]
+        self.assertEqual(len(count_queries), 1)
+
+
+class LessonTimeConflictTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile, subject and a lesson in the future.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Numerical Methods')
+        self.start = make_aware(datetime.combine(localtime(now()).date() + timedelta(days=3), datetime.min.time())) + timedelta(hours=10)
+        self.lesson = Lesson.objects.create(subject=self.subject, start_time=self.start, duration=timedelta(minutes=90))
+
+
+    def test_overlapping_lesson_is_rejected(self):
+        '''Test creating a lesson overlapping another lesson of the user fails.'''
+        with self.assertRaises(ValidationError) as context:
+            Lesson.objects.create(subject=self.subject, start_time=self.start + timedelta(hours=1), duration=timedelta(hours=1))
+        self.assertEqual(context.exception.error_dict['start_time'][0].code, 'time_conflict')
+
+
+    def test_adjacent_lessons_and_other_users_lessons_dont_conflict(self):
+        '''Test lesson starting when another ends, or overlapping other user's lesson, is valid.'''
+        other_user = User.objects.create_user(username='otheruser')
+        UserProfile.objects.create(user=other_user)
+        other_subject = Subject.objects.create(user=other_user, name='Numerical Methods')
+
+        Lesson.objects.create(subject=self.subject, start_time=self.start + timedelta(minutes=90), duration=timedelta(hours=1))
+        Lesson.objects.create(subject=other_subject, start_time=self.start, duration=timedelta(hours=1))
+
+
+    def test_lesson_doesnt_conflict_with_itself(self):
+        '''Test moving a lesson within its own time is valid.'''
+        self.lesson.start_time += timedelta(minutes=30)
+        self.lesson.save()
+
+
+    def test_lesson_overlapping_own_time_assessment_is_rejected(self):
+        '''Test creating a lesson overlapping an assessment with its own time fails.'''
+        Assessment.objects.create(subject=self.subject, start_time=self.start + timedelta(hours=3), duration=timedelta(hours=2))
+        with self.assertRaises(ValidationError):
+            Lesson.objects.create(subject=self.subject, start_time=self.start + timedelta(hours=4), duration=timedelta(hours=1))
+
+
+    def test_overlap_query_uses_index(self):
+        '''Test overlap query uses the time range index on PostgreSQL, or the start time one elsewhere.'''
+        queryset = filter_overlapping(get_timed_events(self.user)['lesson'], 'lesson', self.start, self.start + timedelta(hours=1))
+        index_name = 'lesson_subject_time_range_idx' if connection.vendor == 'postgresql' else 'lesson_subject_start_idx'
+
+        self.assertQuerySetEqual(queryset, [self.lesson])
+        self.assertTrue(uses_index(queryset, index_name))
+
+
+    def test_find_all_conflicts_in_two_queries(self):
+        '''Test all overlapping pairs of lessons and assessments are found with a single query, and one for lesson series.'''
+        lesson, later_lesson = Lesson.objects.all().bulk_create([
+            Lesson(subject=self.subject, start_time=self.start + timedelta(hours=1), duration=timedelta(hours=2)),
+            Lesson(subject=self.subject, start_time=self.start + timedelta(hours=2), duration=timedelta(hours=1)),
+        ])
+        assessment, = Assessment.objects.all().bulk_create([
+            Assessment(subject=self.subject, start_time=self.start + timedelta(hours=2, minutes=30)),
+        ])
+
+        with CaptureQueriesContext(connection) as queries:
+            conflicts = find_all_conflicts(self.user)
+
+        pairs = [tuple((event_type, pk) for event_type, pk, _, _ in pair) for pair in conflicts]
+        self.assertEqual(pairs, [
+            (('lesson', self.lesson.pk), ('lesson', lesson.pk)),
+            (('lesson', lesson.pk), ('lesson', later_lesson.pk)),
+            (('lesson', lesson.pk), ('assessment', assessment.pk)),
+            (('lesson', later_lesson.pk), ('assessment', assessment.pk)),
+        ])
+        self.assertEqual(len(queries), 2)
+
+
+    def test_series_occurrences_conflict(self):
+        '''Test expanded occurrences of series conflict like lessons, except an occurrence being materialised with itself.'''
+        series = LessonSeries.objects.create(
+            subject=self.subject, start_time=self.start + timedelta(hours=2), duration=timedelta(minutes=90),
+            end_date=localtime(self.start).date() + timedelta(weeks=1),
+        )
+        first, second = get_occurrences(get_user_series(self.user))
+        keys = [f'{series.pk}:{occurrence.series_date.isoformat()}' for occurrence in [first, second]]
+
+        with self.assertRaises(ValidationError):
+            Lesson.objects.create(subject=self.subject, start_time=second.start_time + timedelta(minutes=30), duration=timedelta(hours=1))
+        self.assertEqual(find_conflicts(self.user, self.start, first.start_time + timedelta(minutes=1)), [('lesson', self.lesson.pk), ('lesson', keys[0])])
+
+        lesson, = Lesson.objects.all().bulk_create([
+            Lesson(subject=self.subject, start_time=second.start_time + timedelta(minutes=30), duration=timedelta(hours=1)),
+        ])
+        self.assertEqual(
+            [tuple((event_type, pk) for event_type, pk, _, _ in pair) for pair in find_all_conflicts(self.user)],
+            [(('lesson', keys[1]), ('lesson', lesson.pk))],
+        )
+        self.assertIsNotNone(materialize_occurrence(series, first.series_date).pk)
+
+
+    def test_overlapping_series_is_rejected(self):
+        '''Test creating a series with an occurrence overlapping a lesson or another series fails, and saving a series doesn't conflict with itself.'''
+        Lesson.objects.create(subject=self.subject, start_time=self.start + timedelta(weeks=1, hours=2, minutes=30), duration=timedelta(hours=1))
+        series = LessonSeries.objects.create(
+            subject=self.subject, start_time=self.start + timedelta(hours=4), duration=timedelta(minutes=90),
+            end_date=localtime(self.start).date() + timedelta(weeks=2),
+        )
+
+        for start_time in [self.start + timedelta(hours=2), self.start + timedelta(weeks=1, hours=4, minutes=30)]:
+            with self.assertRaises(ValidationError) as context:
+                LessonSeries.objects.create(
+                    subject=self.subject, start_time=start_time, duration=timedelta(minutes=90),
+                    end_date=localtime(self.start).date() + timedelta(weeks=2),
+                )
+            self.assertEqual(context.exception.error_dict['start_time'][0].code, 'time_conflict')
+
+        materialize_occurrence(series, localtime(series.start_time).date())
+        series.end_date += timedelta(weeks=1)
+        series.save()
+
+
+class LessonSeriesTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile, subject and a weekly series of five lessons.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Signal Processing')
+        self.first_date = localtime(now()).date() + timedelta(days=2)
+        self.series = LessonSeries.objects.create(
+            subject=self.subject,
+            start_time=make_aware(datetime.combine(self.first_date, datetime.min.time())) + timedelta(hours=10),
+            duration=timedelta(minutes=90),
+            end_date=self.first_date + timedelta(weeks=4),
+        )
+
+    def dates(self, occurrences):
+        return [occurrence.series_date for occurrence in occurrences]
+
+    def week(self, weeks):
+        return self.first_date + timedelta(weeks=weeks)
+
+
+    def test_occurrences_follow_recurrence_until_end_date(self):
+        '''Test weekly and biweekly series expand to occurrences at the same local time up to end date.'''
+        occurrences = get_occurrences(get_user_series(self.user))
+        self.assertEqual(self.dates(occurrences), [self.week(weeks) for weeks in range(5)])
+        self.assertTrue(all(localtime(occurrence.start_time).hour == 10 for occurrence in occurrences))
+        self.assertTrue(all(occurrence.pk is None for occurrence in occurrences))
+
+        self.series.recurrence = LessonSeries.Recurrence.BIWEEKLY
+        self.series.save()
+        self.assertEqual(self.dates(get_occurrences(get_user_series(self.user))), [self.week(0), self.week(2), self.week(4)])
+
+
+    def test_occurrences_limited_to_range(self):
+        '''Test only occurrences starting in the queried range are expanded.'''
+        start = make_aware(datetime.combine(self.week(1), datetime.min.time()))
+        occurrences = get_occurrences(get_user_series(self.user), start, start + timedelta(weeks=2))
+        self.assertEqual(self.dates(occurrences), [self.week(1), self.week(2)])
+
+
+    def test_skipped_and_materialised_occurrences_not_expanded(self):
+        '''Test exception dates are skipped, and materialised occurrences are queried as lessons only.'''
+        LessonSeriesException.objects.create(series=self.series, date=self.week(1))
+        self.client.post(reverse('lesson_occurrence', args=[self.series.pk, self.week(2).isoformat()]), {'action': 'assessment'})
+
+        occurrences = get_occurrences(get_user_series(self.user))
+
+        self.assertEqual(self.dates(occurrences), [self.week(0), self.week(3), self.week(4)])
+        self.assertEqual(list(Lesson.objects.values_list('series_date', flat=True)), [self.week(2)])
+
+
+    def test_attaching_materialises_occurrence_once(self):
+        '''Test attaching events to an occurrence saves it as a lesson the first time only.'''
+        url = reverse('lesson_occurrence', args=[self.series.pk, self.week(1).isoformat()])
+
+        response = self.client.post(url, {'action': 'assessment'})
+        lesson = Lesson.objects.get()
+        self.assertRedirects(response, f'{reverse("assessment_create")}?lesson={lesson.pk}', fetch_redirect_response=False)
+        self.assertEqual((lesson.subject, lesson.start_time), (self.subject, self.series.start_time + timedelta(weeks=1)))
+
+        self.client.post(url, {'action': 'homework_due'})
+        self.assertEqual(Lesson.objects.count(), 1)
+        self.assertRedirects(self.client.get(url), reverse('lesson_detail', args=[lesson.pk]))
+
+
+    def test_homework_given_at_past_occurrence(self):
+        '''Test adding homework given at an occurrence that took place materialises it in the past.'''
+        LessonSeries.objects.filter(pk=self.series.pk).update(start_time=self.series.start_time - timedelta(weeks=2))
+        date = self.week(-1)
+
+        response = self.client.post(reverse('lesson_occurrence', args=[self.series.pk, date.isoformat()]), {'action': 'homework_given'})
+
+        lesson = Lesson.objects.get()
+        self.assertRedirects(response, f'{reverse("homework_create")}?lesson_given={lesson.pk}', fetch_redirect_response=False)
+        self.assertEqual(lesson.series_date, date)
+        self.assertLess(lesson.start_time, now())
+
+
+    def test_deleting_materialised_occurrence_skips_it(self):
+        '''Test deleted materialised occurrence is recorded as exception and not expanded again.'''
+        url = reverse('lesson_occurrence', args=[self.series.pk, self.week(0).isoformat()])
+        self.client.post(url, {'action': 'assessment'})
+
+        Lesson.objects.get().delete()
+
+        self.assertEqual(self.dates(get_occurrences(get_user_series(self.user))), [self.week(weeks) for weeks in range(1, 5)])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+    def test_list_merges_occurrences_with_lessons(self):
+        '''Test lesson list pages through lessons and occurrences sorted by start time.'''
+        lesson = Lesson.objects.create(
+            subject=self.subject, start_time=self.series.start_time + timedelta(days=1), duration=timedelta(hours=1)
+        )
+
+        response = self.client.get(reverse('lesson_list'))
+        page = response.context['user_lessons']
+
+        self.assertEqual(response.context['paginator'].count, 6)
+        self.assertEqual([item.pk for item in page], [None, lesson.pk, None, None, None, None])
+        self.assertContains(response, reverse('lesson_occurrence', args=[self.series.pk, self.week(1).isoformat()]))
+
+        descending = self.client.get(reverse('lesson_list'), {'sort_by': '-start_time'}).context['user_lessons']
+        self.assertEqual([item.start_time for item in descending], sorted((item.start_time for item in page), reverse=True))
+
+
+    def test_due_reminders_materialise_occurrences(self):
+        '''Test occurrences starting within reminder timing are materialised with a scheduled reminder.'''
+        UserProfile.objects.filter(user=self.user).update(receive_lesson_reminders=True, lesson_reminder_timing=timedelta(days=3))
+
+        lessons = materialize_due_occurrences()
+
+        self.assertEqual([lesson.series_date for lesson in lessons], [self.week(0)])
+        self.assertEqual(lessons[0].scheduled_reminder_time, self.series.start_time - timedelta(days=3))
+        self.assertEqual(materialize_due_occurrences(), [])
+
+
+class LessonBulkCreateTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile with lesson reminders, and a subject.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user, receive_lesson_reminders=True)
+        self.subject = Subject.objects.create(user=self.user, name='Cryptography')
+        self.start = make_aware(datetime.combine(localtime(now()).date() + timedelta(days=2), datetime.min.time())) + timedelta(hours=8)
+
+
+    def test_bulk_create_validates_batch_with_constant_queries(self):
+        '''Test bulk created lessons get reminder times, and validating more of them takes no more queries.'''
+        counts = []
+        for days in [(0, 1), range(2, 30)]:
+            with CaptureQueriesContext(connection) as queries:
+                Lesson.objects.bulk_create(
+                    Lesson(subject_id=self.subject.pk, start_time=self.start + timedelta(days=day), duration=timedelta(hours=1))
+                    for day in days
+                )
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Lesson.objects.count(), 30)
+        self.assertFalse(Lesson.objects.filter(scheduled_reminder_time__isnull=True).exists())
+
+
+    def test_bulk_create_rejects_overlaps_within_batch(self):
+        '''Test batch with lessons overlapping each other fails with a time conflict error.'''
+        with self.assertRaises(ValidationError) as context:
+            Lesson.objects.bulk_create([
+                Lesson(subject=self.subject, start_time=self.start, duration=timedelta(hours=1)),
+                Lesson(subject=self.subject, start_time=self.start + timedelta(minutes=30), duration=timedelta(hours=1)),
+            ])
+
+        self.assertEqual(context.exception.error_dict['start_time'][0].code, 'time_conflict')
+        self.assertFalse(Lesson.objects.exists())
+
+
+class LessonImportTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile with lesson reminders, and two subjects.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user, receive_lesson_reminders=True)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Compilers')
+        Subject.objects.create(user=self.user, name='Operating Systems')
+        self.date = localtime(now()).date() + timedelta(days=3)
+
+    def local(self, hour, minute=0):
+        return make_aware(datetime.combine(self.date, datetime.min.time())) + timedelta(hours=hour, minutes=minute)
+
+    def csv_lines(self, *rows):
+        return ['subject,type,start_time,duration\n'] + [row + '\n' for row in rows]
+
+
+    def test_csv_rows_imported_with_defaults_and_reminders(self):
+        '''Test valid CSV rows create lessons with default type and duration, and scheduled reminders.'''
+        created, errors = import_lessons(self.user, parse_csv(self.csv_lines(
+            f'compilers,Seminar,{self.date} 09:00,45',
+            f'Operating Systems,,{self.date} 10:00,',
+        )))
+
+        self.assertEqual((created, errors), (2, []))
+        seminar, lecture = Lesson.objects.order_by('start_time')
+        self.assertEqual((seminar.type, seminar.duration, seminar.start_time), ('S', timedelta(minutes=45), self.local(9)))
+        self.assertEqual((lecture.type, lecture.duration), ('L', self.user.userprofile.lesson_duration))
+        self.assertEqual(lecture.scheduled_reminder_time, self.local(10) - self.user.userprofile.lesson_reminder_timing)
+
+
+    def test_invalid_rows_reported_and_nothing_imported(self):
+        '''Test errors are reported per row, including overlaps, and no lessons are created.'''
+        Lesson.objects.create(subject=self.subject, start_time=self.local(12), duration=timedelta(hours=1))
+
+        created, errors = import_lessons(self.user, parse_csv(self.csv_lines(
+            f'Compilers,L,{self.date} 08:00,60',
+            f'Databases,L,{self.date} 14:00,60',
+            f'Compilers,X,yesterday,abc',
+            f'Compilers,L,{self.date} 12:30,60',
+            f'Compilers,L,{self.date} 08:30,60',
+            f'Compilers,L,2000-01-01 08:00,60',
+        )))
+
+        self.assertEqual(created, 0)
+        self.assertEqual([(row_number, len(messages)) for row_number, messages in errors], [(3, 1), (4, 3), (5, 1), (6, 1), (7, 1)])
+        self.assertEqual(Lesson.objects.count(), 1)
+
+
+    def test_ics_events_imported(self):
+        '''Test iCalendar events with folded lines, UTC, zone and local times are imported.'''
+        start = self.local(9).astimezone(ZoneInfo('UTC'))
+        created, errors = import_lessons(self.user, parse_ics([
+            'BEGIN:VCALENDAR\r\n',
+            'BEGIN:VEVENT\r\n',
+            'SUMMARY:Oper\r\n',
+            ' ating Systems\r\n',
+            'CATEGORIES:Practice\r\n',
+            f'DTSTART:{start:%Y%m%dT%H%M%S}Z\r\n',
+            'DURATION:PT1H30M\r\n',
+            'END:VEVENT\r\n',
+            'BEGIN:VEVENT\r\n',
+            'SUMMARY:Compilers\r\n',
+            f'DTSTART;TZID=Europe/Kyiv:{self.date:%Y%m%d}T120000\r\n',
+            f'DTEND:{self.date:%Y%m%d}T130000\r\n',
+            'END:VEVENT\r\n',
+            'END:VCALENDAR\r\n',
+        ]))
+
+        self.assertEqual((created, errors), (2, []))
+        self.assertEqual(
+            list(Lesson.objects.order_by('start_time').values_list('subject__name', 'type', 'start_time', 'duration')),
+            [
+                ('Operating Systems', 'P', self.local(9), timedelta(minutes=90)),
+                ('Compilers', 'L', self.local(12), timedelta(hours=1)),
+            ]
+        )
+
+
+    def test_import_takes_few_queries(self):
+        '''Test importing many lessons takes a few queries, not ones per row (SQLite inserts in smaller batches).'''
+        rows = [
+            f'Compilers,L,{self.date + timedelta(days=day)} {hour:02}:00,45'
+            for day in range(100) for hour in range(8, 13)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            created, errors = import_lessons(self.user, parse_csv(self.csv_lines(*rows)))
+
+        self.assertEqual((created, errors), (500, []))
+        self.assertLess(len(queries), 16)
+
+
+    def test_import_view_uploads_file(self):
+        '''Test uploading a CSV file imports it and redirects to the lesson list, or shows row errors.'''
+        url = reverse('lesson_import')
+        valid = SimpleUploadedFile('timetable.csv', ''.join(self.csv_lines(f'Compilers,L,{self.date} 09:00,60')).encode())
+        invalid = SimpleUploadedFile('timetable.csv', ''.join(self.csv_lines(f'Databases,L,{self.date} 11:00,60')).encode())
+
+        self.assertRedirects(self.client.post(url, {'file': valid}), reverse('lesson_list'))
+        response = self.client.post(url, {'file': invalid})
+
+        self.assertContains(response, 'Line 2: You have no subject')
+        self.assertEqual(Lesson.objects.count(), 1)
+
+
+class LessonShiftTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile with reminders, a subject with three weekly lessons, and another subject.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.profile = UserProfile.objects.create(user=self.user, receive_lesson_reminders=True)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Compilers')
+        self.other_subject = Subject.objects.create(user=self.user, name='Operating Systems')
+        self.start = localtime(now()).replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        self.lessons = Lesson.objects.bulk_create(
+            Lesson(subject=self.subject, start_time=self.start + timedelta(weeks=week), duration=timedelta(minutes=90))
+            for week in range(3)
+        )
+
+    def shift(self, delta, **filters):
+        return shift_lessons(self.user, get_shifted_lessons(self.subject, **filters), delta)
+
+
+    def test_shift_moves_lessons_and_dependent_reminders(self):
+        '''Test shifting lessons moves their start and reminder times, and reminders of assessments and homework at them.'''
+        assessment = Assessment.objects.create(lesson=self.lessons[1])
+        homework = Homework.objects.create(lesson_due=self.lessons[2], task='Write a parser')
+
+        with CaptureQueriesContext(connection) as queries:
+            shifted, errors = self.shift(timedelta(days=1))
+
+        self.assertEqual((shifted, errors), (3, []))
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "lesson"') for query in queries), 1)
+
+        lessons = Lesson.objects.order_by('start_time')
+        self.assertEqual([lesson.start_time for lesson in lessons], [self.start + timedelta(weeks=week, days=1) for week in range(3)])
+        self.assertEqual(lessons[0].scheduled_reminder_time, lessons[0].start_time - self.profile.lesson_reminder_timing)
+
+        assessment.refresh_from_db()
+        homework.refresh_from_db()
+        self.assertEqual(assessment.scheduled_reminder_time, lessons[1].start_time - self.profile.assessment_reminder_timing)
+        self.assertEqual(homework.scheduled_reminder_time, lessons[2].start_time - self.profile.homework_reminder_timing)
+
+
+    def test_filtered_shift_moves_only_matching_lessons(self):
+        '''Test shift limited to a date range keeps other lessons in place.'''
+        shifted, errors = self.shift(timedelta(hours=2), start_date=(self.start + timedelta(weeks=1)).date())
+
+        self.assertEqual((shifted, errors), (2, []))
+        self.assertEqual(Lesson.objects.get(pk=self.lessons[0].pk).start_time, self.start)
+
+
+    def test_conflicting_shift_moves_nothing(self):
+        '''Test shift making a lesson overlap another subject's lesson, or start in the past, moves no lessons.'''
+        Lesson.objects.create(subject=self.other_subject, start_time=self.start + timedelta(weeks=2, days=1), duration=timedelta(minutes=90))
+
+        for delta in [timedelta(days=1), timedelta(days=-3)]:
+            shifted, errors = self.shift(delta)
+            self.assertEqual((shifted, len(errors)), (0, 1))
+
+        self.assertEqual(
+            list(Lesson.objects.filter(subject=self.subject).order_by('start_time').values_list('start_time', flat=True)),
+            [lesson.start_time for lesson in self.lessons]
+        )
+
+
+    def test_shift_view_redirects_to_subject(self):
+        '''Test shift form moves lessons of the chosen subject and redirects to it.'''
+        response = self.client.post(reverse('lesson_shift'), {'subject': self.subject.pk, 'days': 0, 'minutes': 30})
+
+        self.assertRedirects(response, reverse('subject_detail', args=[self.subject.pk]), fetch_redirect_response=False)
+        self.assertEqual(Lesson.objects.get(pk=self.lessons[0].pk).start_time, self.start + timedelta(minutes=30))
+
+
+    def test_shift_view_rejects_out_of_range_params(self):
+        '''Test shift form rejects shifts longer than the timeframe and end date at the end of the date range.'''
+        for params in [{'days': 3000000, 'minutes': 0}, {'days': 0, 'minutes': -10 ** 9}, {'days': 1, 'minutes': 0, 'end_date': '9999-12-31'}]:
+            response = self.client.post(reverse('lesson_shift'), {'subject': self.subject.pk, **params})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['form'].errors)
+
+        self.assertEqual(Lesson.objects.get(pk=self.lessons[0].pk).start_time, self.start)
+
+
+class LessonRolloverTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile with reminders, and a subject with weekly lessons of a past term.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.profile = UserProfile.objects.create(user=self.user, receive_lesson_reminders=True)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Compilers')
+        self.source_start = localtime(now()).date() - timedelta(weeks=26)
+        self.source_end = self.source_start + timedelta(weeks=4) - timedelta(days=1)
+        self.target_start = self.source_start + timedelta(weeks=30)
+        self.lessons = Lesson.objects.all().bulk_create(
+            Lesson(
+                subject=self.subject,
+                start_time=make_aware(datetime.combine(self.source_start + timedelta(weeks=week), datetime.min.time())) + timedelta(hours=10),
+                duration=timedelta(minutes=90),
+            )
+            for week in range(4)
+        )
+
+    def rollover(self, **kwargs):
+        return rollover_lessons(
+            self.user, Subject.objects.filter(user=self.user), self.source_start, self.source_end, self.target_start, **kwargs
+        )
+
+
+    def test_rollover_copies_lessons_and_assessments_keeping_local_time(self):
+        '''Test rollover copies lessons and linked assessments to the same weekdays and local times, with reminders.'''
+        Assessment.objects.all().bulk_create([Assessment(lesson=self.lessons[3])])
+
+        with CaptureQueriesContext(connection) as queries:
+            copied, assessments, errors = self.rollover(with_assessments=True)
+
+        self.assertEqual((copied, assessments, errors), (4, 1, []))
+        self.assertEqual(sum(query['sql'].startswith(('INSERT INTO "lesson"', 'INSERT INTO "assessment"')) for query in queries), 3)
+
+        copies = Lesson.objects.filter(start_time__gte=now()).order_by('start_time')
+        self.assertEqual(
+            [(localtime(copy.start_time).date(), localtime(copy.start_time).hour) for copy in copies],
+            [(self.target_start + timedelta(weeks=week), 10) for week in range(4)]
+        )
+        self.assertEqual(copies[0].scheduled_reminder_time, copies[0].start_time - self.profile.lesson_reminder_timing)
+        self.assertEqual(Assessment.objects.get(lesson__in=copies).lesson, copies[3])
+
+
+    def test_conflicting_rollover_copies_nothing(self):
+        '''Test rollover making a copy overlap an existing lesson copies no lessons.'''
+        Lesson.objects.create(
+            subject=Subject.objects.create(user=self.user, name='Operating Systems'),
+            start_time=make_aware(datetime.combine(self.target_start + timedelta(weeks=2), datetime.min.time())) + timedelta(hours=11),
+            duration=timedelta(minutes=30),
+        )
+
+        copied, _, errors = self.rollover()
+
+        self.assertEqual((copied, len(errors)), (0, 1))
+        self.assertEqual(Lesson.objects.count(), 5)
+
+
+    def test_rollover_view_redirects_to_lessons(self):
+        '''Test rollover form copies lessons of the chosen subjects and redirects to the lesson list.'''
+        response = self.client.post(reverse('lesson_rollover'), {
+            'subjects': [self.subject.pk],
+            'source_start': self.source_start,
+            'source_end': self.source_end,
+            'target_start': self.target_start,
+        })
+
+        self.assertRedirects(response, reverse('lesson_list'), fetch_redirect_response=False)
+        self.assertEqual(Lesson.objects.count(), 8)
+
+
+    def test_rollover_rejects_dates_at_end_of_date_range(self):
+        '''Test rollover to a target too far ahead, or from the end of the date range, copies nothing.'''
+        for source_start, source_end, target_start in [
+            (self.source_start, self.source_end, date(9999, 12, 28)),
+            (date(9999, 12, 1), date.max, self.target_start),
+        ]:
+            response = self.client.post(reverse('lesson_rollover'), {
+                'subjects': [self.subject.pk],
+                'source_start': source_start,
+                'source_end': source_end,
+                'target_start': target_start,
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['rollover_errors']), 1)
+
+        self.assertEqual(Lesson.objects.count(), 4)
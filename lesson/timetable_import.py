@@ -0,0 +1,307 @@
+import csv
+import io
+from datetime import datetime, timezone
+from itertools import batched
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime, parse_duration as parse_iso_duration
+from django.utils.timezone import is_naive, make_aware
+
+from subject.models import Subject
+
+from utils.batch_validation import get_batch_errors
+from utils.constants import LESSON_IMPORT_BATCH_SIZE, MAX_IMPORTED_LESSONS
+from utils.counters import update_counters
+from utils.data_version import bump_data_version
+from utils.duration import parse_duration
+
+from .models import Lesson
+
+CSV_COLUMNS = ['subject', 'type', 'start_time', 'duration']
+ICS_DATETIME_FORMAT = '%Y%m%dT%H%M%S'
+IMPORT_FILE_EXTENSIONS = ['csv', 'ics']
+
+
+class TimetableImportError(ValueError):
+    pass
+
+
+def parse_csv(lines):
+    '''
+    Yields (row number, {field: value}) of lessons from lines of CSV
+    with header containing CSV_COLUMNS: subject name, type (code or label),
+    start time ("YYYY-MM-DD HH:MM", local unless offset is given)
+    and duration in minutes (optional).
+    '''
+    reader = csv.DictReader(lines)
+
+    if reader.fieldnames is None or not {'subject', 'start_time'} <= set(reader.fieldnames):
+        raise TimetableImportError(f'CSV header must contain columns: {", ".join(CSV_COLUMNS)}.')
+
+    for row in reader:
+        yield reader.line_num, {
+            'subject': row.get('subject'),
+            'type': row.get('type'),
+            'start_time': parse_import_datetime(row.get('start_time')),
+            'duration': parse_import_minutes(row.get('duration')),
+        }
+
+
+def parse_ics(lines):
+    '''
+    Yields (line number, {field: value}) of lessons from lines of iCalendar
+    VEVENTs: SUMMARY is the subject name, CATEGORIES the type, and
+    DTSTART with DTEND or DURATION the time. Lines are unfolded
+    on the fly, so the file is never loaded whole.
+    '''
+    event = None
+    event_line = None
+
+    for line_number, line in unfold_ics_lines(lines):
+        name, params, value = split_ics_line(line)
+
+        if name == 'BEGIN' and value == 'VEVENT':
+            event, event_line = {}, line_number
+        elif name == 'END' and value == 'VEVENT' and event is not None:
+            yield event_line, get_ics_event_fields(event)
+            event = None
+        elif event is not None:
+            event[name] = (params, value)
+
+
+def unfold_ics_lines(lines):
+    '''
+    Yields (number of the first line, line) of iCalendar content lines,
+    joining continuation lines (starting with whitespace) to them.
+    '''
+    current = None
+    current_number = None
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+
+        if current:
+            yield current_number, current
+        current, current_number = line, line_number
+
+    if current:
+        yield current_number, current
+
+
+def split_ics_line(line):
+    '''
+    Returns (NAME, {PARAM: value}, value) of an iCalendar content line.
+    '''
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    params = dict(param.partition('=')[::2] for param in params)
+
+    return name.upper(), {key.upper(): param for key, param in params.items()}, value
+
+
+def get_ics_event_fields(event):
+    '''
+    Returns {field: value} of lesson from {NAME: (params, value)} of a VEVENT.
+    Parsing errors are returned as values, so that they are reported
+    with errors of other fields.
+    '''
+    if 'RRULE' in event:
+        return {'error': TimetableImportError('Recurring events are not supported, add them as a lesson series.')}
+
+    start_time = parse_ics_datetime(*event.get('DTSTART', ({}, '')))
+    duration = None
+
+    if 'DURATION' in event:
+        duration = parse_iso_duration(event['DURATION'][1]) or TimetableImportError('Invalid DURATION.')
+    elif 'DTEND' in event:
+        end_time = parse_ics_datetime(*event['DTEND'])
+        if isinstance(end_time, Exception):
+            duration = end_time
+        elif not isinstance(start_time, Exception):
+            duration = end_time - start_time
+
+    return {
+        'subject': unescape_ics_text(event.get('SUMMARY', ({}, ''))[1]),
+        'type': unescape_ics_text(event.get('CATEGORIES', ({}, ''))[1]).split(',')[0],
+        'start_time': start_time,
+        'duration': duration,
+    }
+
+
+def parse_ics_datetime(params, value):
+    '''
+    Returns aware datetime of an iCalendar DATE-TIME value, in UTC ("Z" suffix),
+    TZID param's zone or local time, or TimetableImportError if it's invalid.
+    '''
+    if params.get('VALUE') == 'DATE':
+        return TimetableImportError('All-day events can\'t be imported as lessons.')
+
+    try:
+        if value.endswith('Z'):
+            return datetime.strptime(value[:-1], ICS_DATETIME_FORMAT).replace(tzinfo=timezone.utc)
+
+        naive = datetime.strptime(value, ICS_DATETIME_FORMAT)
+        return make_aware(naive, ZoneInfo(params['TZID'])) if 'TZID' in params else make_aware(naive)
+    except (ValueError, ZoneInfoNotFoundError):
+        return TimetableImportError(f'Invalid time "{value}".')
+
+
+def unescape_ics_text(value):
+    return value.replace('\\n', ' ').replace('\\N', ' ').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\').strip()
+
+
+def parse_import_datetime(value):
+    '''
+    Returns aware datetime of ISO 8601 value (local if it has no offset),
+    or TimetableImportError if it's invalid.
+    '''
+    try:
+        parsed = parse_datetime((value or '').strip())
+    except ValueError:
+        parsed = None
+
+    if parsed is None:
+        return TimetableImportError(f'Invalid start time "{value}", expected YYYY-MM-DD HH:MM.')
+
+    return make_aware(parsed) if is_naive(parsed) else parsed
+
+
+def parse_import_minutes(value):
+    '''
+    Returns duration of value in minutes, None if it's blank,
+    or TimetableImportError if it's invalid.
+    '''
+    if not (value or '').strip():
+        return None
+    return parse_duration(value) or TimetableImportError(f'Invalid duration "{value}", expected minutes.')
+
+
+def get_lesson_type(value):
+    '''
+    Returns Lesson.Type of code or label (case-insensitive),
+    default one if it's blank, or None if it's unknown.
+    '''
+    value = (value or '').strip().casefold()
+
+    if not value:
+        return Lesson.Type.LECTURE
+
+    for lesson_type in Lesson.Type:
+        if value in (lesson_type.value.casefold(), lesson_type.label.casefold()):
+            return lesson_type
+
+    return None
+
+
+def build_lesson(fields, subjects, userprofile):
+    '''
+    Returns unsaved lesson of parsed row fields, or raises ValidationError
+    if they can't be parsed. Subjects are looked up by case-insensitive
+    name in the preloaded {name: subject} dict, and missing duration
+    defaults to the user's one.
+    '''
+    if 'error' in fields:
+        raise ValidationError(str(fields['error']))
+
+    errors = {
+        field: str(value)
+        for field, value in fields.items()
+        if isinstance(value, Exception)
+    }
+
+    subject = subjects.get((fields['subject'] or '').strip().casefold())
+    if subject is None:
+        errors['subject'] = f'You have no subject "{fields["subject"]}".'
+
+    lesson_type = get_lesson_type(fields['type'])
+    if lesson_type is None:
+        errors['type'] = f'Unknown lesson type "{fields["type"]}".'
+
+    if errors:
+        raise ValidationError(errors)
+
+    return Lesson(
+        subject=subject,
+        type=lesson_type,
+        start_time=fields['start_time'],
+        duration=fields['duration'] or userprofile.lesson_duration,
+    )
+
+
+def import_lessons(user, rows):
+    '''
+    Creates lessons of the user from (row number, fields) rows
+    (see parse_csv() and parse_ics()), if all of them are valid.
+    Returns (number of created lessons, [(row number, [messages])]).
+
+    User's subjects and profile are loaded once, rows are parsed
+    in batches as they are read, and all lessons are validated at once
+    with a constant number of queries (see get_batch_errors()).
+    Lessons are inserted in batches in one transaction.
+    Nothing is created if any row is invalid.
+    '''
+    userprofile = user.userprofile
+    subjects = {subject.name.casefold(): subject for subject in Subject.objects.filter(user=user)}
+    lessons = []
+    row_numbers = []
+    errors = []
+
+    try:
+        for batch in batched(rows, LESSON_IMPORT_BATCH_SIZE):
+            for row_number, fields in batch:
+                try:
+                    lessons.append(build_lesson(fields, subjects, userprofile))
+                    row_numbers.append(row_number)
+                except ValidationError as error:
+                    errors.append((row_number, error.messages))
+
+            if len(lessons) + len(errors) > MAX_IMPORTED_LESSONS:
+                return 0, [(None, [f'You can\'t import more than {MAX_IMPORTED_LESSONS} lessons at once.'])]
+    except (TimetableImportError, csv.Error, UnicodeDecodeError) as error:
+        return 0, errors + [(None, [str(error) or 'File can\'t be read.'])]
+
+    errors.extend((row_numbers[index], error.messages) for index, error in get_batch_errors(lessons).items())
+
+    if errors:
+        return 0, sorted(errors, key=lambda error: error[0])
+
+    if not lessons:
+        return 0, []
+
+    for lesson in lessons:
+        lesson.prepare_for_save()
+
+    # Imported here, as dashboard depends on lesson models.
+    from dashboard.study_planner import replan_after_change
+    from dashboard.timeline import sync_created
+
+    until = max(lesson.start_time + lesson.duration for lesson in lessons)
+
+    with transaction.atomic():
+        # Validated above, so skipping validation of the manager.
+        Lesson.objects.all().bulk_create(lessons, batch_size=LESSON_IMPORT_BATCH_SIZE)
+
+        # Bulk inserts send no post_save signals.
+        update_counters(user.id, lesson_count=len(lessons))
+        sync_created(lessons)
+        transaction.on_commit(lambda: bump_data_version(user.id))
+        transaction.on_commit(lambda: replan_after_change(user.id, until))
+
+    return len(lessons), []
+
+
+def import_timetable_file(user, file):
+    '''
+    Imports lessons from an uploaded .csv or .ics file, reading it
+    line by line, see import_lessons().
+    '''
+    parser = parse_ics if file.name.lower().endswith('.ics') else parse_csv
+    lines = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+
+    return import_lessons(user, parser(lines))
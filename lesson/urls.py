@@ -8,4 +8,10 @@ urlpatterns = [
     path(route='create/', view=views.LessonCreateView.as_view(), name='lesson_create'),
     path(route='<int:pk>/update/', view=views.LessonUpdateView.as_view(), name='lesson_update'),
     path(route='<int:pk>/delete/', view=views.LessonDeleteView.as_view(), name='lesson_delete'),
+    path(route='import/', view=views.LessonImportView.as_view(), name='lesson_import'),
+    path(route='shift/', view=views.LessonShiftView.as_view(), name='lesson_shift'),
+    path(route='rollover/', view=views.LessonRolloverView.as_view(), name='lesson_rollover'),
+    path(route='series/create/', view=views.LessonSeriesCreateView.as_view(), name='lesson_series_create'),
+    path(route='series/<int:pk>/delete/', view=views.LessonSeriesDeleteView.as_view(), name='lesson_series_delete'),
+    path(route='series/<int:series_id>/<str:date>/', view=views.LessonOccurrenceView.as_view(), name='lesson_occurrence'),
 ]
@@ -1,29 +1,50 @@
+from datetime import date as datetime_date
+
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Q
+from django.http import Http404, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse, reverse_lazy
 from django.utils.timezone import now
+from django.views import View
 from django.views.generic import ListView, DetailView
-from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from django.views.generic.edit import CreateView, UpdateView, DeleteView, FormView
 
 from utils.constants import MAX_TIMEFRAME, RECENT_PAST_TIMEFRAME
 from utils.mixins import (
     CancelLinkMixin, ModelNameMixin,
     OwnershipRequiredMixin, DerivedFieldsMixin
 )
-from utils.query_filters import apply_sorting, apply_date_range_filter_if_valid
+from utils.query_filters import apply_sorting, apply_date_range_filter_if_valid, get_timeframe_bounds
+from utils.subqueries import count_subquery
 from utils.sidebar_context import (
     SidebarSectionsMixin, SidebarStateMixin,
     section
 )
 
 from subject.models import Subject
-from .models import Lesson
-from .forms import LessonCreateForm, LessonUpdateForm
+from assessment.models import Assessment
+from homework.models import Homework
+from .models import Lesson, LessonSeries, LessonSeriesException
+from .forms import LessonCreateForm, LessonUpdateForm, LessonSeriesCreateForm, LessonImportForm, LessonRolloverForm, LessonShiftForm
+from .rollover import rollover_lessons
+from .series import LessonsWithOccurrences, get_occurrences, get_user_series, materialize_occurrence
+from .shift import get_shifted_lessons, shift_lessons
+from .timetable_import import import_timetable_file
 
 from .filter_config import build_lesson_filters
 from .sort_config import build_lesson_sorting
 
 CANCEL_LINK = reverse_lazy('lesson_list')
 
+# Actions attaching events to an occurrence: (create view, its lesson param).
+OCCURRENCE_ATTACH_ACTIONS = {
+    'assessment': ('assessment_create', 'lesson'),
+    'homework_given': ('homework_create', 'lesson_given'),
+    'homework_due': ('homework_create', 'lesson_due'),
+}
+
 
 class LessonListView(LoginRequiredMixin, SidebarStateMixin, 
                      SidebarSectionsMixin, ListView):
@@ -39,25 +60,38 @@ class LessonListView(LoginRequiredMixin, SidebarStateMixin,
 
     def get_queryset(self):
         '''
-        Return lessons of the user sending request
+        Return lessons of the user sending request, merged with
+        expanded occurrences of their lesson series by start time,
         filtered and sorted if provided in the query params.
         '''
         queryset = Lesson.objects.filter(subject__user=self.request.user)
+        series = get_user_series(self.request.user)
         GET = self.request.GET
         filter_config = build_lesson_filters(user=self.request.user)
         sort_config = build_lesson_sorting()
 
         if subject_filter := GET.get('subject'):
             queryset = queryset.filter(subject=subject_filter)
+            series = series.filter(subject=subject_filter)
 
         if type_filter := GET.get('type'):
-            queryset = queryset.filter(type__iexact=type_filter)
+            queryset = queryset.filter(type=type_filter.upper())
+            series = series.filter(type=type_filter.upper())
 
         queryset = apply_date_range_filter_if_valid(GET, queryset, 'start_time', filter_config)
 
+        start = end = None
+        if GET.get('start_time') in [option[0] for option in filter_config['start_time']['options']]:
+            start, end = get_timeframe_bounds(GET['start_time'])
+
+        # Lessons can only be sorted by start time, which occurrences are merged by.
         queryset = apply_sorting(GET, queryset, sort_config)
 
-        return queryset
+        return LessonsWithOccurrences(
+            queryset.select_related('subject__user__userprofile'),
+            get_occurrences(series, start, end),
+            descending=queryset.query.order_by == ('-start_time',),
+        )
 
 
 class LessonDetailView(LoginRequiredMixin, DerivedFieldsMixin, OwnershipRequiredMixin,
@@ -67,13 +101,7 @@ class LessonDetailView(LoginRequiredMixin, DerivedFieldsMixin, OwnershipRequired
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        now_time = now()
-        start_time = context['lesson'].start_time
-
-        context['can_add_assessment'] = start_time > now_time
-        context['can_add_lesson_given'] = start_time < now_time and start_time > now_time - MAX_TIMEFRAME
-        context['can_add_lesson_due'] = start_time < now_time + MAX_TIMEFRAME and start_time > now_time - RECENT_PAST_TIMEFRAME
-        
+        context.update(get_attach_permissions(context['lesson'].start_time))
         return context
 
 
@@ -122,10 +150,19 @@ class LessonDeleteView(LoginRequiredMixin, DerivedFieldsMixin, OwnershipRequired
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        lesson = self.object
+        lesson_id = OuterRef('pk')
 
-        assessment_count = lesson.assessment_set.count()
-        homework_count = lesson.given_homework.count() + lesson.due_homework.count()
+        related_counts = Lesson.objects.filter(pk=self.object.pk).annotate(
+            assessment_count=count_subquery(
+                Assessment.objects.filter(lesson=lesson_id)
+            ),
+            homework_count=count_subquery(
+                Homework.objects.filter(Q(lesson_given=lesson_id) | Q(lesson_due=lesson_id))
+            ),
+        ).values('assessment_count', 'homework_count').get()
+
+        assessment_count = related_counts['assessment_count']
+        homework_count = related_counts['homework_count']
 
         if related_objects := {
             key: value for (key, value) in [
@@ -136,4 +173,185 @@ class LessonDeleteView(LoginRequiredMixin, DerivedFieldsMixin, OwnershipRequired
         }:
             context['related_objects'] = related_objects
 
-        return context
\ No newline at end of file
+        return context
+
+
+class LessonSeriesCreateView(LoginRequiredMixin, CancelLinkMixin, ModelNameMixin, CreateView):
+    model = LessonSeries
+    form_class = LessonSeriesCreateForm
+    success_message = 'Lesson series created successfully!'
+    success_url = reverse_lazy('lesson_list')
+    template_name_suffix = '_form_create'
+
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        form.fields['subject'].queryset = Subject.objects.filter(
+            user=self.request.user.id
+        )
+        return form
+
+
+class LessonSeriesDeleteView(LoginRequiredMixin, DerivedFieldsMixin, OwnershipRequiredMixin,
+                             CancelLinkMixin, ModelNameMixin, DeleteView):
+    model = LessonSeries
+    success_message = 'Lesson series deleted successfully!'
+    success_url = reverse_lazy('lesson_list')
+    owner_field = 'derived_user_id'
+
+
+class LessonImportView(LoginRequiredMixin, CancelLinkMixin, FormView):
+    '''
+    Imports user's lessons from an uploaded CSV or iCalendar file.
+    The whole file is imported only if all its rows are valid,
+    otherwise errors are shown per row.
+    '''
+    form_class = LessonImportForm
+    template_name = 'lesson/lesson_import.html'
+
+    def form_valid(self, form):
+        imported, import_errors = import_timetable_file(self.request.user, form.cleaned_data['file'])
+
+        if imported and not import_errors:
+            return redirect('lesson_list')
+
+        return self.render_to_response(self.get_context_data(form=form, import_errors=import_errors))
+
+
+class LessonShiftView(LoginRequiredMixin, CancelLinkMixin, FormView):
+    '''
+    Moves future lessons of user's subject (or ones matching the filters)
+    by the same time, with assessments and homework linked to them.
+    Lessons are moved only if all of them can be, otherwise
+    the broken rules are shown.
+    '''
+    form_class = LessonShiftForm
+    template_name = 'lesson/lesson_shift.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['subjects'] = Subject.objects.filter(user=self.request.user)
+        return kwargs
+
+    def get_initial(self):
+        initial = super().get_initial()
+        if subject_id := self.request.GET.get('subject'):
+            initial['subject'] = subject_id
+        return initial
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        lessons = get_shifted_lessons(data['subject'], data['start_date'], data['end_date'], data['type'])
+        shifted, shift_errors = shift_lessons(self.request.user, lessons, form.get_delta())
+
+        if shifted and not shift_errors:
+            return redirect('subject_detail', pk=data['subject'].pk)
+
+        return self.render_to_response(self.get_context_data(form=form, shift_errors=shift_errors))
+
+
+class LessonRolloverView(LoginRequiredMixin, CancelLinkMixin, FormView):
+    '''
+    Copies lessons of user's subjects (and optionally assessments)
+    from a date range, like a past term, to a new one. Nothing is
+    copied if any copy would overlap user's other events.
+    '''
+    form_class = LessonRolloverForm
+    template_name = 'lesson/lesson_rollover.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['subjects'] = Subject.objects.filter(user=self.request.user)
+        return kwargs
+
+    def get_initial(self):
+        initial = super().get_initial()
+        initial['subjects'] = Subject.objects.filter(user=self.request.user)
+        return initial
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        copied, _, rollover_errors = rollover_lessons(
+            self.request.user, data['subjects'], data['source_start'], data['source_end'],
+            data['target_start'], data['with_assessments'],
+        )
+
+        if copied and not rollover_errors:
+            return redirect('lesson_list')
+
+        return self.render_to_response(self.get_context_data(form=form, rollover_errors=rollover_errors))
+
+
+class LessonOccurrenceView(LoginRequiredMixin, View):
+    '''
+    Shows an occurrence of user's lesson series, which is not materialised.
+    POST with "action" param materialises it and redirects to attaching
+    an assessment or homework to it (see OCCURRENCE_ATTACH_ACTIONS),
+    or with "skip" action records the date as an exception of the series.
+    '''
+    template_name = 'lesson/lesson_occurrence.html'
+
+    def get_occurrence(self, series_id, date):
+        series = get_object_or_404(get_user_series(self.request.user), pk=series_id)
+
+        try:
+            date = datetime_date.fromisoformat(date)
+        except ValueError:
+            raise Http404('Invalid occurrence date.')
+
+        if not series.is_occurrence_date(date) or series.exceptions.filter(date=date).exists():
+            raise Http404('Lesson series has no occurrence on this date.')
+
+        return series, date
+
+    def render_occurrence(self, series, date, errors=None):
+        occurrence = series.get_occurrence(date)
+        context = {
+            'lesson': occurrence,
+            'series': series,
+            'errors': errors,
+            **get_attach_permissions(occurrence.start_time),
+        }
+        return render(self.request, self.template_name, context)
+
+    def get(self, request, series_id, date):
+        series, date = self.get_occurrence(series_id, date)
+
+        if lesson := Lesson.objects.filter(series=series, series_date=date).first():
+            return redirect(lesson)
+
+        return self.render_occurrence(series, date)
+
+    def post(self, request, series_id, date):
+        series, date = self.get_occurrence(series_id, date)
+        action = request.POST.get('action')
+
+        if action == 'skip':
+            if lesson := Lesson.objects.filter(series=series, series_date=date).first():
+                return redirect('lesson_delete', pk=lesson.pk)
+            LessonSeriesException.objects.create(series=series, date=date)
+            return redirect('lesson_list')
+
+        if action not in OCCURRENCE_ATTACH_ACTIONS:
+            return HttpResponseBadRequest('Unknown action.')
+
+        try:
+            lesson = materialize_occurrence(series, date)
+        except ValidationError as error:
+            return self.render_occurrence(series, date, errors=error.messages)
+
+        url_name, lesson_param = OCCURRENCE_ATTACH_ACTIONS[action]
+        return redirect(f'{reverse(url_name)}?{lesson_param}={lesson.pk}')
+
+
+def get_attach_permissions(start_time):
+    '''
+    Returns context flags telling whether an assessment, or homework
+    given or due at lesson starting at start_time can be added.
+    '''
+    now_time = now()
+
+    return {
+        'can_add_assessment': start_time > now_time,
+        'can_add_lesson_given': start_time < now_time and start_time > now_time - MAX_TIMEFRAME,
+        'can_add_lesson_due': start_time < now_time + MAX_TIMEFRAME and start_time > now_time - RECENT_PAST_TIMEFRAME,
+    }
@@ -3,19 +3,29 @@ from datetime import datetime, timedelta
 
 from django.core.management.base import BaseCommand
 
+from archive.archiving import archive_events
 from notification.scheduler import send_notifications
+from sync.changes import purge_tombstones
+from utils.constants import ARCHIVE_INTERVAL
 
 TIME_INTERVAL = timedelta(minutes=1)
 
 class Command(BaseCommand):
-    help = "Continuously send scheduled notifications every minute"
+    help = "Continuously send scheduled notifications every minute, and archive past events and purge old tombstones daily"
     
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("Notification loop started..."))
+        last_archived = None
 
         while True:
             now = datetime.now()
             send_notifications()
+
+            if last_archived is None or now - last_archived >= ARCHIVE_INTERVAL:
+                archive_events()
+                purge_tombstones()
+                last_archived = now
+
             next_minute = (now + TIME_INTERVAL).replace(second=0, microsecond=0)
             sleep_seconds = (next_minute - datetime.now()).total_seconds()
             time.sleep(sleep_seconds)
\ No newline at end of file
@@ -1,9 +1,13 @@
+from collections import defaultdict
+
 from django.utils.timezone import now, localtime
 
 from lesson.models import Lesson
+from lesson.series import materialize_due_occurrences
 from assessment.models import Assessment
 from homework.models import Homework
 from userprofile.models import UserProfile
+from dashboard.models import EventTimeline
 
 from subject.templatetags.custom_tags import get_human_duration
 from utils.accessors import get_subject, get_user, get_userprofile
@@ -13,7 +17,6 @@ MODEL_CONFIGS = [
     {
         'model': Lesson,
         'select_related': ['subject__user__userprofile'],
-        'use_with_derived_fields': False,
     },
     {
         'model': Assessment,
@@ -21,7 +24,6 @@ MODEL_CONFIGS = [
             'subject__user__userprofile',
             'lesson__subject__user__userprofile',
         ],
-        'use_with_derived_fields': True,
     },
     {
         'model': Homework,
@@ -30,31 +32,32 @@ MODEL_CONFIGS = [
             'lesson_given__subject__user__userprofile',
             'lesson_due__subject__user__userprofile',
         ],
-        'use_with_derived_fields': True,
     },
 ]
 
-def get_scheduled_time(event_type, event):
+def get_due_reminders():
     '''
-    Returns value responsible of event sheduled time
-    based on its time.
+    Returns {event type: {event id: scheduled time}} of events
+    with due unsent reminders, found with one query of the
+    event timeline using its index of unsent reminders.
     '''
-    scheduled_time_path = {
-        'lesson': lambda event: event.start_time,
-        'assessment': lambda event: event.derived_start_time,
-        'homework': lambda event: event.derived_due_at,
-    }
+    due_reminders = defaultdict(dict)
+
+    for event_type, event_id, starts_at in EventTimeline.objects.filter(
+        reminder_at__lte=now(),
+        reminder_sent=False,
+    ).values_list('event_type', 'event_id', 'starts_at'):
+        due_reminders[event_type][event_id] = starts_at
 
-    return scheduled_time_path[event_type](event)
+    return due_reminders
 
 
-def create_email_context(event, user):
+def create_email_context(event, user, scheduled_time):
     '''
     Builds context for the email notification.
     '''
     event_type = type(event).__name__.lower()
     event_subject = get_subject(event)
-    scheduled_time = get_scheduled_time(event_type, event)
     time_left = scheduled_time - now()
     return {
         'first_name': user.first_name,
@@ -69,25 +72,31 @@ def create_email_context(event, user):
 
 def update_event_reminder_status(event):
     event.reminder_sent = True
-    event.save(update_fields=['reminder_sent'])
+    event.save(update_fields=['reminder_sent'], trusted=True)
 
 
 def send_notifications():
     '''
-    Finds and sends all due scheduled notifications for Lesson, Assessment, and Homework.
+    Finds and sends all due scheduled notifications for Lesson, Assessment, and Homework,
+    loading only the events the timeline has due reminders of.
+    Occurrences of lesson series are materialised when their reminder is due,
+    which schedules it like for other lessons.
     '''
 
+    materialize_due_occurrences()
+
+    due_reminders = get_due_reminders()
     events = []
    
     for config in MODEL_CONFIGS:
-        query_set = (
-            config['model'].objects.with_derived_fields()
-            if config['use_with_derived_fields']
-            else config['model'].objects
-        )
-
-        query_set = query_set.filter(
-            scheduled_reminder_time__lte=now(),
+        event_ids = due_reminders[config['model'].__name__.lower()]
+
+        if not event_ids:
+            continue
+
+        # Checked on events too, in case their timeline rows are stale.
+        query_set = config['model'].objects.filter(
+            pk__in=event_ids,
             reminder_sent=False,
         ).select_related(*config['select_related'])
 
@@ -102,7 +111,8 @@ def send_notifications():
             UserProfile.NotificationMethod.EMAIL,
             UserProfile.NotificationMethod.BOTH,
         ):
-            context = create_email_context(event, user)
+            scheduled_time = due_reminders[type(event).__name__.lower()][event.id]
+            context = create_email_context(event, user, scheduled_time)
             send_email(context)
             update_event_reminder_status(event)
 
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
     'userprofile.apps.UserprofileConfig',
     'dashboard.apps.DashboardConfig',
     'notification.apps.NotificationConfig',
+    'archive.apps.ArchiveConfig',
+    'sync.apps.SyncConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -82,6 +84,16 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+CALENDAR_PREFETCH_ADJACENT_MONTHS = env.bool('CALENDAR_PREFETCH_ADJACENT_MONTHS', default=True)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -11,5 +11,7 @@ urlpatterns = [
     path('assessments/', include('assessment.urls')),
     path('homework/', include('homework.urls')),
     path('dashboard/', include('dashboard.urls')),
+    path('archive/', include('archive.urls')),
+    path('sync/', include('sync.urls')),
     path('', RedirectView.as_view(pattern_name='dashboard'))
 ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subject', '0004_alter_subject_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subject',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['user', 'last_modified'], name='subject_user_modified_idx'),
+        ),
+    ]
@@ -1,10 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import transaction
 
 from utils.constants import MAX_SUBJECTS_PER_USER, MAX_SUBJECT_NAME_LENGTH
 
-class SubjectManager(models.Manager):
+class SubjectQuerySet(models.QuerySet):
+
+    def delete(self):
+        # Imported here, as event models depend on Subject.
+        from utils.bulk_delete import delete_subjects
+        return delete_subjects(self)
+
+
+class SubjectManager(models.Manager.from_queryset(SubjectQuerySet)):
 
     def create(self, **kwargs):
         obj = self.model(**kwargs)
@@ -12,17 +21,20 @@ class SubjectManager(models.Manager):
         return obj
     
     def bulk_create(self, objs, **kwargs):
-        for obj in objs:
-            obj.full_clean()
-        return super().bulk_create(objs, **kwargs)
+        # Imported here, as event models depend on Subject.
+        from utils.batch_validation import validated_bulk_create
+        return validated_bulk_create(super().bulk_create, objs, **kwargs)
     
 
 class Subject(models.Model):
 
     class Meta:
         db_table = 'subject'
+        indexes = [
+            models.Index(fields=['user', 'last_modified'], name='subject_user_modified_idx'),
+        ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False) # covered by subject_user_modified_idx
     name = models.CharField(max_length=MAX_SUBJECT_NAME_LENGTH)
     image_url = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -35,7 +47,7 @@ class Subject(models.Model):
 
         errors = {}
 
-        if self.user.subject_set.count() >= MAX_SUBJECTS_PER_USER:
+        if self._state.adding and self.user_id and self.get_subject_count() >= MAX_SUBJECTS_PER_USER:
             errors['user'] = ValidationError(
                 message=f'You can\'t have more that {MAX_SUBJECTS_PER_USER} subjects per user.', 
                 code='max_subjects_reached'
@@ -44,9 +56,37 @@ class Subject(models.Model):
         if errors:
             raise ValidationError(errors)
         
+    def get_subject_count(self):
+        '''
+        Returns number of user's subjects from the counter of their profile.
+        '''
+        # Imported here, as counters depend on event models.
+        from utils.counters import get_subject_counts
+        return get_subject_counts([self.user_id])[self.user_id]
+
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        '''
+        Saves subject validated with full_clean(). User's profile
+        is locked while a new subject is checked against the limit
+        and inserted, so that concurrent creates can't both pass it.
+        '''
+        # Imported here, as counters depend on event models.
+        from utils.counters import lock_counters
+
+        with transaction.atomic():
+            if self._state.adding and self.user_id:
+                lock_counters(self.user_id)
+            self.full_clean()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        '''
+        Deletes subject with its lessons, and assessments and homework
+        linked to it either directly or via lessons.
+        '''
+        deleted = Subject.objects.filter(pk=self.pk).delete()
+        self.pk = None
+        return deleted
 
     def __str__(self):
         return self.name
\ No newline at end of file
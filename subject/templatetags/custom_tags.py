@@ -1,5 +1,6 @@
 import math
 from django import template
+from django.urls import reverse
 
 register = template.Library()
 
@@ -22,6 +23,18 @@ def get_item(dictionary, key):
     '''
     return dictionary.get(key, '')
 
+@register.filter
+def event_url(event_type, pk):
+    '''
+    Returns URL of the event detail page. Expanded occurrences
+    of lesson series are listed with "<series_id>:<date>" keys
+    instead of pk, and have their own page.
+    '''
+    if isinstance(pk, str):
+        series_id, date = pk.split(':')
+        return reverse('lesson_occurrence', kwargs={'series_id': series_id, 'date': date})
+    return reverse(f'{event_type}_detail', args=[pk])
+
 @register.filter
 def get_human_duration(timedelta):
     '''
@@ -1,7 +1,20 @@
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+from dashboard.models import StudyBlock
+
+from utils.constants import MAX_SUBJECTS_PER_USER
+
 from .models import Subject
 
 class SubjectModelTests(TestCase):
@@ -44,6 +57,19 @@ class SubjectModelTests(TestCase):
             self.assertIn('max_subjects_reached', error_codes)
 
 
+    def test_rename_at_max_subject_limit(self):
+        '''Test renaming subject of user at the subject limit succeeds without counting subjects.'''
+        Subject.objects.bulk_create([Subject(user=self.user, name=f'Subject {i}') for i in range(MAX_SUBJECTS_PER_USER)])
+        subject = Subject.objects.filter(user=self.user).first()
+
+        subject.name = self.SUBJECT_NAME
+        with CaptureQueriesContext(connection) as queries:
+            subject.save()
+
+        self.assertEqual(Subject.objects.get(pk=subject.pk).name, self.SUBJECT_NAME)
+        self.assertFalse(any('COUNT' in query['sql'] for query in queries))
+
+
     def test_name_cannot_be_blank(self):
         '''Test creating subject with blank name field fails'''
         try:
@@ -88,4 +114,137 @@ class SubjectModelTests(TestCase):
             user=self.user,
             name=self.SUBJECT_NAME,
         )
-        self.assertEqual(self.SUBJECT_NAME, str(subject))
\ No newline at end of file
+        self.assertEqual(self.SUBJECT_NAME, str(subject))
+
+
+class SubjectDeleteViewTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with a subject.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.subject = Subject.objects.create(user=self.user, name='Algorithms')
+        self.client.force_login(self.user)
+
+    def add_lessons(self, count):
+        '''Adds lessons with one assessment and one homework given at each of them.'''
+        lessons = Lesson.objects.all().bulk_create(
+            Lesson(subject=self.subject, start_time=now() + timedelta(days=i + 1), duration=timedelta(minutes=90))
+            for i in range(count)
+        )
+        Assessment.objects.all().bulk_create(Assessment(lesson=lesson) for lesson in lessons)
+        Homework.objects.all().bulk_create(
+            Homework(lesson_given=lesson, due_at=now() + timedelta(days=60), task='Task') for lesson in lessons
+        )
+
+    def get_delete_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('subject_delete', kwargs={'pk': self.subject.pk}))
+        return response, len(queries)
+
+
+    def test_related_objects_counts(self):
+        '''Test delete page counts lessons, and assessments and homework linked directly or via lessons.'''
+        self.add_lessons(3)
+        Assessment.objects.all().bulk_create([Assessment(subject=self.subject, start_time=now() + timedelta(days=1))])
+        Homework.objects.all().bulk_create([Homework(subject=self.subject, due_at=now() + timedelta(days=1), task='Task')])
+
+        response, _ = self.get_delete_page()
+        self.assertEqual(response.context['related_objects'], {'lesson': 3, 'assessment': 4, 'homework': 4})
+
+
+    def test_homework_linked_to_two_lessons_counted_once(self):
+        '''Test homework given at and due at lessons of the subject is counted once.'''
+        self.add_lessons(2)
+        lessons = list(Lesson.objects.order_by('start_time'))
+        Homework.objects.filter(lesson_given=lessons[0]).update(lesson_due=lessons[1])
+
+        response, _ = self.get_delete_page()
+        self.assertEqual(response.context['related_objects']['homework'], 2)
+
+
+    def test_query_count_does_not_depend_on_lesson_count(self):
+        '''Test delete page issues the same number of queries for any number of lessons.'''
+        self.add_lessons(1)
+        _, few_lessons_queries = self.get_delete_page()
+
+        self.add_lessons(20)
+        _, many_lessons_queries = self.get_delete_page()
+
+        self.assertEqual(few_lessons_queries, many_lessons_queries)
+
+
+class SubjectBulkDeleteTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with two subjects, each with lessons and related events.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.subject = Subject.objects.create(user=self.user, name='Probability Theory')
+        self.other_subject = Subject.objects.create(user=self.user, name='Statistics')
+        for subject in (self.subject, self.other_subject):
+            given, due = Lesson.objects.all().bulk_create(
+                Lesson(subject=subject, start_time=now() + timedelta(days=days), duration=timedelta(minutes=90))
+                for days in (1, 8)
+            )
+            Assessment.objects.all().bulk_create([
+                Assessment(lesson=given),
+                Assessment(subject=subject, start_time=now() + timedelta(days=2)),
+            ])
+            Homework.objects.all().bulk_create([
+                Homework(lesson_given=given, task='Task', due_at=now() + timedelta(days=3)),
+                Homework(lesson_due=due, task='Task'),
+                Homework(subject=subject, task='Task', due_at=now() + timedelta(days=3)),
+            ])
+
+
+    def test_delete_removes_events_linked_via_lessons(self):
+        '''Test deleting subject deletes homework and assessments linked to it only via lessons.'''
+        self.subject.delete()
+
+        self.assertFalse(Lesson.objects.filter(subject=self.subject.id).exists())
+        self.assertEqual(Assessment.objects.count(), 2)
+        self.assertEqual(Homework.objects.count(), 3)
+        self.assertFalse(Homework.objects.filter(subject=None, lesson_given=None, lesson_due=None).exists())
+
+
+    def test_delete_removes_study_blocks_of_homework(self):
+        '''Test deleting subject deletes study blocks planned for its homework, keeping others.'''
+        StudyBlock.objects.bulk_create(
+            StudyBlock(user=self.user, homework=homework, start_time=now() + timedelta(hours=1), end_time=now() + timedelta(hours=2))
+            for homework in Homework.objects.all()
+        )
+
+        self.subject.delete()
+
+        self.assertEqual(
+            set(StudyBlock.objects.values_list('homework', flat=True)),
+            set(Homework.objects.values_list('pk', flat=True)),
+        )
+        self.assertEqual(StudyBlock.objects.count(), 3)
+
+
+    def test_delete_keeps_other_subjects_events(self):
+        '''Test deleting subject doesn't touch events of other subjects.'''
+        self.subject.delete()
+
+        self.assertTrue(Subject.objects.filter(pk=self.other_subject.pk).exists())
+        self.assertEqual(Lesson.objects.filter(subject=self.other_subject).count(), 2)
+        self.assertEqual(Assessment.objects.with_derived_fields().filter(derived_subject_id=self.other_subject.pk).count(), 2)
+        self.assertEqual(Homework.objects.with_derived_fields().filter(derived_subject_id=self.other_subject.pk).count(), 3)
+
+
+    def test_delete_returns_deleted_counts(self):
+        '''Test deleting subject reports deleted objects like QuerySet.delete().'''
+        self.assertEqual(
+            self.subject.delete(),
+            (8, {'homework.Homework': 3, 'assessment.Assessment': 2, 'lesson.Lesson': 2, 'subject.Subject': 1})
+        )
+
+
+    def test_delete_uses_one_query_per_model(self):
+        '''Test deleting subject issues one DELETE per model whatever the number of events.'''
+        with CaptureQueriesContext(connection) as queries:
+            self.subject.delete()
+
+        delete_queries = [query for query in queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(delete_queries), 11)
+
@@ -1,4 +1,5 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import OuterRef, Q
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
@@ -8,11 +9,16 @@ from utils.mixins import (
     OwnershipRequiredMixin,
 )
 from utils.query_filters import apply_sorting
+from utils.subqueries import count_subquery
 from utils.sidebar_context import (
     SidebarSectionsMixin, SidebarStateMixin,
     section
 )
 
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+
 from .models import Subject
 from .forms import SubjectForm
 
@@ -91,19 +97,27 @@ class SubjectDeleteView(LoginRequiredMixin, OwnershipRequiredMixin, CancelLinkMi
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        subject = self.object
-
-        lesson_count = subject.lesson_set.count()
-
-        assessment_count = sum(
-            (lesson.assessment_set.count() for lesson in subject.lesson_set.all()), 
-            subject.assessment_set.count()
-        )
-
-        homework_count = sum(
-            (lesson.given_homework.count() + lesson.due_homework.count() for lesson in subject.lesson_set.all()),
-            subject.homework_set.count()
-        )
+        subject_id = OuterRef('pk')
+
+        related_counts = Subject.objects.filter(pk=self.object.pk).annotate(
+            lesson_count=count_subquery(
+                Lesson.objects.filter(subject=subject_id)
+            ),
+            assessment_count=count_subquery(
+                Assessment.objects.filter(Q(subject=subject_id) | Q(lesson__subject=subject_id))
+            ),
+            homework_count=count_subquery(
+                Homework.objects.filter(
+                    Q(subject=subject_id) |
+                    Q(lesson_given__subject=subject_id) |
+                    Q(lesson_due__subject=subject_id)
+                )
+            ),
+        ).values('lesson_count', 'assessment_count', 'homework_count').get()
+
+        lesson_count = related_counts['lesson_count']
+        assessment_count = related_counts['assessment_count']
+        homework_count = related_counts['homework_count']
 
         if related_objects := {
             key: value for (key, value) in [
@@ -0,0 +1,175 @@
+from datetime import timedelta, timezone
+from itertools import batched
+
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries
+from lesson.series import OCCURRENCE_KEY, get_occurrence_key, get_occurrences, get_user_series
+from assessment.models import Assessment
+from homework.models import Homework
+from userprofile.models import UserProfile
+from dashboard.models import EventTimeline
+
+from utils.constants import SYNC_CHUNK_SIZE, UNKNOWN_ASSESSMENT_DURATION
+from utils.query_filters import filter_by_field
+
+from .models import Tombstone
+
+ICS_DATETIME_FORMAT = '%Y%m%dT%H%M%SZ'
+ICS_LINE_LENGTH = 75 # in octets, longer lines are folded
+CALENDAR_HEADER = [
+    'BEGIN:VCALENDAR',
+    'VERSION:2.0',
+    'PRODID:-//Student Organizer//Calendar Feed//EN',
+    'CALSCALE:GREGORIAN',
+    'X-WR-CALNAME:Student Organizer',
+]
+CALENDAR_FOOTER = ['END:VCALENDAR']
+
+
+def latest(queryset, field, user_field='user'):
+    '''
+    Returns subquery of the latest value of the field of rows of the user
+    of the outer user profile, or of their joining if they have none.
+    '''
+    return Coalesce(
+        Subquery(queryset.filter(**{user_field: OuterRef('user')}).order_by(f'-{field}').values(field)[:1]),
+        F('user__date_joined'),
+    )
+
+
+def get_feed_state(token):
+    '''
+    Returns (user id, last modified time) of the calendar feed with
+    the token, or None if there is none. The feed is modified when
+    the user's subjects, events or lesson series are (see
+    dashboard.timeline, and exceptions touch their series) or deleted
+    (see Tombstone), which is found with one query reading the last
+    row of (user, time) indexes of each of them, and the user's series.
+    '''
+    return UserProfile.objects.filter(calendar_token=token).annotate(
+        feed_modified=Greatest(
+            latest(Subject.objects.all(), 'last_modified'),
+            latest(EventTimeline.objects.all(), 'last_modified'),
+            latest(LessonSeries.objects.all(), 'last_modified', 'subject__user'),
+            latest(Tombstone.objects.all(), 'deleted_at'),
+        )
+    ).values_list('user', 'feed_modified').first()
+
+
+def format_ics_datetime(value):
+    return value.astimezone(timezone.utc).strftime(ICS_DATETIME_FORMAT)
+
+
+def escape_ics_text(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r', '').replace('\n', '\\n')
+
+
+def fold_ics_line(line):
+    '''
+    Returns iCalendar content line ending with CRLF, split into lines
+    of at most ICS_LINE_LENGTH octets continued by a leading space.
+    '''
+    lines = ['']
+    length = 0
+
+    for char in line:
+        size = len(char.encode())
+        if length + size > ICS_LINE_LENGTH:
+            lines.append(' ')
+            length = 1
+        lines[-1] += char
+        length += size
+
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def get_event_lines(uid, start, end, summary, category, description, last_modified):
+    '''
+    Returns folded lines of a VEVENT. Times are in UTC, so no VTIMEZONE
+    is needed. SUMMARY of lessons is their subject and CATEGORIES their
+    type, so that the feed can be imported back (see timetable_import).
+    '''
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{format_ics_datetime(last_modified)}',
+        f'LAST-MODIFIED:{format_ics_datetime(last_modified)}',
+        f'DTSTART:{format_ics_datetime(start)}',
+        f'DTEND:{format_ics_datetime(end)}',
+        f'SUMMARY:{escape_ics_text(summary)}',
+        f'CATEGORIES:{escape_ics_text(category)}',
+    ]
+
+    if description:
+        lines.append(f'DESCRIPTION:{escape_ics_text(description)}')
+
+    lines.append('END:VEVENT')
+    return ''.join(map(fold_ics_line, lines))
+
+
+def get_feed_events(user_id):
+    '''
+    Yields VEVENTs of the user's lessons, assessments and homework
+    (at its due), loading rows of one model at a time with iterator().
+    Occurrences of lesson series are expanded (series last at most
+    MAX_TIMEFRAME), rather than sent as recurring events, as times
+    are in UTC and occurrences keep their local time. Occurrences
+    keep their UID when materialised.
+    '''
+    lessons = Lesson.objects.filter(subject__user=user_id).values_list(
+        'pk', 'series_id', 'series_date', 'start_time', 'duration', 'type', 'subject__name', 'last_modified'
+    )
+
+    for pk, series_id, series_date, start_time, duration, lesson_type, subject_name, last_modified in lessons.iterator(chunk_size=SYNC_CHUNK_SIZE):
+        key = OCCURRENCE_KEY.format(series_id=series_id, date=series_date.isoformat()) if series_id else pk
+        yield get_event_lines(
+            f'lesson-{key}', start_time, start_time + (duration or timedelta()),
+            subject_name, Lesson.Type(lesson_type).label, None, last_modified,
+        )
+
+    for occurrence in get_occurrences(get_user_series(user_id)):
+        yield get_event_lines(
+            f'lesson-{get_occurrence_key(occurrence)}', occurrence.start_time, occurrence.start_time + occurrence.duration,
+            occurrence.subject.name, occurrence.get_type_display(), None, occurrence.last_modified,
+        )
+
+    assessments = filter_by_field(
+        Assessment.objects.with_derived_fields().annotate(subject_name=Coalesce('subject__name', 'lesson__subject__name')),
+        'derived_user_id',
+        exact=user_id,
+    ).values_list('pk', 'derived_start_time', 'derived_duration', 'type', 'subject_name', 'description', 'last_modified')
+
+    for pk, start_time, duration, assessment_type, subject_name, description, last_modified in assessments.iterator(chunk_size=SYNC_CHUNK_SIZE):
+        yield get_event_lines(
+            f'assessment-{pk}', start_time, start_time + (duration or UNKNOWN_ASSESSMENT_DURATION),
+            f'{Assessment.Type(assessment_type).label}: {subject_name}', 'Assessment', description, last_modified,
+        )
+
+    homework = filter_by_field(
+        Homework.objects.with_derived_fields().annotate(
+            subject_name=Coalesce('subject__name', 'lesson_given__subject__name', 'lesson_due__subject__name')
+        ),
+        'derived_user_id',
+        exact=user_id,
+    ).values_list('pk', 'derived_due_at', 'subject_name', 'task', 'last_modified')
+
+    for pk, due_at, subject_name, task, last_modified in homework.iterator(chunk_size=SYNC_CHUNK_SIZE):
+        yield get_event_lines(
+            f'homework-{pk}', due_at, due_at, f'Homework due: {subject_name}', 'Homework', task, last_modified,
+        )
+
+
+def stream_calendar(user_id):
+    '''
+    Yields parts of iCalendar document of the user's events,
+    each with up to SYNC_CHUNK_SIZE of them.
+    '''
+    yield ''.join(map(fold_ics_line, CALENDAR_HEADER))
+
+    for events in batched(get_feed_events(user_id), SYNC_CHUNK_SIZE):
+        yield ''.join(events)
+
+    yield ''.join(map(fold_ics_line, CALENDAR_FOOTER))
@@ -0,0 +1,173 @@
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, CharField, F, Value
+from django.utils.timezone import now
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries, LessonSeriesException
+from assessment.models import Assessment
+from homework.models import Homework
+from dashboard.models import EventTimeline
+
+from utils.bulk_delete import raw_delete
+from utils.constants import SYNC_CHUNK_SIZE, SYNC_TOMBSTONE_RETENTION, SYNC_WATERMARK_LAG
+from utils.query_filters import field_q
+
+from .models import Tombstone
+
+# In order of sending, so that rows are sent after the ones they reference.
+SYNC_MODELS = {
+    'subject': Subject,
+    'series': LessonSeries,
+    'series_exception': LessonSeriesException,
+    'lesson': Lesson,
+    'assessment': Assessment,
+    'homework': Homework,
+}
+# Fields of rows sent to clients, in order of their values.
+SYNC_FIELDS = {
+    'subject': ['id', 'name', 'image_url', 'created_at', 'last_modified'],
+    'series': ['id', 'subject_id', 'type', 'start_time', 'duration', 'recurrence', 'end_date', 'created_at', 'last_modified'],
+    'series_exception': ['id', 'series_id', 'date'],
+    'lesson': ['id', 'subject_id', 'series_id', 'series_date', 'type', 'start_time', 'duration', 'created_at', 'last_modified'],
+    'assessment': [
+        'id', 'subject_id', 'lesson_id', 'type', 'start_time', 'duration', 'description', 'created_at', 'last_modified',
+    ],
+    'homework': [
+        'id', 'subject_id', 'lesson_given_id', 'lesson_due_id', 'start_time', 'due_at', 'task',
+        'completion_percent', 'effort', 'has_subtasks', 'created_at', 'last_modified',
+    ],
+}
+USER_FIELDS = {
+    'subject': 'user',
+    'series': 'subject__user',
+    'series_exception': 'series__subject__user',
+    'lesson': 'subject__user',
+    'assessment': 'derived_user_id',
+    'homework': 'derived_user_id',
+}
+
+
+def encode(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def get_changes(user, since):
+    '''
+    Returns ({type: [ids]} of changed rows, {type: [ids]} of deleted
+    rows) of the user's subjects and events modified or deleted after
+    since. Found with one query of range scans of (user, time) indexes
+    of subjects, the event timeline (see dashboard.timeline) and tombstones,
+    and of the user's lesson series. Exceptions of series have no time
+    of their own, they touch their series (see signals) and are sent
+    with it.
+    '''
+    # Annotated under the same names, so that columns of the parts are in the same order.
+    columns = ['sync_type', 'sync_id', 'sync_deleted']
+    changes = Subject.objects.filter(user=user, last_modified__gt=since).annotate(
+        sync_type=Value('subject', output_field=CharField()),
+        sync_id=F('pk'),
+        sync_deleted=Value(False, output_field=BooleanField()),
+    ).values_list(*columns).union(
+        LessonSeries.objects.filter(subject__user=user, last_modified__gt=since).annotate(
+            sync_type=Value('series', output_field=CharField()),
+            sync_id=F('pk'),
+            sync_deleted=Value(False, output_field=BooleanField()),
+        ).values_list(*columns),
+        LessonSeriesException.objects.filter(series__subject__user=user, series__last_modified__gt=since).annotate(
+            sync_type=Value('series_exception', output_field=CharField()),
+            sync_id=F('pk'),
+            sync_deleted=Value(False, output_field=BooleanField()),
+        ).values_list(*columns),
+        EventTimeline.objects.filter(user=user, last_modified__gt=since).annotate(
+            sync_type=F('event_type'),
+            sync_id=F('event_id'),
+            sync_deleted=Value(False, output_field=BooleanField()),
+        ).values_list(*columns),
+        Tombstone.objects.filter(user=user, deleted_at__gt=since).annotate(
+            sync_type=F('object_type'),
+            sync_id=F('object_id'),
+            sync_deleted=Value(True, output_field=BooleanField()),
+        ).values_list(*columns),
+        all=True,
+    )
+
+    changed, deleted = defaultdict(list), defaultdict(list)
+
+    for object_type, object_id, is_deleted in changes:
+        (deleted if is_deleted else changed)[object_type].append(object_id)
+
+    return changed, deleted
+
+
+def get_rows(user, object_type, ids=None):
+    '''
+    Yields lists of rows (tuples of values of SYNC_FIELDS) of all
+    the user's objects of the type, or of the ones with given ids,
+    in chunks of SYNC_CHUNK_SIZE.
+    '''
+    model = SYNC_MODELS[object_type]
+    rows = model.objects.order_by().values_list(*SYNC_FIELDS[object_type])
+
+    if ids is None:
+        rows = rows.filter(field_q(model, USER_FIELDS[object_type], exact=user.id)).iterator(chunk_size=SYNC_CHUNK_SIZE)
+
+        while chunk := list(islice(rows, SYNC_CHUNK_SIZE)):
+            yield chunk
+        return
+
+    for start in range(0, len(ids), SYNC_CHUNK_SIZE):
+        yield list(rows.filter(pk__in=ids[start:start + SYNC_CHUNK_SIZE]))
+
+
+def stream_changes(user, since=None):
+    '''
+    Yields parts of JSON document of the user's subjects and events
+    changed after since (all of them if None):
+    {"watermark", "full", "fields": {type: [field, ...]},
+    "changed": {type: [[value, ...], ...]}, "deleted": {type: [id, ...]}}.
+    Rows are arrays of values of "fields", loaded and encoded in
+    chunks, so that the first sync of a big account isn't held in memory.
+
+    Clients pass the watermark as since of the next sync. It's behind
+    the current time by SYNC_WATERMARK_LAG, as last_modified is set
+    before commit, so rows committed late are sent by the next sync
+    (clients replace rows they have). Syncs since before tombstones
+    are purged are full, so that clients replace all their rows.
+    '''
+    watermark = now() - SYNC_WATERMARK_LAG
+    full = since is None or since < now() - SYNC_TOMBSTONE_RETENTION
+
+    if full:
+        changed, deleted = dict.fromkeys(SYNC_MODELS), {}
+    else:
+        changed, deleted = get_changes(user, since)
+
+    yield f'{{"watermark":{encode(watermark)},"full":{encode(full)},"fields":{encode(SYNC_FIELDS)},"changed":{{'
+
+    for index, object_type in enumerate(SYNC_MODELS):
+        yield f'{"," if index else ""}{encode(object_type)}:['
+
+        if full or changed[object_type]:
+            separator = ''
+
+            for chunk in get_rows(user, object_type, changed[object_type]):
+                if chunk:
+                    # Rows of the chunk without the brackets of its array.
+                    yield separator + encode(chunk)[1:-1]
+                    separator = ','
+
+        yield ']'
+
+    yield f'}},"deleted":{encode(deleted)}}}'
+
+
+def purge_tombstones():
+    '''
+    Deletes tombstones older than SYNC_TOMBSTONE_RETENTION, after
+    which clients get full syncs. Returns the number of them.
+    '''
+    return raw_delete(Tombstone.objects.filter(deleted_at__lt=now() - SYNC_TOMBSTONE_RETENTION))
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('subject', 'Subject'), ('lesson', 'Lesson'), ('assessment', 'Assessment'), ('homework', 'Homework')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'sync_tombstone',
+                'indexes': [models.Index(fields=['user', 'deleted_at'], name='sync_tombstone_user_del_idx')],
+            },
+        ),
+    ]
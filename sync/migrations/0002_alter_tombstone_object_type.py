@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='object_type',
+            field=models.CharField(choices=[('subject', 'Subject'), ('lesson', 'Lesson'), ('assessment', 'Assessment'), ('homework', 'Homework'), ('series', 'Lesson series')], max_length=10),
+        ),
+    ]
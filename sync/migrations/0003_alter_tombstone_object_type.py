@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_alter_tombstone_object_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='object_type',
+            field=models.CharField(choices=[('subject', 'Subject'), ('lesson', 'Lesson'), ('assessment', 'Assessment'), ('homework', 'Homework'), ('series', 'Lesson series'), ('series_exception', 'Lesson series exception')], max_length=20),
+        ),
+    ]
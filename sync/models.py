@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class Tombstone(models.Model):
+    '''
+    Record of a deleted subject or event, so that sync clients remove
+    their copies (see changes). Only directly deleted objects are
+    recorded: clients delete events of deleted subjects and lessons
+    with them, like the server does. Archived events are not deleted,
+    so they are kept by clients too.
+    '''
+
+    class Meta:
+        db_table = 'sync_tombstone'
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='sync_tombstone_user_del_idx'),
+        ]
+
+    class ObjectType(models.TextChoices):
+        SUBJECT = 'subject', 'Subject'
+        LESSON = 'lesson', 'Lesson'
+        ASSESSMENT = 'assessment', 'Assessment'
+        HOMEWORK = 'homework', 'Homework'
+        SERIES = 'series', 'Lesson series'
+        SERIES_EXCEPTION = 'series_exception', 'Lesson series exception'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False) # covered by sync_tombstone_user_del_idx
+    object_type = models.CharField(max_length=20, choices=ObjectType)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.object_type} {self.object_id} deleted at {self.deleted_at}'
@@ -0,0 +1,43 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.utils.timezone import now
+
+from lesson.models import Lesson, LessonSeries, LessonSeriesException
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.accessors import get_owner_id
+
+from .changes import SYNC_MODELS
+from .models import Tombstone
+
+SYNC_TYPES = {model: object_type for object_type, model in SYNC_MODELS.items()}
+
+
+def record_deleted_event(sender, instance, origin=None, **kwargs):
+    '''
+    Records tombstone of the deleted series, exception or event.
+    Ones deleted in cascade of another deleted object are skipped,
+    as clients delete them with it. Subjects are deleted without
+    signals, see delete_subjects().
+    '''
+    if origin is not instance and not (isinstance(origin, QuerySet) and origin.model is sender):
+        return
+
+    if user_id := get_owner_id(instance):
+        Tombstone.objects.create(user_id=user_id, object_type=SYNC_TYPES[sender], object_id=instance.pk)
+
+
+def touch_series_of_exception(sender, instance, **kwargs):
+    '''
+    Updates last_modified of the series of the saved exception,
+    which has no time of its own, so that it's synced with the series
+    and the calendar feed changes.
+    '''
+    LessonSeries.objects.filter(pk=instance.series_id).update(last_modified=now())
+
+
+for model in [LessonSeries, LessonSeriesException, Lesson, Assessment, Homework]:
+    post_delete.connect(record_deleted_event, sender=model, dispatch_uid=f'record_tombstone_on_{model.__name__}_delete')
+
+post_save.connect(touch_series_of_exception, sender=LessonSeriesException, dispatch_uid='touch_series_on_LessonSeriesException_save')
@@ -0,0 +1,204 @@
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localdate, localtime, now
+from django.contrib.auth.models import User
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries, LessonSeriesException
+from lesson.series import materialize_occurrence
+from homework.models import Homework
+from userprofile.models import UserProfile
+from dashboard.models import EventTimeline
+from utils.constants import SYNC_TOMBSTONE_RETENTION
+from utils.query_plan import uses_index
+
+from .calendar_feed import fold_ics_line
+from .changes import stream_changes
+from .models import Tombstone
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        '''
+        Create a logged in test user with profile, two subjects, a lesson
+        with homework due at it, and another user with a subject.
+        '''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Databases')
+        self.other_subject = Subject.objects.create(user=self.user, name='Compilers')
+        self.lesson = Lesson.objects.create(subject=self.subject, start_time=now() + timedelta(days=1), duration=timedelta(minutes=90))
+        self.homework = Homework.objects.create(lesson_due=self.lesson, task='Normalize the schema')
+
+        other_user = User.objects.create_user(username='otheruser')
+        UserProfile.objects.create(user=other_user)
+        Subject.objects.create(user=other_user, name='Algebra')
+
+
+    def sync(self, since=None):
+        return json.loads(''.join(stream_changes(self.user, since)))
+
+
+    def ids(self, document, object_type):
+        id_index = document['fields'][object_type].index('id')
+        return sorted(row[id_index] for row in document['changed'][object_type])
+
+
+    def test_first_sync_streams_all_rows_of_user(self):
+        '''Test sync without watermark streams all subjects and events of the user as rows of values.'''
+        response = self.client.get(reverse('sync'))
+        document = json.loads(b''.join(response.streaming_content))
+
+        self.assertTrue(document['full'])
+        self.assertEqual(self.ids(document, 'subject'), [self.subject.pk, self.other_subject.pk])
+        self.assertEqual(self.ids(document, 'lesson'), [self.lesson.pk])
+        homework = dict(zip(document['fields']['homework'], document['changed']['homework'][0]))
+        self.assertEqual((homework['id'], homework['lesson_due_id'], homework['task']), (self.homework.pk, self.lesson.pk, 'Normalize the schema'))
+        self.assertEqual(self.client.get(reverse('sync'), {'since': 'yesterday'}).status_code, 400)
+
+
+    def test_sync_returns_changes_and_deletions_since_watermark(self):
+        '''Test sync since a watermark returns modified rows and tombstones of deleted ones only.'''
+        since = now()
+        homework_pk, subject_pk = self.homework.pk, self.other_subject.pk
+        self.lesson.duration = timedelta(minutes=45)
+        self.lesson.save()
+        self.homework.delete()
+        self.other_subject.delete()
+
+        document = self.sync(since)
+
+        self.assertFalse(document['full'])
+        self.assertEqual(self.ids(document, 'subject'), [])
+        self.assertEqual(self.ids(document, 'lesson'), [self.lesson.pk])
+        self.assertEqual(document['deleted'], {'homework': [homework_pk], 'subject': [subject_pk]})
+        self.assertTrue(self.sync(since - SYNC_TOMBSTONE_RETENTION - timedelta(days=1))['full'])
+
+
+    def test_series_synced_with_exceptions_and_tombstones(self):
+        '''Test changed series are synced with their exceptions, and deleting a series records its tombstone only.'''
+        since = now()
+        series = LessonSeries.objects.create(
+            subject=self.subject, start_time=now() + timedelta(days=2), duration=timedelta(minutes=90), end_date=localdate() + timedelta(weeks=2),
+        )
+        first_date, second_date = series.get_occurrence_dates()
+
+        document = self.sync(since)
+        self.assertEqual((self.ids(document, 'series'), self.ids(document, 'series_exception')), ([series.pk], []))
+
+        since = now()
+        exception = LessonSeriesException.objects.create(series=series, date=second_date)
+        lesson = materialize_occurrence(series, first_date)
+        document = self.sync(since)
+
+        self.assertEqual(
+            [self.ids(document, object_type) for object_type in ['series', 'series_exception', 'lesson']],
+            [[series.pk], [exception.pk], [lesson.pk]],
+        )
+        lesson_row = dict(zip(document['fields']['lesson'], document['changed']['lesson'][0]))
+        self.assertEqual((lesson_row['series_id'], lesson_row['series_date']), (series.pk, first_date.isoformat()))
+
+        since, series_pk = now(), series.pk
+        series.delete()
+
+        self.assertEqual(self.sync(since)['deleted'], {'series': [series_pk]})
+
+
+    def test_polling_without_changes_takes_one_indexed_query(self):
+        '''Test sync with no changes since the watermark takes one query using (user, time) indexes.'''
+        since = now()
+
+        with self.assertNumQueries(1):
+            document = self.sync(since)
+
+        self.assertEqual(document['changed'], {'subject': [], 'series': [], 'series_exception': [], 'lesson': [], 'assessment': [], 'homework': []})
+        self.assertTrue(uses_index(Subject.objects.filter(user=self.user, last_modified__gt=since), 'subject_user_modified_idx'))
+        self.assertTrue(uses_index(EventTimeline.objects.filter(user=self.user, last_modified__gt=since), 'event_timeline_user_mod_idx'))
+        self.assertTrue(uses_index(Tombstone.objects.filter(user=self.user, deleted_at__gt=since), 'sync_tombstone_user_del_idx'))
+
+
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile, calendar feed link created on the profile page, and a lesson with homework due at it.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.client.post(reverse('profile_calendar_token'))
+        self.profile.refresh_from_db()
+        self.url = reverse('calendar_feed', kwargs={'token': self.profile.calendar_token})
+        self.client.logout()
+
+        self.subject = Subject.objects.create(user=self.user, name='Databases')
+        self.lesson = Lesson.objects.create(subject=self.subject, start_time=now() + timedelta(days=1), duration=timedelta(minutes=90))
+        self.homework = Homework.objects.create(lesson_due=self.lesson, task='Normalize the schema, then index it')
+
+
+    def test_feed_streams_events_of_token_owner(self):
+        '''Test feed link streams iCalendar events of its owner without login, and unknown links are not found.'''
+        response = self.client.get(self.url)
+        content = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n') and content.endswith('END:VCALENDAR\r\n'))
+        self.assertIn(f'UID:lesson-{self.lesson.pk}\r\n', content)
+        self.assertIn('SUMMARY:Databases\r\nCATEGORIES:Lecture\r\n', content)
+        self.assertIn('DESCRIPTION:Normalize the schema\\, then index it\r\n', content)
+        self.assertEqual(fold_ics_line('X' * 80), 'X' * 75 + '\r\n ' + 'X' * 5 + '\r\n')
+        self.assertEqual(self.client.get(reverse('calendar_feed', kwargs={'token': 'unknown'})).status_code, 404)
+
+
+    def test_unchanged_feed_polls_get_304_after_one_query(self):
+        '''Test polls with the ETag or Last-Modified of an unchanged feed get 304 after one query.'''
+        response = self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+
+    def test_changes_and_deletions_change_etag(self):
+        '''Test changing a subject or deleting an event changes ETag of the feed.'''
+        etags = [self.client.get(self.url)['ETag']]
+
+        self.subject.name = 'Distributed Databases'
+        self.subject.save()
+        etags.append(self.client.get(self.url)['ETag'])
+
+        self.homework.delete()
+        etags.append(self.client.get(self.url)['ETag'])
+
+        self.assertEqual(len(set(etags)), 3)
+
+
+    def test_feed_expands_series_and_changes_with_them(self):
+        '''Test feed expands occurrences of series, which keep their UID when materialised, and changes with series and exceptions.'''
+        etags = [self.client.get(self.url)['ETag']]
+        series = LessonSeries.objects.create(
+            subject=self.subject, start_time=now() + timedelta(days=2), duration=timedelta(minutes=90), end_date=localdate() + timedelta(weeks=3),
+        )
+        dates = list(series.get_occurrence_dates())
+        keys = [f'{series.pk}:{date.isoformat()}' for date in dates]
+        etags.append(self.client.get(self.url)['ETag'])
+
+        LessonSeriesException.objects.create(series=series, date=dates[1])
+        etags.append(self.client.get(self.url)['ETag'])
+
+        materialize_occurrence(series, dates[0])
+        content = b''.join(self.client.get(self.url).streaming_content).decode()
+        self.assertEqual([f'UID:lesson-{key}\r\n' in content for key in keys], [True, False, True])
+
+        since = now()
+        series.delete()
+        etags.append(self.client.get(self.url)['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+        self.assertEqual(list(json.loads(''.join(stream_changes(self.user, since)))['deleted']), ['series'])
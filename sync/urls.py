@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import CalendarFeedView, SyncView
+
+urlpatterns = [
+    path(route='', view=SyncView.as_view(), name='sync'),
+    path(route='calendar/<str:token>.ics', view=CalendarFeedView.as_view(), name='calendar_feed'),
+]
@@ -0,0 +1,61 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.utils.timezone import is_aware
+from django.views import View
+
+from .calendar_feed import get_feed_state, stream_calendar
+from .changes import stream_changes
+
+
+class SyncView(LoginRequiredMixin, View):
+    '''
+    Streams user's subjects, lesson series and events changed after
+    the "since" GET param (watermark of the previous sync, ISO 8601
+    datetime with offset) as JSON, or all of them without it, see
+    stream_changes().
+    '''
+
+    def get(self, request):
+        since = request.GET.get('since')
+
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+
+            if since is None or not is_aware(since):
+                return JsonResponse({'error': 'Provide "since" as ISO 8601 datetime with time zone offset.'}, status=400)
+
+        return StreamingHttpResponse(stream_changes(request.user, since), content_type='application/json')
+
+
+class CalendarFeedView(View):
+    '''
+    Streams iCalendar feed of events of the user the token in the URL
+    belongs to, for subscribing to it in calendar apps, which can't log in.
+    Calendar apps poll feeds often, so ETag and Last-Modified of the feed
+    are found with one query (see get_feed_state()), and polls with
+    matching If-None-Match or If-Modified-Since get 304 without events.
+    The ETag is weak, as archived events leave the feed without changing it.
+    '''
+
+    def get(self, request, token):
+        if (state := get_feed_state(token)) is None:
+            raise Http404('Calendar feed not found.')
+
+        user_id, last_modified = state
+        timestamp = int(last_modified.timestamp())
+        etag = f'W/"{int(last_modified.timestamp() * 1_000_000)}"'
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+        if response is None:
+            response = StreamingHttpResponse(stream_calendar(user_id), content_type='text/calendar; charset=utf-8')
+
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(timestamp)
+        return response
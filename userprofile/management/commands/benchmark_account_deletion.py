@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+from userprofile.models import UserProfile
+
+from utils.bulk_delete import delete_user
+
+BATCH_SIZE = 1000
+SUBJECTS = 50
+
+
+class Command(BaseCommand):
+    help = 'Compares deleting an account through Django\'s collector and through bulk deletion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=50_000, help='Number of events of the account')
+
+    def handle(self, *args, **options):
+        events = options['events']
+
+        for label, delete in [
+            ('Django collector', lambda user: user.delete()),
+            ('Bulk deletion', delete_user),
+        ]:
+            with transaction.atomic():
+                user = create_account(events)
+                start = time.perf_counter()
+                delete(user)
+                elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+
+            self.stdout.write(f'{label}: {elapsed:.2f}s for {events} events')
+
+
+def create_account(events):
+    '''
+    Creates user with given number of events: half of them lessons,
+    a fifth assessments and the rest homework, split between
+    the ones linked directly to subject and via lessons.
+    Validation is skipped, as most of the events are in the past.
+    '''
+    user = User.objects.create_user(username=f'benchmark_{time.time_ns()}')
+    UserProfile.objects.create(user=user)
+
+    subjects = Subject.objects.all().bulk_create(
+        Subject(user=user, name=f'Subject {i}') for i in range(SUBJECTS)
+    )
+
+    lesson_count = events // 2
+    assessment_count = events // 5
+    homework_count = events - lesson_count - assessment_count
+    start = now() - timedelta(days=365)
+
+    lessons = Lesson.objects.all().bulk_create(
+        (
+            Lesson(
+                subject=subjects[i % SUBJECTS],
+                start_time=start + timedelta(hours=i),
+                duration=timedelta(minutes=90),
+            )
+            for i in range(lesson_count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    Assessment.objects.all().bulk_create(
+        (
+            Assessment(lesson=lessons[i % lesson_count])
+            if i % 2 else
+            Assessment(subject=subjects[i % SUBJECTS], start_time=start + timedelta(hours=i))
+            for i in range(assessment_count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    Homework.objects.all().bulk_create(
+        (
+            Homework(lesson_given=lessons[i % lesson_count], lesson_due=lessons[(i + SUBJECTS) % lesson_count], task='Task')
+            if i % 2 else
+            Homework(subject=subjects[i % SUBJECTS], due_at=start + timedelta(hours=i), task='Task')
+            for i in range(homework_count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    return user
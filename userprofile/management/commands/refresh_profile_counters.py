@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from userprofile.models import UserProfile
+
+from utils.counters import refresh_counters
+
+
+class Command(BaseCommand):
+    help = 'Recounts subject and event totals cached on user profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='Id of user to recount (all users by default)')
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.all()
+
+        if options['user']:
+            profiles = profiles.filter(user__in=options['user'])
+
+        updated = refresh_counters(profiles)
+        self.stdout.write(self.style.SUCCESS(f'Recounted totals of {updated} profiles.'))
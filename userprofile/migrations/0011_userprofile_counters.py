@@ -0,0 +1,73 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:27
+
+from django.db import migrations, models
+from django.db.models import Func, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset):
+    return Subquery(
+        queryset.order_by().annotate(row_count=Func('pk', function='COUNT')).values('row_count'),
+        output_field=IntegerField()
+    )
+
+
+def initialize_counters(apps, schema_editor):
+    '''
+    Sets counters of existing profiles, see utils.counters.refresh_counters().
+    '''
+    UserProfile = apps.get_model('userprofile', 'UserProfile')
+    Subject = apps.get_model('subject', 'Subject')
+    Lesson = apps.get_model('lesson', 'Lesson')
+    Assessment = apps.get_model('assessment', 'Assessment')
+    Homework = apps.get_model('homework', 'Homework')
+
+    UserProfile.objects.update(
+        subject_count=count_subquery(Subject.objects.filter(user=OuterRef('user'))),
+        lesson_count=count_subquery(Lesson.objects.filter(subject__user=OuterRef('user'))),
+        assessment_count=count_subquery(
+            Assessment.objects
+            .alias(owner=Coalesce('subject__user', 'lesson__subject__user'))
+            .filter(owner=OuterRef('user'))
+        ),
+        open_homework_count=count_subquery(
+            Homework.objects
+            .alias(owner=Coalesce('subject__user', 'lesson_given__subject__user', 'lesson_due__subject__user'))
+            .filter(owner=OuterRef('user'), completion_percent__lt=100)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0010_userprofile_time_display_format'),
+        ('subject', '0004_alter_subject_user'),
+        ('lesson', '0012_lesson_lesson_duration_range_and_more'),
+        ('assessment', '0012_assessment_assessment_duration_range_and_more'),
+        ('homework', '0011_homework_cascade_with_lessons'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='assessment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='open_homework_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='subject_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(initialize_counters, migrations.RunPython.noop),
+    ]
@@ -51,6 +51,16 @@ class UserProfile(models.Model):
         default=TimeDisplayFormat.H24
     )
 
+    # Totals of user's subjects and events, maintained on their creation
+    # and deletion (see userprofile.signals), so that they are not counted.
+    subject_count = models.PositiveIntegerField(default=0, editable=False)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    assessment_count = models.PositiveIntegerField(default=0, editable=False)
+    open_homework_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Secret of the URL of the user's calendar feed, see sync.calendar_feed.
+    calendar_token = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)
+
     def __str__(self):
         return f'{self.user.username} profile'
 
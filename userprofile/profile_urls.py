@@ -5,4 +5,5 @@ urlpatterns = [
     path('', view=profile_views.ProfileDetailView.as_view(), name='profile_detail'),
     path('update/', view=profile_views.ProfileUpdateView.as_view(), name='profile_update'),
     path('delete/', view=profile_views.ProfileDeleteView.as_view(), name='profile_delete'),
+    path('calendar-token/', view=profile_views.ProfileCalendarTokenView.as_view(), name='profile_calendar_token'),
 ]
\ No newline at end of file
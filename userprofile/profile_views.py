@@ -1,12 +1,16 @@
+import secrets
+
 from django.contrib.auth.models import User
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import render, redirect
 from django.views import View
 from django.views.generic import DetailView, DeleteView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 
 from notification.services.email_service import send_email
 
+from utils.bulk_delete import delete_user
+from utils.constants import CALENDAR_TOKEN_BYTES
 from utils.mixins import UserObjectMixin
 
 from .forms import UserUpdateForm, ProfileUpdateForm
@@ -39,9 +43,26 @@ class ProfileDetailView(LoginRequiredMixin, UserObjectMixin, DetailView):
                 'timing': profile.homework_reminder_timing,
             },
         ]
+        if profile.calendar_token:
+            context['calendar_feed_url'] = self.request.build_absolute_uri(
+                reverse('calendar_feed', kwargs={'token': profile.calendar_token})
+            )
         return context
 
 
+class ProfileCalendarTokenView(LoginRequiredMixin, View):
+    '''
+    Creates new token of the user's calendar feed URL,
+    so that links with the previous one stop working.
+    '''
+
+    def post(self, request, *args, **kwargs):
+        profile = request.user.userprofile
+        profile.calendar_token = secrets.token_urlsafe(CALENDAR_TOKEN_BYTES)
+        profile.save(update_fields=['calendar_token'])
+        return redirect('profile_detail')
+
+
 class ProfileUpdateView(LoginRequiredMixin, View):
     template_name = 'profile/profile_update.html'
     success_url = reverse_lazy('profile_detail')
@@ -91,3 +112,8 @@ class ProfileDeleteView(LoginRequiredMixin, UserObjectMixin, DeleteView):
         context = super().get_context_data(**kwargs)
         context['cancel_link'] = self.cancel_link
         return context
+
+    def form_valid(self, form):
+        success_url = self.get_success_url()
+        delete_user(self.object)
+        return redirect(success_url)
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from homework.models import Homework
+
+from utils.accessors import get_owner_id
+from utils.counters import COUNTER_FIELDS, is_counted, refresh_counters, update_counters
+
+from .models import UserProfile
+
+
+def count_saved(sender, instance, created=False, **kwargs):
+    '''
+    Increments counter of the user whose subject or event was created.
+    Homework is counted while it's open, so completing or reopening
+    it updates the counter as well.
+    '''
+    if created:
+        delta = int(is_counted(instance))
+    elif isinstance(instance, Homework) and instance._original_completion_percent is not None:
+        was_open = instance._original_completion_percent < 100
+        delta = int(is_counted(instance)) - int(was_open)
+    else:
+        return
+
+    if delta and (user_id := get_owner_id(instance)):
+        update_counters(user_id, **{COUNTER_FIELDS[sender]: delta})
+
+
+def remember_owner(sender, instance, **kwargs):
+    '''
+    Stores owner of the subject or event being deleted, which can't
+    be resolved after its lesson was deleted in the same cascade.
+    '''
+    instance._counter_owner_id = get_owner_id(instance)
+
+
+def count_deleted(sender, instance, **kwargs):
+    '''
+    Decrements counter of the user whose subject or event was deleted.
+    '''
+    user_id = getattr(instance, '_counter_owner_id', None)
+
+    if user_id and is_counted(instance):
+        update_counters(user_id, **{COUNTER_FIELDS[sender]: -1})
+
+
+def initialize_counters(sender, instance, created=False, raw=False, **kwargs):
+    '''
+    Counts subjects and events the user already has
+    when their profile is created.
+    '''
+    if created and not raw:
+        refresh_counters(UserProfile.objects.filter(pk=instance.pk))
+
+
+for model in COUNTER_FIELDS:
+    post_save.connect(count_saved, sender=model, dispatch_uid=f'update_counters_on_{model.__name__}_save')
+    pre_delete.connect(remember_owner, sender=model, dispatch_uid=f'remember_owner_on_{model.__name__}_delete')
+    post_delete.connect(count_deleted, sender=model, dispatch_uid=f'update_counters_on_{model.__name__}_delete')
+
+post_save.connect(initialize_counters, sender=UserProfile, dispatch_uid='initialize_counters_on_profile_create')
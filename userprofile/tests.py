@@ -1,3 +1,109 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from django.contrib.auth.models import User
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.counters import refresh_counters
+
+from .models import UserProfile
+
+
+class ProfileDeleteViewTests(TestCase):
+
+    def setUp(self):
+        '''Create a logged in test user with profile, subject and related events.'''
+        self.user = User.objects.create_user(username='testuser')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+        subject = Subject.objects.create(user=self.user, name='Cryptography')
+        lesson, = Lesson.objects.all().bulk_create([
+            Lesson(subject=subject, start_time=now() + timedelta(days=1), duration=timedelta(minutes=90))
+        ])
+        Assessment.objects.all().bulk_create([Assessment(lesson=lesson)])
+        Homework.objects.all().bulk_create([Homework(lesson_due=lesson, task='Task')])
+
+        self.other_user = User.objects.create_user(username='otheruser')
+        Subject.objects.create(user=self.other_user, name='Cryptography')
+
+
+    def test_delete_account_removes_all_user_data(self):
+        '''Test deleting account removes the user, profile, subjects and all events.'''
+        response = self.client.post(reverse('profile_delete'))
+
+        self.assertRedirects(response, reverse('user_login'), fetch_redirect_response=False)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(UserProfile.objects.exists())
+        self.assertFalse(Lesson.objects.exists())
+        self.assertFalse(Assessment.objects.exists())
+        self.assertFalse(Homework.objects.exists())
+        self.assertEqual(list(Subject.objects.values_list('user', flat=True)), [self.other_user.pk])
+
+
+class ProfileCounterTests(TestCase):
+
+    def setUp(self):
+        '''Create a test user with profile and subject.'''
+        self.user = User.objects.create_user(username='testuser')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.subject = Subject.objects.create(user=self.user, name='Cryptography')
+
+
+    def assertCounters(self, **expected):
+        self.profile.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(self.profile, field), value, field)
+
+
+    def test_counters_follow_creates_and_deletes(self):
+        '''Test counters are incremented on create and decremented on delete, including cascades.'''
+        lesson = Lesson.objects.create(subject=self.subject, start_time=now() + timedelta(days=1), duration=timedelta(minutes=90))
+        Assessment.objects.create(lesson=lesson)
+        Homework.objects.create(lesson_due=lesson, task='Task')
+        self.assertCounters(subject_count=1, lesson_count=1, assessment_count=1, open_homework_count=1)
+
+        lesson.delete()
+        self.assertCounters(subject_count=1, lesson_count=0, assessment_count=0, open_homework_count=0)
+
+
+    def test_open_homework_counter_follows_completion(self):
+        '''Test completing homework removes it from open homework and reopening adds it back.'''
+        homework = Homework.objects.create(subject=self.subject, task='Task', due_at=now() + timedelta(days=1))
+
+        homework.completion_percent = 100
+        homework.save()
+        self.assertCounters(open_homework_count=0)
+
+        homework.completion_percent = 50
+        homework.save()
+        self.assertCounters(open_homework_count=1)
+
+
+    def test_bulk_paths_keep_counters(self):
+        '''Test validated bulk creates increment counters and bulk subject deletion recounts them.'''
+        Lesson.objects.bulk_create([
+            Lesson(subject=self.subject, start_time=now() + timedelta(days=day), duration=timedelta(minutes=90))
+            for day in range(1, 4)
+        ])
+        self.assertCounters(lesson_count=3)
+
+        Subject.objects.filter(pk=self.subject.pk).delete()
+        self.assertCounters(subject_count=0, lesson_count=0)
+
+
+    def test_refresh_repairs_drift(self):
+        '''Test refreshing counters recounts them from the existing rows.'''
+        Lesson.objects.all().bulk_create([
+            Lesson(subject=self.subject, start_time=now() + timedelta(days=1), duration=timedelta(minutes=90))
+        ])
+        UserProfile.objects.filter(pk=self.profile.pk).update(subject_count=7)
 
-# Create your tests here.
+        refresh_counters(UserProfile.objects.filter(pk=self.profile.pk))
+        self.assertCounters(subject_count=1, lesson_count=1)
@@ -1,11 +1,16 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+
 def get_subject(obj):
     '''
     Returns subject object certain event belongs to.
     '''
     if type(obj).__name__ == 'Subject':
         return obj
-    elif type(obj).__name__ == 'Lesson':
+    elif type(obj).__name__ in ('Lesson', 'LessonSeries'):
         return obj.subject
+    elif type(obj).__name__ == 'LessonSeriesException':
+        return obj.series.subject
     elif type(obj).__name__ in ('Assessment', 'Homework'):
         return obj.derived_subject
     else:
@@ -18,6 +23,20 @@ def get_user(obj):
     subject = get_subject(obj)
     return subject.user
 
+def get_owner_id(obj):
+    '''
+    Returns id of the user subject or event belongs to,
+    or None if it can't be resolved anymore
+    (e.g. its lesson was deleted in the same cascade).
+    '''
+    if getattr(obj, 'derived_user_id', None):
+        return obj.derived_user_id
+
+    try:
+        return get_subject(obj).user_id
+    except ObjectDoesNotExist:
+        return None
+
 def get_userprofile(obj):
     '''
     Return userprofile of a user
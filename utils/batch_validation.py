@@ -0,0 +1,199 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+
+from utils.accessors import get_user
+from utils.constants import MAX_SUBJECTS_PER_USER, UNKNOWN_ASSESSMENT_DURATION
+from utils.counters import count_created, get_subject_counts, lock_counters
+from utils.data_version import bump_data_version
+from utils.time_conflicts import find_batch_conflicts
+
+# Related objects are loaded with everything rules and reminder times read from them.
+RELATED_SELECT = {
+    User: ['userprofile'],
+    Subject: ['user__userprofile'],
+    Lesson: ['subject__user__userprofile'],
+}
+
+
+def attach_related_objects(objs):
+    '''
+    Sets foreign keys of the objects (of one model) to related objects
+    loaded with one query per related model, so that rules reading them
+    don't query them one by one. Returns {index: {field: [errors]}}
+    of objects referencing missing rows.
+    '''
+    fields = [field for field in type(objs[0])._meta.concrete_fields if field.many_to_one]
+    ids = defaultdict(set)
+
+    for obj in objs:
+        for field in fields:
+            if (value := getattr(obj, field.attname)) is not None:
+                ids[field.related_model].add(value)
+
+    loaded = {
+        model: model.objects.select_related(*RELATED_SELECT.get(model, [])).in_bulk(model_ids)
+        for model, model_ids in ids.items()
+    }
+    errors = defaultdict(lambda: defaultdict(list))
+
+    for index, obj in enumerate(objs):
+        for field in fields:
+            if (value := getattr(obj, field.attname)) is None:
+                continue
+
+            if related := loaded[field.related_model].get(value):
+                setattr(obj, field.name, related)
+            else:
+                errors[index][field.name].append(ValidationError(
+                    field.error_messages['invalid'],
+                    code='invalid',
+                    params={
+                        'model': field.related_model._meta.verbose_name,
+                        'pk': value,
+                        'field': field.remote_field.field_name,
+                        'value': value,
+                    },
+                ))
+
+    return errors
+
+
+def check_time_conflicts(objs, errors):
+    '''
+    Adds errors of lessons or assessments with own time of the batch,
+    which overlap user's other events or each other, with one
+    conflicts check per user (see find_batch_conflicts()).
+    '''
+    by_user = defaultdict(list)
+
+    for index, obj in enumerate(objs):
+        if index in errors or not obj.start_time:
+            continue
+        if isinstance(obj, Assessment) and obj.lesson_id:
+            # Takes place during its lesson.
+            continue
+
+        duration = obj.duration or (UNKNOWN_ASSESSMENT_DURATION if isinstance(obj, Assessment) else None)
+        by_user[obj.subject.user].append((index, (obj.start_time, obj.start_time + duration)))
+
+    for user, indexed_ranges in by_user.items():
+        conflicts = find_batch_conflicts(user, [time_range for _, time_range in indexed_ranges])
+
+        for position in conflicts:
+            obj = objs[indexed_ranges[position][0]]
+            errors[indexed_ranges[position][0]]['start_time'].append(ValidationError(
+                message=f'{type(obj).__name__} overlaps with another of your lessons or assessments.',
+                code='time_conflict'
+            ))
+
+
+def check_subject_limit(objs, errors):
+    '''
+    Adds errors of subjects of the batch exceeding MAX_SUBJECTS_PER_USER
+    together with existing subjects of their users, read from their
+    counters in one query.
+    '''
+    counts = get_subject_counts({obj.user_id for obj in objs})
+
+    for index, obj in enumerate(objs):
+        if counts[obj.user_id] >= MAX_SUBJECTS_PER_USER:
+            errors[index]['user'].append(ValidationError(
+                message=f'You can\'t have more that {MAX_SUBJECTS_PER_USER} subjects per user.',
+                code='max_subjects_reached'
+            ))
+        counts[obj.user_id] += 1
+
+
+# Rules of model clean() methods that query the database, checked for the whole batch.
+BATCH_CHECKS = {
+    Subject: [check_subject_limit],
+    Lesson: [check_time_conflicts],
+    Assessment: [check_time_conflicts],
+    Homework: [],
+}
+
+
+def get_batch_errors(objs):
+    '''
+    Validates new objects of one model by the same rules as full_clean(),
+    except unique checks left to the database, with a constant number of
+    queries: related objects are loaded with one query per model, rules
+    are checked against them in memory (see get_rule_errors() of the
+    models), and rules that need queries are checked for the whole batch.
+    Returns {index: ValidationError} of invalid objects.
+    '''
+    if not objs:
+        return {}
+
+    errors = attach_related_objects(objs)
+    foreign_keys = [field.name for field in type(objs[0])._meta.concrete_fields if field.many_to_one]
+
+    for index, obj in enumerate(objs):
+        try:
+            obj.clean_fields(exclude=foreign_keys)
+        except ValidationError as error:
+            for field, field_errors in error.error_dict.items():
+                errors[index][field].extend(field_errors)
+
+        if index in errors or not hasattr(obj, 'get_rule_errors'):
+            continue
+
+        for field, error in obj.get_rule_errors().items():
+            errors[index][field].append(error)
+
+    for check in BATCH_CHECKS[type(objs[0])]:
+        check(objs, errors)
+
+    return {index: ValidationError(dict(obj_errors)) for index, obj_errors in errors.items()}
+
+
+def validate_batch(objs):
+    '''
+    Validates new objects of one model (see get_batch_errors()), raising
+    ValidationError of the first invalid one like full_clean() would, and
+    sets fields derived on save, including reminder times.
+    Returns ids of users the objects belong to.
+    '''
+    if errors := get_batch_errors(objs):
+        raise errors[min(errors)]
+
+    for obj in objs:
+        if hasattr(obj, 'prepare_for_save'):
+            obj.prepare_for_save()
+
+    return {get_user(obj).pk for obj in objs}
+
+
+def validated_bulk_create(bulk_create, objs, **kwargs):
+    '''
+    Validates objects (see validate_batch()) and inserts them with the given
+    QuerySet.bulk_create(). Bulk inserts send no post_save signals, so counters
+    and timeline rows of the owners are updated and their cached data
+    invalidated explicitly.
+    Profiles of users of new subjects are locked while they are checked
+    against the limit and inserted.
+    '''
+    # Imported here, as dashboard depends on event models.
+    from dashboard.timeline import sync_created
+
+    objs = list(objs)
+
+    with transaction.atomic():
+        if objs and isinstance(objs[0], Subject):
+            lock_counters(*{obj.user_id for obj in objs})
+
+        user_ids = validate_batch(objs)
+        created = bulk_create(objs, **kwargs)
+        count_created(objs)
+        sync_created(objs)
+
+    transaction.on_commit(lambda: bump_data_version(*user_ids))
+    return created
@@ -0,0 +1,27 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+
+
+def insert_from_select(model, queryset, values):
+    '''
+    Inserts rows of the model with a single INSERT ... SELECT statement,
+    selecting {field: expression} values for each row of the queryset
+    (expressions may reference its fields, like F('start_time') + delta).
+    The rows are copied by the database, without loading them,
+    and no save() or signals are run. Returns number of inserted rows.
+    '''
+    quote_name = connection.ops.quote_name
+    # Aliased, as annotations can't be named as fields of the model.
+    select = queryset.order_by().values(**{f'copied_{field}': expression for field, expression in values.items()})
+
+    try:
+        select_sql, params = select.query.sql_with_params()
+    except EmptyResultSet:
+        # Filtered by an empty list, like pk__in=[].
+        return 0
+
+    columns = ', '.join(quote_name(model._meta.get_field(field).column) for field in values)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote_name(model._meta.db_table)} ({columns}) {select_sql}', params)
+        return cursor.rowcount
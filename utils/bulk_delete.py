@@ -0,0 +1,98 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.utils.timezone import now
+
+from subject.models import Subject
+from lesson.models import Lesson, LessonSeries, LessonSeriesException
+from assessment.models import Assessment
+from homework.models import Homework
+from archive.models import ArchivedLesson, ArchivedAssessment, ArchivedHomework
+from dashboard.models import EventTimeline, StudyBlock
+from userprofile.models import UserProfile
+from sync.models import Tombstone
+
+from utils.bulk_copy import insert_from_select
+from utils.counters import lock_counters, refresh_counters
+from utils.data_version import bump_data_version
+
+
+def raw_delete(queryset):
+    '''
+    Deletes rows matched by the queryset with a single DELETE statement.
+    Unlike QuerySet.delete(), doesn't collect related objects in memory,
+    so on_delete handlers and delete signals are not applied.
+    Returns the number of deleted rows.
+    '''
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_subjects(subjects):
+    '''
+    Deletes subjects together with all their lessons and lesson series,
+    all assessments and homework linked to them either directly
+    or via lessons, and their archived events.
+    Uses one DELETE statement per model in a single transaction.
+    Delete signals are not sent, so counters of the subjects' users
+    are recounted and their calendars invalidated explicitly,
+    and tombstones of the subjects are recorded for sync clients.
+    Returns (total, {model_label: count}) like QuerySet.delete().
+    '''
+    subject_ids = subjects.values('pk')
+    user_ids = set(subjects.values_list('user', flat=True))
+    deleted = Counter()
+
+    with transaction.atomic():
+        lock_counters(*user_ids)
+        # Derived rows, not reported as deleted. By user too, to use indexes starting with it.
+        raw_delete(EventTimeline.objects.filter(user__in=user_ids, subject__in=subject_ids))
+        # Clients delete events of the subjects with them.
+        insert_from_select(Tombstone, Subject.objects.filter(pk__in=subject_ids), {
+            'user': F('user'),
+            'object_type': Value('subject'),
+            'object_id': F('pk'),
+            'deleted_at': Value(now()),
+        })
+
+        homework_q = (
+            Q(subject__in=subject_ids) |
+            Q(lesson_given__subject__in=subject_ids) |
+            Q(lesson_due__subject__in=subject_ids)
+        )
+        # Planned blocks reference the homework, so they go first.
+        raw_delete(StudyBlock.objects.filter(user__in=user_ids, homework__in=Homework.objects.filter(homework_q).values('pk')))
+
+        for model, related_subject_q in [
+            (Homework, homework_q),
+            (Assessment, Q(subject__in=subject_ids) | Q(lesson__subject__in=subject_ids)),
+            (Lesson, Q(subject__in=subject_ids)),
+            (ArchivedHomework, Q(subject__in=subject_ids)),
+            (ArchivedAssessment, Q(subject__in=subject_ids)),
+            (ArchivedLesson, Q(subject__in=subject_ids)),
+            (LessonSeriesException, Q(series__subject__in=subject_ids)),
+            (LessonSeries, Q(subject__in=subject_ids)),
+            (Subject, Q(pk__in=subject_ids)),
+        ]:
+            if count := raw_delete(model.objects.filter(related_subject_q)):
+                deleted[model._meta.label] = count
+
+        refresh_counters(UserProfile.objects.filter(user__in=user_ids))
+        transaction.on_commit(lambda: bump_data_version(*user_ids))
+
+    return sum(deleted.values()), dict(deleted)
+
+
+def delete_user(user):
+    '''
+    Deletes user with all their subjects and events,
+    see delete_subjects(). Remaining related objects
+    (like user profile) are deleted by Django.
+    Returns (total, {model_label: count}) like QuerySet.delete().
+    '''
+    with transaction.atomic():
+        _, deleted = delete_subjects(Subject.objects.filter(user=user))
+        _, user_deleted = user.delete()
+
+    deleted = Counter(deleted) + Counter(user_deleted)
+    return sum(deleted.values()), dict(deleted)
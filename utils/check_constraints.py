@@ -0,0 +1,41 @@
+from django.db import models
+from django.db.models import Q
+
+
+def range_constraint(name, field, min_value, max_value, nullable=True):
+    '''
+    Returns check constraint keeping field between min and max
+    values (inclusive), or null if it's nullable.
+    '''
+    condition = Q(**{f'{field}__gte': min_value, f'{field}__lte': max_value})
+
+    if nullable:
+        condition |= Q(**{f'{field}__isnull': True})
+
+    return models.CheckConstraint(condition=condition, name=name)
+
+
+def any_not_null_constraint(name, *fields):
+    '''
+    Returns check constraint requiring at least one of the fields to be set.
+    '''
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__isnull': False})
+
+    return models.CheckConstraint(condition=condition, name=name)
+
+
+class CleanMirroredConstraintsMixin:
+    '''
+    For models whose check constraints mirror rules of their clean().
+    full_clean() doesn't validate the check constraints again, as each
+    would take a query, so they back the rules up in the database for
+    trusted saves and updates that skip validation (see save(trusted=True)).
+    '''
+
+    def get_constraints(self):
+        return [
+            (model_class, [constraint for constraint in constraints if not isinstance(constraint, models.CheckConstraint)])
+            for model_class, constraints in super().get_constraints()
+        ]
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import time, timedelta
 
 # ---- Filtering and Sorting ----
 VALID_TIMEFRAME_OPTIONS = [
@@ -23,15 +23,23 @@ MAX_SUBJECT_NAME_LENGTH = 150
 # ----- Lesson -----
 MIN_LESSON_DURATION = timedelta(minutes=15)
 MAX_LESSON_DURATION = timedelta(hours=8)
+LESSON_IMPORT_BATCH_SIZE = 500
+MAX_IMPORTED_LESSONS = 10000
+MAX_ROLLOVER_RANGE = timedelta(days=366)
 
 # --- Assessment ---
 MIN_ASSESSMENT_DURATION = timedelta(minutes=5)
 MAX_ASSESSMENT_DURATION = timedelta(days=7)
+UNKNOWN_ASSESSMENT_DURATION = timedelta(hours=1) # shown in calendars for assessments without duration
 
 # ---- Homework ----
 MAX_TIMEFRAME = timedelta(days=365)
 RECENT_PAST_TIMEFRAME = timedelta(days=30)
 MAX_TASK_LENGTH = 1000
+MIN_HOMEWORK_EFFORT = timedelta(minutes=5)
+MAX_HOMEWORK_EFFORT = timedelta(days=4)
+DEFAULT_HOMEWORK_EFFORT = timedelta(hours=1) # planned for homework without effort estimate
+MAX_PROGRESS_UPDATES = 500
 
 # -- User Profile --
 DEFAULT_LESSON_DURATION = timedelta(minutes=90)
@@ -45,6 +53,29 @@ DEFAULT_ASSESSMENT_REMINDER_TIMING = timedelta(days=3)
 DEFAULT_RECEIVE_HOMEWORK_REMINDERS = True
 DEFAULT_HOMEWORK_REMINDER_TIMING = timedelta(days=2)
 
+# --- Dashboard ----
+CALENDAR_CACHE_TIMEOUT = timedelta(days=1)
+MAX_HEATMAP_RANGE = timedelta(days=366)
+AGENDA_PAGE_SIZE = 20
+MAX_AGENDA_PAGE_SIZE = 100
+FREE_TIME_DAY_START = time(8, 0)
+FREE_TIME_DAY_END = time(22, 0)
+DEFAULT_FREE_SLOT_LENGTH = timedelta(hours=1)
+MIN_STUDY_BLOCK_LENGTH = timedelta(minutes=15)
+MAX_FREE_TIME_RANGE = timedelta(days=366)
+
+# ---- Archive -----
+ARCHIVE_HORIZON = timedelta(days=180) # events older than this are moved to archive tables
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_INTERVAL = timedelta(days=1)
+MAX_HISTORY_RANGE = timedelta(days=366)
+
+# ----- Sync -------
+SYNC_CHUNK_SIZE = 2000
+SYNC_WATERMARK_LAG = timedelta(minutes=1) # rows committed up to this long after their last_modified are still sent
+SYNC_TOMBSTONE_RETENTION = timedelta(days=90) # clients not synced for longer get all rows again
+CALENDAR_TOKEN_BYTES = 32
+
 # -- Event Type Specific Messages --
 EVENT_TYPE_SPECIFIC_EMAIL_MESSAGES = {
     'lesson': 'Make sure to attend on time and be prepared.',
@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef
+from django.db.models.functions import Coalesce, Greatest
+
+from subject.models import Subject
+from lesson.models import Lesson
+from assessment.models import Assessment
+from homework.models import Homework
+from userprofile.models import UserProfile
+
+from utils.accessors import get_owner_id
+from utils.subqueries import count_subquery
+
+# Counter fields of user profile by counted model.
+COUNTER_FIELDS = {
+    Subject: 'subject_count',
+    Lesson: 'lesson_count',
+    Assessment: 'assessment_count',
+    Homework: 'open_homework_count',
+}
+
+
+def is_counted(instance):
+    '''Returns False for homework that is completed, which is not counted.'''
+    return not isinstance(instance, Homework) or instance.completion_percent < 100
+
+
+def lock_counters(*user_ids):
+    '''
+    Locks profiles of the users until the end of the transaction, so that
+    checks of their counters (like the subject limit) are serialized.
+    '''
+    list(UserProfile.objects.select_for_update().filter(user__in=user_ids).values_list('pk'))
+
+
+def update_counters(user_id, **deltas):
+    '''
+    Adds {counter field: delta} to counters of the user's profile
+    with a single atomic UPDATE. Counters never go below zero, even if
+    rows were inserted without counting them (see refresh_counters()).
+    '''
+    if deltas := {field: Greatest(F(field) + delta, 0) for field, delta in deltas.items() if delta}:
+        UserProfile.objects.filter(user=user_id).update(**deltas)
+
+
+def count_created(objs):
+    '''
+    Adds new objects (of one model) inserted without post_save signals
+    to counters of their users, with one UPDATE per user.
+    '''
+    deltas = Counter(get_owner_id(obj) for obj in objs if is_counted(obj))
+
+    for user_id, delta in deltas.items():
+        update_counters(user_id, **{COUNTER_FIELDS[type(objs[0])]: delta})
+
+
+def get_subject_counts(user_ids):
+    '''
+    Returns {user_id: number of subjects} of the users from their counters,
+    counting subjects of users without profile.
+    '''
+    counts = dict(UserProfile.objects.filter(user__in=user_ids).values_list('user', 'subject_count'))
+
+    if missing := set(user_ids) - set(counts):
+        counts.update({user_id: 0 for user_id in missing})
+        counts.update(
+            Subject.objects.filter(user__in=missing).values('user').annotate(count=Count('pk')).values_list('user', 'count')
+        )
+
+    return counts
+
+
+def get_totals(user):
+    '''
+    Returns {counter field: value} of the user's profile,
+    or None if they have no profile.
+    '''
+    return UserProfile.objects.filter(user=user).values(*COUNTER_FIELDS.values()).first()
+
+
+def get_counter_subqueries():
+    '''
+    Returns {counter field: subquery counting rows of the profile's user}.
+    '''
+    homework_user = Coalesce('subject__user', 'lesson_given__subject__user', 'lesson_due__subject__user')
+    assessment_user = Coalesce('subject__user', 'lesson__subject__user')
+
+    return {
+        'subject_count': count_subquery(Subject.objects.filter(user=OuterRef('user'))),
+        'lesson_count': count_subquery(Lesson.objects.filter(subject__user=OuterRef('user'))),
+        'assessment_count': count_subquery(
+            Assessment.objects.alias(owner=assessment_user).filter(owner=OuterRef('user'))
+        ),
+        'open_homework_count': count_subquery(
+            Homework.objects.alias(owner=homework_user).filter(owner=OuterRef('user'), completion_percent__lt=100)
+        ),
+    }
+
+
+def refresh_counters(profiles):
+    '''
+    Recounts counters of the profiles in the queryset with a single UPDATE,
+    after bulk changes that don't maintain them, or to repair drift.
+    Returns the number of updated profiles.
+    '''
+    return profiles.update(**get_counter_subqueries())
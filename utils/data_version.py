@@ -0,0 +1,35 @@
+import time
+
+from django.core.cache import cache
+
+DATA_VERSION_KEY = 'data_version:{user_id}'
+
+
+def get_data_version(user_id):
+    '''
+    Returns current version of the user's events data.
+    Cached values computed from the data should include
+    it in their keys, so that they expire on any change.
+    '''
+    key = DATA_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+
+    if version is None:
+        # Starting from current time, not 1, so that values cached
+        # before the version itself was evicted are never reused.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_data_version(*user_ids):
+    '''
+    Invalidates values cached for the users' events data.
+    '''
+    for user_id in user_ids:
+        key = DATA_VERSION_KEY.format(user_id=user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
@@ -1,5 +1,6 @@
-from django.utils.timezone import now, localtime
-from datetime import timedelta
+from django.db.models import Q
+from django.utils.timezone import now, localtime, make_aware, get_current_timezone
+from datetime import datetime, time, timedelta
 
 
 def apply_sorting(GET, queryset, sort_options):
@@ -23,11 +24,20 @@ def apply_sorting(GET, queryset, sort_options):
     return queryset
 
 
-def filter_by_date_range(queryset, filter_param, date=None, date_field='start_time'):
+def get_local_midnight(date):
     '''
-    Filters a queryset by a date range (like 'day', 'month')
-    relative to a reference date. The reference date defaults to today.
-    Assumes queryset uses 'start_time' or specified 'date_field' for filtering.
+    Returns timezone-aware datetime of the start of the given date
+    in the current (local) time zone.
+    '''
+    return make_aware(datetime.combine(date, time.min), get_current_timezone())
+
+
+def get_timeframe_bounds(filter_param, date=None):
+    '''
+    Returns half-open (start, end) range of timezone-aware datetimes
+    for a timeframe (like 'day', 'month') relative to a reference date.
+    The reference date defaults to today. Bounds are local midnights,
+    so the range covers whole local days: start <= value < end.
     '''
 
     DAYS_IN_WEEK = 7
@@ -41,29 +51,75 @@ def filter_by_date_range(queryset, filter_param, date=None, date_field='start_ti
     next_month = (start_of_month + timedelta(days=DAYS_IN_MONTH)).replace(day=1)
 
     time_filters = {
-        'day': lambda: (date, date),
-        'next_day': lambda: (date + timedelta(days=1), date + timedelta(days=1)),
-        'next_3_days' : lambda: (date, date + timedelta(days=3)),
+        'day': lambda: (date, date + timedelta(days=1)),
+        'next_day': lambda: (date + timedelta(days=1), date + timedelta(days=2)),
+        'next_3_days' : lambda: (date, date + timedelta(days=4)),
         'week': lambda: (
-            start_of_week, 
-            start_of_week + timedelta(days=6)
+            start_of_week,
+            start_of_week + timedelta(days=DAYS_IN_WEEK)
         ),
         'next_week' : lambda: (
-            start_of_week + timedelta(days=DAYS_IN_WEEK), 
-            start_of_week + timedelta(days=DAYS_IN_WEEK * 2 - 1)
-        ),
-        'month' : lambda: (
-            start_of_month, 
-            (start_of_month + timedelta(days=DAYS_IN_MONTH)).replace(day=1) - timedelta(days=1)
+            start_of_week + timedelta(days=DAYS_IN_WEEK),
+            start_of_week + timedelta(days=DAYS_IN_WEEK * 2)
         ),
+        'month' : lambda: (start_of_month, next_month),
         'next_month' : lambda: (
             next_month,
-            (next_month + timedelta(days=DAYS_IN_MONTH)).replace(day=1) - timedelta(days=1)
+            (next_month + timedelta(days=DAYS_IN_MONTH)).replace(day=1)
         ),
     }
 
     start_date, end_date = time_filters[filter_param]()
-    return queryset.filter(**{f'{date_field}__date__range': [start_date, end_date]})
+    return get_local_midnight(start_date), get_local_midnight(end_date)
+
+
+def derived_field_q(sources, **lookups):
+    '''
+    Returns Q object applying lookups (like gte=..., lt=...) to Coalesce(*sources).
+    Instead of comparing the coalesced value, each source column is compared
+    directly (provided all the previous ones are NULL), which keeps the filter
+    index-friendly.
+    '''
+    q = Q()
+    previous_are_null = Q()
+    for source in sources:
+        q |= previous_are_null & Q(**{
+            f'{source}__{lookup}': value for lookup, value in lookups.items()
+        })
+        previous_are_null &= Q(**{f'{source}__isnull': True})
+    return q
+
+
+def field_q(model, field_name, **lookups):
+    '''
+    Returns Q object applying lookups to a model field or to a derived
+    field (see DERIVED_FIELDS of the model manager), which is
+    compared by its source columns.
+    '''
+    derived_fields = getattr(model.objects, 'DERIVED_FIELDS', {})
+    if field_name in derived_fields:
+        return derived_field_q(derived_fields[field_name], **lookups)
+    return Q(**{
+        f'{field_name}__{lookup}': value for lookup, value in lookups.items()
+    })
+
+
+def filter_by_field(queryset, field_name, **lookups):
+    '''
+    Filters a queryset by a model field or by a derived field,
+    see field_q().
+    '''
+    return queryset.filter(field_q(queryset.model, field_name, **lookups))
+
+
+def filter_by_date_range(queryset, filter_param, date=None, date_field='start_time'):
+    '''
+    Filters a queryset by a date range (like 'day', 'month')
+    relative to a reference date. The reference date defaults to today.
+    Assumes queryset uses 'start_time' or specified 'date_field' for filtering.
+    '''
+    start, end = get_timeframe_bounds(filter_param, date)
+    return filter_by_field(queryset, date_field, gte=start, lt=end)
 
 
 def apply_date_range_filter_if_valid(GET, queryset, param_name, valid_filters, model_field_name=None):
@@ -0,0 +1,43 @@
+from django.db import connection
+
+
+def get_query_plan(queryset):
+    '''
+    Returns the database query plan of the queryset as text.
+    On PostgreSQL sequential scans are disabled while explaining,
+    so the plan shows whether an index can be used at all,
+    not whether the planner prefers it for a (small) table.
+    For sorted querysets bitmap scans are disabled as well,
+    as they can't return rows in index order.
+    '''
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+
+    settings = ['enable_seqscan']
+    if queryset.query.order_by:
+        settings.append('enable_bitmapscan')
+
+    with connection.cursor() as cursor:
+        for setting in settings:
+            cursor.execute(f'SET {setting} = off')
+        try:
+            return queryset.explain()
+        finally:
+            for setting in settings:
+                cursor.execute(f'RESET {setting}')
+
+
+def uses_index(queryset, index_name):
+    '''
+    Returns True if the query plan of the queryset uses the given index.
+    '''
+    return index_name in get_query_plan(queryset)
+
+
+def analyze(*models):
+    '''
+    Refreshes planner statistics for the tables of the given models.
+    '''
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
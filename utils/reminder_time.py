@@ -1,3 +1,5 @@
+from utils.accessors import get_userprofile
+
 USER_REMINDER_ENABLED_FIELD = 'receive_{event_type}_reminders'
 USER_REMINDER_TIMING_FIELD = '{event_type}_reminder_timing'
 
@@ -8,17 +10,19 @@ def is_reminder_enabled(userprofile, event_type: str):
     return getattr(userprofile, USER_REMINDER_ENABLED_FIELD.format(event_type=event_type))
 
 
-def should_schedule_reminder(instance, userprofile, event_type: str, trigger_field_name: str):
+def should_schedule_reminder(instance, event_type: str, trigger_field_name: str):
     '''
     Determines whether a reminder should be scheduled for the given instance.
     Checks that it has not already been scheduled, and that the user has enabled reminders.
+    The user's profile is only looked up if the reminder is not scheduled yet,
+    so that saves not changing the trigger don't fetch it.
     '''
     return (
         (
             instance.scheduled_reminder_time is None
             or instance._original_reminder_trigger_time != getattr(instance, trigger_field_name)
         )
-        and is_reminder_enabled(userprofile, event_type)
+        and is_reminder_enabled(get_userprofile(instance), event_type)
     )
 
 
@@ -0,0 +1,14 @@
+from django.db.models import Func, IntegerField, Subquery
+
+
+def count_subquery(queryset):
+    '''
+    Returns a subquery counting rows of the queryset,
+    to be used in annotations (usually filtered by OuterRef).
+    '''
+    return Subquery(
+        queryset.order_by()
+        .annotate(row_count=Func('pk', function='COUNT'))
+        .values('row_count'),
+        output_field=IntegerField()
+    )
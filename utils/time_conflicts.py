@@ -0,0 +1,211 @@
+import heapq
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import DateTimeField, ExpressionWrapper, F, Func, Value
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from lesson.models import Lesson
+from lesson.series import get_occurrence_key, get_occurrences, get_user_series
+from assessment.models import Assessment
+
+from utils.constants import MAX_LESSON_DURATION, MAX_ASSESSMENT_DURATION, UNKNOWN_ASSESSMENT_DURATION
+
+# Immutable SQL function returning [start_time, start_time + duration)
+# tstzrange (an hour long for unknown duration). Created on PostgreSQL
+# by lesson migrations, and indexed with GiST on lesson and assessment.
+TIME_RANGE_FUNCTION = 'event_time_range'
+
+# Longest event of each type, so that events started before a range
+# but still lasting in it can be found by start time index.
+MAX_DURATIONS = {
+    'lesson': MAX_LESSON_DURATION,
+    'assessment': MAX_ASSESSMENT_DURATION,
+}
+
+
+def get_timed_events(user):
+    '''
+    Returns querysets of user's events occupying a time range by type:
+    lessons, and assessments with their own start time (assessments
+    linked to a lesson take place during it).
+    '''
+    return {
+        'lesson': Lesson.objects.filter(subject__user=user),
+        'assessment': Assessment.objects.filter(subject__user=user, start_time__isnull=False),
+    }
+
+
+def get_overlapping_occurrences(user, start, end=None, exclude_series=()):
+    '''
+    Returns expanded occurrences of user's lesson series (except ones
+    with excluded pks) overlapping the range between start and end
+    (optional), see get_occurrences().
+    '''
+    series_queryset = get_user_series(user).exclude(pk__in=exclude_series)
+
+    return [
+        occurrence
+        for occurrence in get_occurrences(series_queryset, start - MAX_DURATIONS['lesson'], end)
+        if occurrence.start_time + occurrence.duration > start
+    ]
+
+
+def get_end_time():
+    return ExpressionWrapper(
+        F('start_time') + Coalesce(F('duration'), UNKNOWN_ASSESSMENT_DURATION),
+        output_field=DateTimeField(),
+    )
+
+
+def filter_overlapping(queryset, event_type, start, end):
+    '''
+    Filters lessons or assessments with own start time of the queryset
+    to ones overlapping the range between aware datetimes start and end.
+
+    On PostgreSQL their time ranges are matched with && operator, which
+    uses the GiST index of (subject, time range). Elsewhere start times
+    are compared within the range widened by the maximum duration,
+    which keeps the start time index usable.
+    '''
+    if connection.vendor == 'postgresql':
+        # Imported here, as they require psycopg.
+        from django.contrib.postgres.fields import DateTimeRangeField
+        from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+
+        return queryset.annotate(
+            time_range=Func(F('start_time'), F('duration'), function=TIME_RANGE_FUNCTION, output_field=DateTimeRangeField())
+        ).filter(time_range__overlap=DateTimeTZRange(start, end))
+
+    return queryset.filter(
+        start_time__gt=start - MAX_DURATIONS[event_type], start_time__lt=end
+    ).annotate(end_time=get_end_time()).filter(end_time__gt=start)
+
+
+def find_conflicts(user, start, end, exclude=None):
+    '''
+    Returns (type, pk) of user's lessons and assessments with own time
+    overlapping the range between start and end, except the excluded
+    (type, pk) event. Runs one query per type, and expanded occurrences
+    of lesson series are included with their keys instead of pks.
+    '''
+    conflicts = []
+
+    for event_type, queryset in get_timed_events(user).items():
+        if exclude and exclude[0] == event_type and isinstance(exclude[1], int):
+            queryset = queryset.exclude(pk=exclude[1])
+
+        conflicts.extend(
+            (event_type, pk)
+            for pk in filter_overlapping(queryset, event_type, start, end).values_list('pk', flat=True)
+        )
+
+    conflicts.extend(
+        ('lesson', key)
+        for key in map(get_occurrence_key, get_overlapping_occurrences(user, start, end))
+        if exclude != ('lesson', key)
+    )
+
+    return conflicts
+
+
+def find_all_conflicts(user, start=None):
+    '''
+    Returns pairs of overlapping ((type, pk, start, end), (type, pk, start, end))
+    of user's lessons and assessments with own time lasting after start
+    (defaults to now), ordered by the start of the later event. Expanded
+    occurrences of lesson series are included with their keys as pk.
+
+    Times of all events are loaded with a single query (and series
+    with one more, see get_occurrences()), and overlaps are found by
+    a sweep line keeping events in progress in a heap by end time,
+    in O(n log n + pairs).
+    '''
+    start = start or now()
+
+    events = [
+        queryset
+        .filter(start_time__gt=start - MAX_DURATIONS[event_type])
+        .annotate(event_type=Value(event_type), end_time=get_end_time())
+        .values_list('event_type', 'pk', 'start_time', 'end_time')
+        for event_type, queryset in get_timed_events(user).items()
+    ]
+    occurrences = [
+        ('lesson', get_occurrence_key(occurrence), occurrence.start_time, occurrence.start_time + occurrence.duration)
+        for occurrence in get_overlapping_occurrences(user, start)
+    ]
+    events = sorted(
+        [*(event for event in events[0].union(*events[1:], all=True) if event[3] > start), *occurrences],
+        key=lambda event: (event[2], event[3]),
+    )
+
+    conflicts = []
+    in_progress = []        # (end, index) heap
+
+    for index, event in enumerate(events):
+        while in_progress and in_progress[0][0] <= event[2]:
+            heapq.heappop(in_progress)
+
+        conflicts.extend((events[other], event) for _, other in sorted(in_progress, key=lambda item: item[1]))
+        heapq.heappush(in_progress, (event[3], index))
+
+    return conflicts
+
+
+def find_batch_conflicts(user, ranges, exclude=None):
+    '''
+    Returns indices of (start, end) ranges of new events, which overlap
+    user's lessons or assessments with own time (except {type: pks}
+    of excluded ones, e.g. the events being moved), or another new
+    range starting earlier (or at the same time, but listed earlier).
+    Expanded occurrences of lesson series are busy like lessons,
+    except ones of series with pks excluded as "series".
+
+    Events overlapping the whole batch are loaded with one query per type,
+    merged, and each range is checked with a binary search, in
+    O((n + events) log (n + events)) instead of a query per range.
+    '''
+    if not ranges:
+        return set()
+
+    first = min(start for start, _ in ranges)
+    last = max(end for _, end in ranges)
+
+    busy = []
+    for event_type, queryset in get_timed_events(user).items():
+        if exclude and event_type in exclude:
+            queryset = queryset.exclude(pk__in=exclude[event_type])
+
+        busy.extend(
+            filter_overlapping(queryset, event_type, first, last)
+            .annotate(event_end=get_end_time())
+            .values_list('start_time', 'event_end')
+        )
+
+    busy.extend(
+        (occurrence.start_time, occurrence.start_time + occurrence.duration)
+        for occurrence in get_overlapping_occurrences(user, first, last, (exclude or {}).get('series', []))
+    )
+
+    merged = []
+    for start, end in sorted(busy):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    merged_starts = [start for start, _ in merged]
+
+    conflicts = set()
+    accepted_end = None
+
+    for index in sorted(range(len(ranges)), key=lambda index: ranges[index][0]):
+        start, end = ranges[index]
+        preceding = bisect_left(merged_starts, end) - 1
+
+        if (preceding >= 0 and merged[preceding][1] > start) or (accepted_end and accepted_end > start):
+            conflicts.add(index)
+        else:
+            accepted_end = max(accepted_end or end, end)
+
+    return conflicts